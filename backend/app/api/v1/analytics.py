@@ -1,61 +1,230 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 from loguru import logger
 from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
 from app.api.deps import get_database
-from app.models.call_record import CallRecord
-from app.models.client import Client
+from app.db.session import AsyncSessionLocal
+from app.db.rollups import get_rollups
+from app.core.timeseries import get_timeseries, bucket_range
+from app.core.breakdown import get_breakdown
+from app.core.analytics_cache import cached_analytics, analytics_cache_info
+from app.core.events import subscribe, format_sse, subscriber_count
+from app.config import settings
+from app.utils.json_response import dumps
 
 router = APIRouter()
 
 
+async def cached_json(
+    db: AsyncSession,
+    name: str,
+    params: dict,
+    build: Callable[[], Awaitable[dict]]
+) -> bytes:
+    """
+    JSON ответ аналитики через кэш: кэшируется уже сериализованное тело,
+    попадание в кэш не тратит время на JSON (год по часам - сотни КБ).
+    """
+    async def compute() -> bytes:
+        return dumps(await build())
+
+    return await cached_analytics(db, name, params, compute)
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+async def build_statistics(db: AsyncSession) -> dict:
+    """
+    Общая статистика из счетчиков stat_rollups и дневных интервалов call_buckets.
+
+    Счетчики обновляются вместе с данными, поэтому стоимость подсчета
+    не зависит от количества клиентов и звонков.
+    """
+    rollups = await get_rollups(db)
+    now = datetime.utcnow()
+    daily = await get_timeseries(db, 'day', now - timedelta(days=7), now)
+
+    statuses = rollups['status']
+    total = sum(statuses.values())
+    completed = statuses.get('completed', 0)
+
+    return {
+        "summary": {
+            "total_clients": total,
+            "completed": completed,
+            "processing": statuses.get('processing', 0),
+            "failed": statuses.get('failed', 0),
+            "pending": statuses.get('pending', 0),
+            "success_rate": (completed / total * 100) if total > 0 else 0
+        },
+        "categories": rollups['category'],
+        "daily_activity": [
+            {"date": point["start"].date().isoformat(), "count": point["total"]}
+            for point in daily
+            if point["total"]
+        ],
+        "creditors": {
+            creditor: {
+                "total": count,
+                "completed": rollups['creditor_completed'].get(creditor, 0)
+            }
+            for creditor, count in rollups['creditor'].items()
+        }
+    }
+
+
 @router.get("/statistics")
 async def get_statistics(db: AsyncSession = Depends(get_database)):
     """
     Получает общую статистику по обзвонам и клиентам.
+
+    Ответ кэшируется на settings.ANALYTICS_CACHE_TTL_SECONDS и сбрасывается
+    при изменении данных.
     """
     try:
-        # Статистика по клиентам
-        clients_query = select(
-            func.count(Client.id),
-            func.count(Client.id).filter(Client.status == 'completed'),
-            func.count(Client.id).filter(Client.status == 'processing'),
-            func.count(Client.id).filter(Client.status == 'failed'),
-            func.count(Client.id).filter(Client.status == 'pending')
-        )
-        clients_result = await db.execute(clients_query)
-        total, completed, processing, failed, pending = clients_result.fetchone()
-
-        # Статистика по категориям
-        categories_query = select(
-            CallRecord.category,
-            func.count(CallRecord.id)
-        ).group_by(CallRecord.category).where(CallRecord.category.isnot(None))
-        categories_result = await db.execute(categories_query)
-        categories_stats = {row[0]: row[1] for row in categories_result.fetchall()}
-
-        # Статистика за последние 7 дней
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        daily_query = select(
-            func.date(CallRecord.created_at).label('date'),
-            func.count(CallRecord.id)
-        ).where(CallRecord.created_at >= seven_days_ago).group_by('date').order_by('date')
-        daily_result = await db.execute(daily_query)
-        daily_stats = [{"date": str(row[0]), "count": row[1]} for row in daily_result.fetchall()]
-
-        return {
-            "summary": {
-                "total_clients": total or 0,
-                "completed": completed or 0,
-                "processing": processing or 0,
-                "failed": failed or 0,
-                "pending": pending or 0,
-                "success_rate": (completed / total * 100) if total and total > 0 else 0
-            },
-            "categories": categories_stats,
-            "daily_activity": daily_stats
-        }
+        return json_response(await cached_json(db, 'statistics', {}, lambda: build_statistics(db)))
     except Exception as e:
         logger.error(f"Ошибка при получении аналитики: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    granularity: str = Query('day', description="hour, day, week или month"),
+    date_from: Optional[datetime] = Query(None, description="Начало диапазона, по умолчанию 30 дней назад"),
+    date_to: Optional[datetime] = Query(None, description="Конец диапазона (не включается), по умолчанию сейчас"),
+    group_by: Optional[str] = Query(None, description="Разбивка: category, creditor или language"),
+    category: Optional[str] = None,
+    creditor: Optional[str] = None,
+    language: Optional[str] = None,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Количество звонков по интервалам за произвольный диапазон.
+
+    Строится из заранее посчитанных часовых и дневных интервалов call_buckets,
+    поэтому год по часам отдается без обращения к call_records.
+    Диапазон расширяется до целых интервалов, ответ кэшируется по нему.
+    Звонки без категории или языка попадают в группу "unknown".
+    """
+    try:
+        date_to = date_to or datetime.utcnow()
+        date_from = date_from or date_to - timedelta(days=30)
+        filters = {'category': category, 'creditor': creditor, 'language': language}
+
+        try:
+            date_from, date_to, _ = bucket_range(date_from, date_to, granularity)
+
+            async def build_timeseries() -> dict:
+                return {
+                    "granularity": granularity,
+                    "group_by": group_by,
+                    "date_from": date_from,
+                    "date_to": date_to,
+                    "points": await get_timeseries(
+                        db, granularity, date_from, date_to, group_by=group_by, filters=filters
+                    )
+                }
+
+            params = {
+                'granularity': granularity, 'date_from': date_from, 'date_to': date_to,
+                'group_by': group_by, **filters
+            }
+            return json_response(await cached_json(db, 'timeseries', params, build_timeseries))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при получении ряда аналитики: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/breakdown")
+async def get_analytics_breakdown(
+    rows: str = Query('creditor', description="Строки матрицы: creditor, overdue или amount"),
+    columns: str = Query('overdue', description="Столбцы матрицы: creditor, overdue или amount"),
+    creditor: Optional[str] = None,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Конверсия по кредиторам, интервалам просрочки (0-30, 31-90, 90+) и суммы долга.
+
+    Для каждой группы - количество клиентов, сколько из них обзвонено,
+    обещания оплаты, отказы, звонки без ответа и чужие номера с долями
+    от обзвоненных.
+    Все разбивки и матрица rows x columns считаются одним запросом по индексу.
+    """
+    try:
+        params = {'rows': rows, 'columns': columns, 'creditor': creditor}
+        try:
+            body = await cached_json(
+                db, 'breakdown', params, lambda: get_breakdown(db, rows, columns, creditor)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return json_response(body)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при получении разбивки аналитики: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/cache")
+async def get_analytics_cache():
+    """Попадания и промахи кэша аналитики."""
+    return {**analytics_cache_info(), 'stream_subscribers': subscriber_count()}
+
+
+async def statistics_snapshot() -> bytes:
+    """Событие snapshot с полной статистикой (через общий кэш аналитики)."""
+    async with AsyncSessionLocal() as db:
+        body = await cached_json(db, 'statistics', {}, lambda: build_statistics(db))
+    return format_sse('snapshot', body)
+
+
+@router.get("/analytics/stream")
+async def stream_analytics():
+    """
+    Поток событий аналитики (Server-Sent Events) вместо опроса /statistics.
+
+    События:
+    - snapshot: полная статистика, как в /statistics (при подключении и resync)
+    - stats: изменения счетчиков после коммита {разрез: {ключ: приращение}},
+      например {"status": {"pending": -1, "processing": 1}}
+    - call: новый классифицированный звонок
+    - bulk_progress: прогресс массовой обработки, как в /process/bulk/{task_id}/status
+
+    Каждое событие считается и сериализуется один раз для всех подписчиков.
+    При простое отправляется комментарий ": ping" раз в
+    settings.ANALYTICS_STREAM_HEARTBEAT_SECONDS, чтобы прокси не закрывали соединение.
+    """
+    async def events():
+        with subscribe() as queue:
+            # Интервал переподключения EventSource после обрыва, мс
+            yield b"retry: 3000\n\n"
+            yield await statistics_snapshot()
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=settings.ANALYTICS_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+
+                # Подписчик отстал и пропустил события - отправляем снимок заново
+                yield message if message is not None else await statistics_snapshot()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,240 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, delete, update
+from loguru import logger
+from datetime import datetime
+import uuid
+import asyncio
+from collections import Counter
+from app.api.deps import get_database
+from app.models.client import Client
+from app.models.call_record import CallRecord
+from app.models.ingest_batch import IngestBatch
+from app.models.ingest_job import IngestJob
+from app.db.rollups import aggregate_rollups, apply_rollup_deltas
+from app.api.v1.process import bulk_tasks, process_bulk_background
+
+router = APIRouter()
+
+
+def _batch_to_dict(batch: IngestBatch) -> dict:
+    return {
+        "batch_id": batch.id,
+        "filename": batch.filename,
+        "mode": batch.mode,
+        "status": batch.status,
+        "rows_inserted": batch.rows_inserted,
+        "rows_updated": batch.rows_updated,
+        "created_at": batch.created_at,
+        "rolled_back_at": batch.rolled_back_at
+    }
+
+
+@router.get("/batches")
+async def get_batches(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Получает список загрузок реестров (новые сверху) с количеством клиентов.
+    """
+    try:
+        offset = (page - 1) * page_size
+        result = await db.execute(
+            select(IngestBatch)
+            .order_by(IngestBatch.id.desc())
+            .offset(offset)
+            .limit(page_size)
+        )
+        batches = result.scalars().all()
+        
+        # Количество клиентов по загрузкам страницы - один GROUP BY по индексу batch_id
+        counts = {}
+        if batches:
+            counts_result = await db.execute(
+                select(Client.batch_id, func.count(Client.id))
+                .where(Client.batch_id.in_([batch.id for batch in batches]))
+                .group_by(Client.batch_id)
+            )
+            counts = dict(counts_result.fetchall())
+        
+        total_result = await db.execute(select(func.count(IngestBatch.id)))
+        
+        return {
+            "items": [
+                {**_batch_to_dict(batch), "clients_count": counts.get(batch.id, 0)}
+                for batch in batches
+            ],
+            "total": total_result.scalar() or 0,
+            "page": page,
+            "page_size": page_size
+        }
+        
+    except Exception as e:
+        logger.error(f"Ошибка при получении списка загрузок: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch_detail(
+    batch_id: int,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Получает информацию о загрузке с разбивкой клиентов по статусам.
+    """
+    batch = await db.get(IngestBatch, batch_id)
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Загрузка с ID {batch_id} не найдена")
+    
+    result = await db.execute(
+        select(Client.status, func.count(Client.id))
+        .where(Client.batch_id == batch_id)
+        .group_by(Client.status)
+    )
+    statuses = dict(result.fetchall())
+    
+    return {
+        **_batch_to_dict(batch),
+        "clients_count": sum(statuses.values()),
+        "statuses": statuses
+    }
+
+
+@router.post("/batches/{batch_id}/process")
+async def process_batch(
+    batch_id: int,
+    use_demo_audio: bool = False,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Запускает массовую обработку pending клиентов из одной загрузки.
+    
+    Выбираются только ID клиентов по индексу (batch_id, status), дальше
+    используется та же фоновая задача, что и в /process/bulk.
+    """
+    batch = await db.get(IngestBatch, batch_id)
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Загрузка с ID {batch_id} не найдена")
+    
+    if batch.status != 'active':
+        raise HTTPException(status_code=400, detail="Загрузка откачена")
+    
+    try:
+        result = await db.execute(
+            select(Client.id)
+            .where(Client.batch_id == batch_id)
+            .where(Client.status == 'pending')
+            .order_by(Client.id)
+        )
+        client_ids = list(result.scalars().all())
+        
+        task_id = str(uuid.uuid4())
+        bulk_tasks[task_id] = {
+            "status": "processing",
+            "total": len(client_ids),
+            "processed": 0,
+            "failed": 0,
+            "client_ids": client_ids
+        }
+        
+        asyncio.create_task(process_bulk_background(task_id, client_ids, use_demo_audio))
+        
+        return {
+            "task_id": task_id,
+            "batch_id": batch_id,
+            "status": "started",
+            "total": len(client_ids),
+            "message": "Массовая обработка загрузки запущена"
+        }
+        
+    except Exception as e:
+        logger.error(f"Ошибка при запуске обработки загрузки {batch_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/batches/{batch_id}")
+async def rollback_batch(
+    batch_id: int,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Откатывает загрузку: удаляет добавленных ею клиентов и их звонки.
+    
+    Удаление выполняется двумя DELETE по batch_id без загрузки объектов в память.
+    Клиенты, которые эта загрузка только обновляла (upsert), не удаляются.
+    Пока задача загрузки реестра в очереди или выполняется, возвращается 409.
+    """
+    batch = await db.get(IngestBatch, batch_id)
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Загрузка с ID {batch_id} не найдена")
+    
+    if batch.status == 'rolled_back':
+        raise HTTPException(status_code=400, detail="Загрузка уже откачена")
+    
+    # Пока реестр загружается, задача продолжает добавлять клиентов в эту загрузку
+    # и менять счетчики статистики уже после отката
+    active_job = await db.execute(
+        select(IngestJob.id)
+        .where(IngestJob.batch_id == batch_id)
+        .where(IngestJob.status.in_(['queued', 'running']))
+        .limit(1)
+    )
+    if active_job.first() is not None:
+        raise HTTPException(
+            status_code=409,
+            detail="Реестр еще загружается, откат возможен после завершения загрузки"
+        )
+    
+    try:
+        batch_clients = select(Client.id).where(Client.batch_id == batch_id)
+        
+        # Счетчики статистики уменьшаются на удаляемых клиентов и их звонки
+        counters, buckets = await aggregate_rollups(
+            db,
+            clients_where=Client.batch_id == batch_id,
+            calls_where=CallRecord.client_id.in_(batch_clients)
+        )
+        await apply_rollup_deltas(
+            db,
+            Counter({key: -count for key, count in counters.items()}),
+            Counter({key: -count for key, count in buckets.items()})
+        )
+        
+        calls_result = await db.execute(
+            delete(CallRecord)
+            .where(CallRecord.client_id.in_(batch_clients))
+            .execution_options(synchronize_session=False)
+        )
+        clients_result = await db.execute(
+            delete(Client)
+            .where(Client.batch_id == batch_id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(IngestBatch)
+            .where(IngestBatch.id == batch_id)
+            .values(status='rolled_back', rolled_back_at=datetime.utcnow())
+        )
+        await db.commit()
+        
+        logger.info(
+            f"Загрузка {batch_id} откачена: удалено клиентов {clients_result.rowcount}, "
+            f"звонков {calls_result.rowcount}"
+        )
+        
+        return {
+            "batch_id": batch_id,
+            "status": "rolled_back",
+            "deleted_clients": clients_result.rowcount,
+            "deleted_call_records": calls_result.rowcount
+        }
+        
+    except Exception as e:
+        logger.error(f"Ошибка при откате загрузки {batch_id}: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
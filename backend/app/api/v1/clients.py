@@ -5,10 +5,14 @@ from loguru import logger
 from app.api.deps import get_database
 from app.models.client import Client
 from app.models.call_record import CallRecord
+from app.core.pagination import PAGINATION_MODES, keyset_page
+from app.core.count_cache import COUNT_MODES, cached_count
+from app.core.search import fulltext_available, search_client_ids
 from app.schemas.client import (
     ClientResponse,
     ClientDetail,
     ClientListResponse,
+    ClientSearchResponse,
     PaginationParams
 )
 
@@ -20,17 +24,30 @@ async def get_clients(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     status: str = Query(None),
+    pagination: str = Query('offset'),
+    cursor: str = Query(None),
+    count: str = Query('exact'),
     db: AsyncSession = Depends(get_database)
 ):
     """
     Получает список клиентов с пагинацией.
     
     Query параметры:
-    - page: номер страницы (начиная с 1)
+    - page: номер страницы (начиная с 1), только для pagination=offset
     - page_size: размер страницы (1-100)
     - status: фильтр по статусу (опционально)
+    - pagination: offset - по номеру страницы (по умолчанию), cursor - по курсору
+    - cursor: next_cursor/prev_cursor из предыдущего ответа (включает режим cursor)
+    - count: exact - точный total (по умолчанию), approximate - total может
+      отставать на время кэша, none - total не считается
     """
     try:
+        if pagination not in PAGINATION_MODES:
+            raise HTTPException(status_code=400, detail=f"Неизвестный режим пагинации: {pagination}")
+        
+        if count not in COUNT_MODES:
+            raise HTTPException(status_code=400, detail=f"Неизвестный режим подсчета: {count}")
+        
         # Строим запрос
         query = select(Client)
         count_query = select(func.count(Client.id))
@@ -39,33 +56,92 @@ async def get_clients(
             query = query.where(Client.status == status)
             count_query = count_query.where(Client.status == status)
         
-        # Получаем общее количество
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Применяем пагинацию
-        offset = (page - 1) * page_size
-        query = query.order_by(Client.created_at.desc()).offset(offset).limit(page_size)
+        # Получаем общее количество (из кэша, если данные не менялись)
+        total = await cached_count(db, 'clients', {'status': status}, count_query, count)
         
-        # Выполняем запрос
-        result = await db.execute(query)
-        clients = result.scalars().all()
+        next_cursor = prev_cursor = None
+        if cursor or pagination == 'cursor':
+            # Страница по курсору: стоимость не зависит от глубины
+            try:
+                clients, next_cursor, prev_cursor = await keyset_page(
+                    db, query, Client.created_at, Client.id, page_size, cursor
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            # Применяем пагинацию
+            offset = (page - 1) * page_size
+            query = query.order_by(Client.created_at.desc(), Client.id.desc()).offset(offset).limit(page_size)
+            
+            # Выполняем запрос
+            result = await db.execute(query)
+            clients = result.scalars().all()
         
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
+        total_pages = None
+        if total is not None:
+            total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         
         return ClientListResponse(
             items=[ClientResponse.model_validate(client) for client in clients],
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка клиентов: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Объявлен до /clients/{client_id}, иначе "search" попадет в client_id
+@router.get("/clients/search", response_model=ClientSearchResponse)
+async def search_clients(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Полнотекстовый поиск клиентов по ФИО, ИИН или телефону.
+    
+    Слова ищутся по началу ("иван" находит "Иванов"), результаты
+    отсортированы по релевантности.
+    
+    Query параметры:
+    - q: строка поиска
+    - limit: максимум результатов (1-100)
+    """
+    try:
+        if not fulltext_available(db):
+            raise HTTPException(status_code=501, detail="Полнотекстовый поиск доступен только для SQLite")
+        
+        client_ids = await search_client_ids(db, q, limit)
+        
+        clients = {}
+        if client_ids:
+            result = await db.execute(select(Client).where(Client.id.in_(client_ids)))
+            clients = {client.id: client for client in result.scalars()}
+        
+        return ClientSearchResponse(
+            query=q,
+            items=[
+                ClientResponse.model_validate(clients[client_id])
+                for client_id in client_ids
+                if client_id in clients
+            ]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при поиске клиентов: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/clients/{client_id}", response_model=ClientDetail)
 async def get_client_detail(
     client_id: int,
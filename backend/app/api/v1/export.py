@@ -1,57 +1,69 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from pathlib import Path
 from loguru import logger
 from datetime import datetime
+import uuid
 from app.api.deps import get_database
-from app.models.client import Client
-from app.utils.excel import export_to_excel
-from app.config import settings
+from app.core.export import (
+    build_export_query,
+    stream_csv,
+    stream_ndjson,
+    CLIENT_EXPORT_FIELDS,
+    EXPORT_VIEWS
+)
+from app.core.export_cache import build_cached_export, build_cached_bundle
+from app.core.export_jobs import enqueue_export_job
+from app.models.export_job import ExportJob
+from app.utils.excel import EXPORT_HEADERS, WIDE_EXPORT_HEADERS
 
 router = APIRouter()
 
 
+def check_export_view(view: str) -> None:
+    """Проверяет вид выгрузки, иначе 400."""
+    if view not in EXPORT_VIEWS:
+        raise HTTPException(status_code=400, detail=f"Неизвестный вид выгрузки: {view}")
+
+
 @router.get("/export")
 async def export_clients(
     status: str = Query(None),
     category: str = Query(None),
+    view: str = Query('basic'),
     db: AsyncSession = Depends(get_database)
 ):
     """
     Экспортирует клиентов в Excel файл.
     
+    Строки читаются из БД серверным курсором и сразу пишутся в write-only
+    книгу, поэтому память не зависит от количества клиентов. Готовые файлы
+    кэшируются по фильтрам и версии данных: пока клиенты и звонки не менялись,
+    повторный запрос отдает уже собранный файл.
+    
     Query параметры:
     - status: фильтр по статусу (опционально)
     - category: фильтр по категории (опционально)
+    - view: basic - поля клиента, wide - плюс последний звонок (категория,
+      уверенность, язык, дата обещания, транскрипт)
     """
     try:
-        # Строим запрос
-        query = select(Client)
-        
-        if status:
-            query = query.where(Client.status == status)
-        
-        if category:
-            query = query.where(Client.category == category)
-        
-        query = query.order_by(Client.created_at.desc())
-        
-        # Получаем клиентов
-        result = await db.execute(query)
-        clients = result.scalars().all()
+        check_export_view(view)
+        query = build_export_query(status, category, view=view)
+        output_path = await build_cached_export(
+            db,
+            query,
+            {'status': status, 'category': category},
+            headers=WIDE_EXPORT_HEADERS if view == 'wide' else EXPORT_HEADERS
+        )
         
-        if not clients:
+        if output_path is None:
             raise HTTPException(status_code=404, detail="Клиенты не найдены")
         
-        # Генерируем имя файла
+        # Генерируем имя файла для скачивания
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"clients_export_{timestamp}.xlsx"
-        output_path = Path(settings.EXPORT_PATH) / filename
-        
-        # Экспортируем
-        await export_to_excel(clients, str(output_path))
         
         return FileResponse(
             path=str(output_path),
@@ -65,3 +77,217 @@ async def export_clients(
         logger.error(f"Ошибка при экспорте: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/export/bundle")
+async def export_clients_bundle(
+    status: str = Query(None),
+    category: str = Query(None),
+    view: str = Query('basic'),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Экспортирует клиентов в ZIP архив с отдельной Excel книгой на каждого кредитора.
+    
+    Клиенты читаются из БД за один проход, книги кредиторов собираются
+    параллельно в пуле процессов. Архив кэшируется так же, как /export.
+    
+    Query параметры:
+    - status: фильтр по статусу (опционально)
+    - category: фильтр по категории (опционально)
+    - view: basic - поля клиента, wide - плюс последний звонок (категория,
+      уверенность, язык, дата обещания, транскрипт)
+    """
+    try:
+        check_export_view(view)
+        query = build_export_query(status, category, view=view)
+        output_path = await build_cached_bundle(
+            db,
+            query,
+            {'status': status, 'category': category},
+            WIDE_EXPORT_HEADERS if view == 'wide' else EXPORT_HEADERS
+        )
+        
+        if output_path is None:
+            raise HTTPException(status_code=404, detail="Клиенты не найдены")
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        return FileResponse(
+            path=str(output_path),
+            media_type="application/zip",
+            filename=f"clients_by_creditor_{timestamp}.zip"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте архива: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export.csv")
+async def export_clients_csv(
+    status: str = Query(None),
+    category: str = Query(None),
+    view: str = Query('basic')
+):
+    """
+    Потоковая выгрузка клиентов в CSV без временных файлов.
+    
+    Query параметры:
+    - status: фильтр по статусу (опционально)
+    - category: фильтр по категории (опционально)
+    - view: basic - поля клиента, wide - плюс последний звонок (категория,
+      уверенность, язык, дата обещания, транскрипт)
+    """
+    check_export_view(view)
+    query = build_export_query(status, category, CLIENT_EXPORT_FIELDS, view)
+    filename = f"clients_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    
+    return StreamingResponse(
+        stream_csv(query),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/export.ndjson")
+async def export_clients_ndjson(
+    status: str = Query(None),
+    category: str = Query(None),
+    view: str = Query('basic')
+):
+    """
+    Потоковая выгрузка клиентов в NDJSON (один JSON объект на строку).
+    
+    Query параметры:
+    - status: фильтр по статусу (опционально)
+    - category: фильтр по категории (опционально)
+    - view: basic - поля клиента, wide - плюс последний звонок (категория,
+      уверенность, язык, дата обещания, транскрипт)
+    """
+    check_export_view(view)
+    query = build_export_query(status, category, CLIENT_EXPORT_FIELDS, view)
+    
+    return StreamingResponse(
+        stream_ndjson(query),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/export/jobs")
+async def create_export_job(
+    status: str = Query(None),
+    category: str = Query(None),
+    view: str = Query('basic'),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Ставит Excel выгрузку в очередь фоновой сборки.
+    
+    Для больших выгрузок: запрос не ждет сборки файла, прогресс доступен
+    через /export/jobs/{job_id}, готовый файл - через /export/jobs/{job_id}/download.
+    
+    Query параметры:
+    - status: фильтр по статусу (опционально)
+    - category: фильтр по категории (опционально)
+    - view: basic - поля клиента, wide - плюс последний звонок (категория,
+      уверенность, язык, дата обещания, транскрипт)
+    """
+    try:
+        check_export_view(view)
+        
+        job = ExportJob(
+            id=str(uuid.uuid4()),
+            status_filter=status,
+            category_filter=category,
+            view=view,
+            status='queued'
+        )
+        db.add(job)
+        await db.commit()
+        
+        enqueue_export_job(job.id)
+        
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "message": "Выгрузка поставлена в очередь"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при создании задачи выгрузки: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export/jobs/{job_id}")
+async def get_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Получает статус и прогресс задачи выгрузки.
+    """
+    job = await db.get(ExportJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    progress = 0
+    if job.rows_total:
+        progress = round(job.rows_written / job.rows_total * 100, 1)
+    elif job.status == 'completed':
+        progress = 100
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filters": {"status": job.status_filter, "category": job.category_filter},
+        "view": job.view,
+        "rows_total": job.rows_total,
+        "rows_written": job.rows_written,
+        "progress": progress,
+        "file_size": job.file_size,
+        "download_url": f"/api/v1/export/jobs/{job.id}/download" if job.file_path else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+@router.get("/export/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Отдает файл готовой выгрузки.
+    
+    Поддерживаются Range запросы, поэтому прерванное скачивание
+    можно продолжить с места обрыва.
+    """
+    job = await db.get(ExportJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    if job.status != 'completed':
+        raise HTTPException(status_code=409, detail=f"Выгрузка еще не готова: {job.status}")
+    
+    if not job.file_path:
+        raise HTTPException(status_code=404, detail="Клиенты не найдены")
+    
+    # Файлы выгрузок живут в кэше и со временем вытесняются
+    if not Path(job.file_path).exists():
+        raise HTTPException(status_code=410, detail="Файл выгрузки удален, создайте выгрузку заново")
+    
+    timestamp = job.created_at.strftime("%Y%m%d_%H%M%S")
+    
+    return FileResponse(
+        path=job.file_path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"clients_export_{timestamp}.xlsx"
+    )
@@ -1,68 +1,162 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import joinedload
 from loguru import logger
 from app.api.deps import get_database
 from app.models.call_record import CallRecord
 from app.models.client import Client
-from app.schemas.client import CallHistoryResponse, CallRecordWithClient, ClientResponse, CallRecordResponse
+from app.core.pagination import PAGINATION_MODES, keyset_page
+from app.core.count_cache import COUNT_MODES, cached_count
+from app.schemas.client import CallHistoryResponse, CallSearchResponse, ClientResponse, CallRecordResponse
+from app.core.search import fulltext_available, search_call_record_ids, highlight
+from app.utils.json_response import FastJSONResponse
 
 router = APIRouter()
 
+# Поля ответа /history в порядке схем CallRecordResponse и ClientResponse
+HISTORY_RECORD_FIELDS = tuple(CallRecordResponse.model_fields)
+HISTORY_CLIENT_FIELDS = tuple(ClientResponse.model_fields)
+
+HISTORY_RECORD_COLUMNS = tuple(getattr(CallRecord, field) for field in HISTORY_RECORD_FIELDS)
+HISTORY_CLIENT_COLUMNS = tuple(
+    getattr(Client, field).label(f"client_{field}") for field in HISTORY_CLIENT_FIELDS
+)
+
+
+def history_query():
+    """Только колонки ответа: звонок и его клиент одной строкой."""
+    return select(*HISTORY_RECORD_COLUMNS, *HISTORY_CLIENT_COLUMNS).join(
+        Client, CallRecord.client_id == Client.id
+    )
+
+
+def history_item(row) -> dict:
+    """Элемент ответа прямо из строки, без построения Pydantic моделей."""
+    record_size = len(HISTORY_RECORD_FIELDS)
+    return {
+        **dict(zip(HISTORY_RECORD_FIELDS, row[:record_size])),
+        'client': dict(zip(HISTORY_CLIENT_FIELDS, row[record_size:]))
+    }
+
 
 @router.get("/history", response_model=CallHistoryResponse)
 async def get_call_history(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     category: str = Query(None),
+    pagination: str = Query('offset'),
+    cursor: str = Query(None),
+    count: str = Query('exact'),
     db: AsyncSession = Depends(get_database)
 ):
     """
     Получает общую историю звонков с пагинацией.
+    
+    Query параметры:
+    - page: номер страницы (начиная с 1), только для pagination=offset
+    - page_size: размер страницы (1-100)
+    - category: фильтр по категории (опционально)
+    - pagination: offset - по номеру страницы (по умолчанию), cursor - по курсору
+    - cursor: next_cursor/prev_cursor из предыдущего ответа (включает режим cursor)
+    - count: exact - точный total (по умолчанию), approximate - total может
+      отставать на время кэша, none - total не считается
     """
     try:
-        # Базовый запрос с загрузкой клиента
-        query = select(CallRecord).options(joinedload(CallRecord.client))
+        if pagination not in PAGINATION_MODES:
+            raise HTTPException(status_code=400, detail=f"Неизвестный режим пагинации: {pagination}")
+        
+        if count not in COUNT_MODES:
+            raise HTTPException(status_code=400, detail=f"Неизвестный режим подсчета: {count}")
+        
+        query = history_query()
         count_query = select(func.count(CallRecord.id))
         
         if category:
             query = query.where(CallRecord.category == category)
             count_query = count_query.where(CallRecord.category == category)
         
-        # Получаем общее количество
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
+        # Получаем общее количество (из кэша, если данные не менялись)
+        total = await cached_count(db, 'history', {'category': category}, count_query, count)
         
-        # Применяем пагинацию
-        offset = (page - 1) * page_size
-        query = query.order_by(CallRecord.created_at.desc()).offset(offset).limit(page_size)
+        next_cursor = prev_cursor = None
+        if cursor or pagination == 'cursor':
+            # Страница по курсору: стоимость не зависит от глубины
+            try:
+                rows, next_cursor, prev_cursor = await keyset_page(
+                    db, query, CallRecord.created_at, CallRecord.id, page_size, cursor,
+                    scalars=False
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            # Применяем пагинацию
+            offset = (page - 1) * page_size
+            query = query.order_by(CallRecord.created_at.desc(), CallRecord.id.desc()).offset(offset).limit(page_size)
+            
+            # Выполняем запрос
+            result = await db.execute(query)
+            rows = result.all()
         
-        # Выполняем запрос
-        result = await db.execute(query)
-        records = result.scalars().unique().all()
+        items = [history_item(row) for row in rows]
         
-        items = []
-        for record in records:
-            # Преобразуем в схему
-            client_data = ClientResponse.model_validate(record.client)
-            record_data = CallRecordResponse.model_validate(record)
-            
-            items.append(CallRecordWithClient(
-                **record_data.model_dump(),
-                client=client_data
-            ))
-            
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
+        total_pages = None
+        if total is not None:
+            total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         
-        return CallHistoryResponse(
-            items=items,
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages
-        )
+        return FastJSONResponse({
+            'items': items,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении истории звонков: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/search", response_model=CallSearchResponse)
+async def search_call_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Полнотекстовый поиск звонков по словам транскрипта.
+    
+    Слова ищутся по началу, результаты отсортированы по релевантности,
+    snippet - фрагмент транскрипта с найденными словами в <b></b>.
+    
+    Query параметры:
+    - q: строка поиска
+    - limit: максимум результатов (1-100)
+    """
+    try:
+        if not fulltext_available(db):
+            raise HTTPException(status_code=501, detail="Полнотекстовый поиск доступен только для SQLite")
+        
+        record_ids = await search_call_record_ids(db, q, limit)
+        
+        rows = {}
+        if record_ids:
+            result = await db.execute(history_query().where(CallRecord.id.in_(record_ids)))
+            rows = {row.id: row for row in result}
+        
+        items = [
+            {**history_item(rows[record_id]), 'snippet': highlight(rows[record_id].transcript, q)}
+            for record_id in record_ids
+            if record_id in rows
+        ]
+        
+        return FastJSONResponse({'query': q, 'items': items})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при поиске по истории звонков: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -10,7 +10,9 @@ from pydantic import BaseModel
 from app.api.deps import get_database
 from app.models.client import Client
 from app.core.call_pipeline import process_call, process_response_audio
+from app.core.events import publish_event
 from app.config import settings
+from app.utils.uploads import spool_upload
 
 
 class BulkProcessRequest(BaseModel):
@@ -78,14 +80,9 @@ async def upload_response_audio(
                 detail="Поддерживаются только аудио файлы (.wav, .mp3, .ogg, .m4a)"
             )
         
-        # Сохраняем файл
+        # Потоково сохраняем файл
         audio_dir = Path(settings.AUDIO_STORAGE_PATH) / "responses"
-        audio_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = audio_dir / f"{client_id}.wav"
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        file_path, _, _ = await spool_upload(file, audio_dir, f"{client_id}.wav")
         
         logger.info(f"Аудио ответ загружен: {file_path}")
         
@@ -179,6 +176,8 @@ async def process_bulk_background(
                     logger.error(f"Ошибка при обработке клиента {client_id}: {e}")
                     bulk_tasks[task_id]["failed"] += 1
                     continue
+                finally:
+                    publish_event('bulk_progress', bulk_task_progress(task_id))
             
             bulk_tasks[task_id]["status"] = "completed"
         
@@ -186,16 +185,12 @@ async def process_bulk_background(
         logger.error(f"Ошибка в фоновой задаче {task_id}: {e}")
         bulk_tasks[task_id]["status"] = "failed"
         bulk_tasks[task_id]["error"] = str(e)
+    
+    publish_event('bulk_progress', bulk_task_progress(task_id))
 
 
-@router.get("/process/bulk/{task_id}/status")
-async def get_bulk_status(task_id: str):
-    """
-    Получает статус массовой обработки.
-    """
-    if task_id not in bulk_tasks:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-    
+def bulk_task_progress(task_id: str) -> dict:
+    """Статус и прогресс массовой обработки."""
     task = bulk_tasks[task_id]
     
     return {
@@ -208,6 +203,17 @@ async def get_bulk_status(task_id: str):
     }
 
 
+@router.get("/process/bulk/{task_id}/status")
+async def get_bulk_status(task_id: str):
+    """
+    Получает статус массовой обработки.
+    """
+    if task_id not in bulk_tasks:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    return bulk_task_progress(task_id)
+
+
 @router.get("/audio/tts/{client_id}.wav")
 async def get_tts_audio(client_id: int):
     """
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_
 from pathlib import Path
+from datetime import datetime
 from loguru import logger
+import uuid
 from app.api.deps import get_database
 from app.config import settings
-from app.utils.excel import read_excel_to_db
+from app.models.ingest_job import IngestJob
+from app.models.ingest_batch import IngestBatch
+from app.core.ingest import INGEST_MODES
+from app.core.ingest_jobs import enqueue_ingest_job
+from app.utils.uploads import spool_upload
+from app.utils.registry import SUPPORTED_EXTENSIONS, preview_registry
 
 router = APIRouter()
 
@@ -12,46 +21,202 @@ router = APIRouter()
 @router.post("/upload")
 async def upload_excel(
     file: UploadFile = File(...),
+    mode: str = Query('insert'),
     db: AsyncSession = Depends(get_database)
 ):
     """
-    Загружает Excel файл, парсит его и сохраняет клиентов в БД.
+    Загружает реестр (Excel, CSV или Parquet) и ставит его в очередь на загрузку в БД.
+    
+    Разбор и запись клиентов выполняются в фоне, прогресс доступен
+    через /upload/{job_id}/status.
     
     Ожидаемые колонки: ФИО, ИИН, Кредитор, Сумма, Дни просрочки, Телефон
+    
+    Query параметры:
+    - mode: insert - существующие ИИН пропускаются (по умолчанию),
+      upsert - существующие клиенты обновляются данными реестра
     """
     try:
+        if mode not in INGEST_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестный режим загрузки: {mode}"
+            )
+        
         # Проверяем расширение файла
-        if not file.filename.endswith(('.xlsx', '.xls')):
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             raise HTTPException(
                 status_code=400,
-                detail="Поддерживаются только файлы Excel (.xlsx, .xls)"
+                detail="Поддерживаются только файлы Excel (.xlsx, .xls), CSV (.csv) и Parquet (.parquet)"
             )
         
-        # Сохраняем файл
-        upload_dir = Path(settings.UPLOAD_PATH)
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        # Потоково сохраняем файл на диск
+        file_path, file_hash, file_size = await spool_upload(file, Path(settings.UPLOAD_PATH))
         
-        file_path = upload_dir / file.filename
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Тот же реестр уже загружен или загружается - повторно не разбираем
+        # (если его загрузку не откатили)
+        result = await db.execute(
+            select(IngestJob)
+            .where(IngestJob.file_hash == file_hash)
+            .where(IngestJob.mode == mode)
+            .where(IngestJob.status.in_(['queued', 'running', 'completed']))
+            .where(or_(
+                IngestJob.batch_id.is_(None),
+                IngestJob.batch_id.notin_(
+                    select(IngestBatch.id).where(IngestBatch.status == 'rolled_back')
+                )
+            ))
+            .order_by(IngestJob.created_at.desc())
+            .limit(1)
+        )
+        existing_job = result.scalar_one_or_none()
         
-        logger.info(f"Файл загружен: {file_path}")
+        if existing_job:
+            logger.info(f"Реестр {file.filename} уже загружен задачей {existing_job.id}, пропускаем")
+
+            # Тот же файл под другим именем сохранился отдельной копией - удаляем ее,
+            # если этот путь не принадлежит другой задаче
+            if str(file_path) != existing_job.file_path:
+                owner = await db.execute(
+                    select(IngestJob.id).where(IngestJob.file_path == str(file_path)).limit(1)
+                )
+                if owner.first() is None:
+                    file_path.unlink(missing_ok=True)
+
+            return {
+                "job_id": existing_job.id,
+                "status": existing_job.status,
+                "file_path": existing_job.file_path,
+                "duplicate": True,
+                "message": "Этот файл уже был загружен"
+            }
+        
+        # Создаем задачу загрузки
+        job = IngestJob(
+            id=str(uuid.uuid4()),
+            filename=file.filename,
+            file_path=str(file_path),
+            file_hash=file_hash,
+            file_size=file_size,
+            mode=mode,
+            status='queued'
+        )
+        db.add(job)
+        await db.commit()
         
-        # Парсим и сохраняем в БД
-        added_count, error_count = await read_excel_to_db(str(file_path), db)
+        enqueue_ingest_job(job.id)
         
         return {
-            "message": "Файл успешно обработан",
+            "job_id": job.id,
+            "status": job.status,
             "file_path": str(file_path),
-            "added_count": added_count,
-            "error_count": error_count
+            "duplicate": False,
+            "message": "Файл принят, загрузка запущена"
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке файла: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка обработки файла: {str(e)}")
+
+
+@router.post("/upload/preview")
+async def preview_upload(
+    file: UploadFile = File(...),
+    rows: int = Query(50, ge=1, le=1000),
+    sample: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Пробный разбор реестра без загрузки в БД.
+    
+    Query параметры:
+    - rows: сколько первых строк прочитать и провалидировать
+    - sample: сколько ИИН из прочитанных строк проверить на дубликаты в БД
+    """
+    if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail="Поддерживаются только файлы Excel (.xlsx, .xls), CSV (.csv) и Parquet (.parquet)"
+        )
+    
+    preview_dir = Path(settings.UPLOAD_PATH) / "preview"
+    file_path, _, _ = await spool_upload(
+        file,
+        preview_dir,
+        f"{uuid.uuid4().hex}{Path(file.filename).suffix.lower()}"
+    )
+    
+    try:
+        preview = await preview_registry(str(file_path), db, rows, sample)
+        return {"filename": file.filename, **preview}
+        
     except ValueError as e:
-        logger.error(f"Ошибка валидации: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Ошибка при загрузке файла: {e}")
+        logger.error(f"Ошибка при предпросмотре файла: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка обработки файла: {str(e)}")
+    finally:
+        file_path.unlink(missing_ok=True)
+
 
+@router.get("/upload/{job_id}/status")
+async def get_upload_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Получает статус и прогресс задачи загрузки реестра.
+    """
+    job = await db.get(IngestJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    elapsed = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "mode": job.mode,
+        "batch_id": job.batch_id,
+        "status": job.status,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "rows_updated": job.rows_updated,
+        "rows_unchanged": job.rows_unchanged,
+        "rows_skipped": job.rows_skipped,
+        "rows_failed": job.rows_failed,
+        "rows_per_second": round(job.rows_parsed / elapsed, 1) if elapsed > 0 else 0,
+        "error": job.error,
+        "error_report_url": f"/api/v1/upload/{job.id}/errors" if job.error_report_path else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+@router.get("/upload/{job_id}/errors")
+async def get_upload_errors(
+    job_id: str,
+    db: AsyncSession = Depends(get_database)
+):
+    """
+    Отдает CSV отчет об отбракованных строках: номер строки, ИИН и причина.
+    """
+    job = await db.get(IngestJob, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    if not job.error_report_path or not Path(job.error_report_path).exists():
+        raise HTTPException(status_code=404, detail="Отчет об ошибках не найден")
+    
+    return FileResponse(
+        path=job.error_report_path,
+        media_type="text/csv",
+        filename=f"errors_{Path(job.filename).stem}.csv"
+    )
@@ -8,6 +8,15 @@ class Settings(BaseSettings):
     UPLOAD_PATH: str = "./data/uploads"
     EXPORT_PATH: str = "./data/exports"
     TTS_ENGINE: str = "espeak-ng"
+    INGEST_CHUNK_SIZE: int = 2000
+    INGEST_VALIDATE_IIN_CHECKSUM: bool = True
+    EXPORT_BATCH_SIZE: int = 2000
+    EXPORT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    EXPORT_CACHE_MAX_AGE_HOURS: int = 24
+    EXPORT_BUNDLE_WORKERS: int = 0
+    COUNT_CACHE_APPROX_TTL_SECONDS: int = 60
+    ANALYTICS_CACHE_TTL_SECONDS: int = 5
+    ANALYTICS_STREAM_HEARTBEAT_SECONDS: int = 15
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.versioning import get_data_versions, local_data_version
+from app.config import settings
+
+# Сколько разных запросов аналитики держать в кэше
+ANALYTICS_CACHE_SIZE = 256
+
+# (имя, параметры) -> (версии данных в БД, версия данных процесса, ответ, время проверки)
+_analytics_cache: OrderedDict[tuple, tuple[dict, tuple, Any, float]] = OrderedDict()
+
+# Запросы, которые сейчас считаются: остальные такие же ждут их результат
+_inflight: dict[tuple, asyncio.Future] = {}
+
+# hits - ответ из кэша, misses - ответ посчитан или сверен с БД,
+# coalesced - запрос дождался такого же запроса, который уже считался
+cache_stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+
+def analytics_cache_info() -> dict:
+    """Счетчики попаданий и размер кэша аналитики."""
+    return {**cache_stats, 'entries': len(_analytics_cache), 'ttl_seconds': settings.ANALYTICS_CACHE_TTL_SECONDS}
+
+
+async def cached_analytics(
+    db: AsyncSession,
+    name: str,
+    params: dict,
+    compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Возвращает ответ аналитики из кэша или считает его через compute.
+
+    Ответ из кэша отдается без обращения к БД, пока он моложе
+    settings.ANALYTICS_CACHE_TTL_SECONDS и этот процесс не записывал
+    clients/call_records. После этого версии данных сверяются с БД
+    (изменения из других процессов) и ответ пересчитывается, только если
+    данные изменились. Одинаковые запросы, пришедшие во время подсчета,
+    ждут его результат, а не считают заново.
+
+    Args:
+        db: Сессия БД
+        name: Имя ответа (statistics, timeseries)
+        params: Параметры запроса, часть ключа кэша
+        compute: Подсчет ответа
+
+    Returns:
+        Any: Ответ compute
+    """
+    if settings.ANALYTICS_CACHE_TTL_SECONDS <= 0:
+        return await compute()
+
+    key = (name, tuple(sorted(params.items())))
+
+    cached = _analytics_cache.get(key)
+    if (
+        cached is not None
+        and cached[1] == local_data_version()
+        and time.monotonic() - cached[3] <= settings.ANALYTICS_CACHE_TTL_SECONDS
+    ):
+        cache_stats['hits'] += 1
+        _analytics_cache.move_to_end(key)
+        return cached[2]
+
+    while key in _inflight:
+        future = _inflight[key]
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Запрос, который считал ответ, отменен (клиент отключился) - считаем сами
+            if future.cancelled():
+                continue
+            raise
+        cache_stats['coalesced'] += 1
+        return result
+
+    cache_stats['misses'] += 1
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        # Версии берутся до подсчета: запись во время подсчета сделает ответ устаревшим
+        local_version = local_data_version()
+        versions = await get_data_versions(db)
+
+        cached = _analytics_cache.get(key)
+        if cached is not None and cached[0] == versions:
+            result = cached[2]
+        else:
+            result = await compute()
+
+        _analytics_cache[key] = (versions, local_version, result, time.monotonic())
+        _analytics_cache.move_to_end(key)
+        while len(_analytics_cache) > ANALYTICS_CACHE_SIZE:
+            _analytics_cache.popitem(last=False)
+
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Ошибку получают ожидающие запросы, без них asyncio пишет ее в лог
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
@@ -0,0 +1,143 @@
+from typing import Optional
+from sqlalchemy import select, func, case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.models.client import Client
+from app.utils.debt_buckets import OVERDUE_BUCKETS, AMOUNT_BANDS, bucket_case
+
+# Разбивки: название параметра -> столбец clients
+BREAKDOWN_DIMENSIONS = {
+    'creditor': Client.creditor,
+    'overdue': Client.overdue_bucket,
+    'amount': Client.amount_band,
+}
+
+# Порядок строк для интервалов (кредиторы - по алфавиту)
+DIMENSION_ORDER = {
+    'overdue': [name for name, _ in OVERDUE_BUCKETS],
+    'amount': [name for name, _ in AMOUNT_BANDS],
+}
+
+# Название группы для клиентов без интервала (не заполнен до запуска)
+UNKNOWN_GROUP = 'unknown'
+
+# Счетчики группы: категории результата звонка считаются отдельно, ignore
+# (нет ответа) - не отказ
+_COUNTERS = ('clients', 'called', 'promise', 'refusal', 'ignore', 'wrong_number')
+
+
+def backfill_debt_buckets(connection) -> None:
+    """
+    Заполняет интервалы просрочки и суммы у клиентов, где они пустые
+    (записаны до появления столбцов, добавленных через ensure_schema).
+
+    Вызывается при старте приложения через run_sync после ensure_schema.
+    """
+    table = Client.__table__
+    result = connection.execute(
+        update(table)
+        .where((table.c.overdue_bucket.is_(None)) | (table.c.amount_band.is_(None)))
+        .values(
+            overdue_bucket=bucket_case(table.c.days_overdue, OVERDUE_BUCKETS),
+            amount_band=bucket_case(table.c.amount, AMOUNT_BANDS)
+        )
+    )
+    if result.rowcount:
+        logger.info(f"Заполнены интервалы просрочки и суммы у клиентов: {result.rowcount}")
+
+
+def _metrics(counters: list[int]) -> dict:
+    """Счетчики группы и доли от клиентов, которым звонили, в процентах."""
+    metrics = dict(zip(_COUNTERS, counters))
+    called = metrics['called']
+    for name in _COUNTERS[2:]:
+        metrics[f"{name}_rate"] = (metrics[name] / called * 100) if called > 0 else 0
+    return metrics
+
+
+def _add(target: list[int], counters: tuple) -> None:
+    for i, value in enumerate(counters):
+        target[i] += value
+
+
+def _ordered_keys(dimension: str, keys) -> list:
+    order = DIMENSION_ORDER.get(dimension)
+    ordered = sorted(keys) if order is None else [key for key in order if key in keys]
+    return ordered + [key for key in keys if key not in ordered]
+
+
+def _ordered(dimension: str, groups: dict) -> dict:
+    return {key: _metrics(groups[key]) for key in _ordered_keys(dimension, groups)}
+
+
+async def get_breakdown(
+    db: AsyncSession,
+    rows: str = 'creditor',
+    columns: str = 'overdue',
+    creditor: Optional[str] = None
+) -> dict:
+    """
+    Конверсия по кредиторам, интервалам просрочки и суммы долга.
+
+    Результат звонка - категория клиента (по последнему звонку). Все таблицы
+    строятся из одного GROUP BY по (creditor, overdue_bucket, amount_band),
+    который читается из индекса ix_clients_breakdown без обращения к таблице.
+
+    Args:
+        db: Сессия БД
+        rows: Разбивка строк матрицы из BREAKDOWN_DIMENSIONS
+        columns: Разбивка столбцов матрицы из BREAKDOWN_DIMENSIONS
+        creditor: Только клиенты этого кредитора
+
+    Returns:
+        dict: "total", "by_creditor", "by_overdue", "by_amount" и "matrix"
+        {строка: {столбец: показатели}}
+    """
+    for dimension in (rows, columns):
+        if dimension not in BREAKDOWN_DIMENSIONS:
+            raise ValueError(f"Неизвестная разбивка: {dimension}")
+    if rows == columns:
+        raise ValueError("Строки и столбцы матрицы должны быть разными разбивками")
+
+    category = Client.category
+    query = (
+        select(
+            *BREAKDOWN_DIMENSIONS.values(),
+            func.count(),
+            func.count(category),
+            func.sum(case((category == 'promise', 1), else_=0)),
+            func.sum(case((category == 'refusal', 1), else_=0)),
+            func.sum(case((category == 'ignore', 1), else_=0)),
+            func.sum(case((category == 'wrong_number', 1), else_=0)),
+        )
+        .group_by(*BREAKDOWN_DIMENSIONS.values())
+    )
+    if creditor is not None:
+        query = query.where(Client.creditor == creditor)
+
+    dimensions = list(BREAKDOWN_DIMENSIONS)
+    total = [0] * len(_COUNTERS)
+    groups: dict[str, dict] = {dimension: {} for dimension in dimensions}
+    matrix: dict = {}
+
+    for row in await db.execute(query):
+        keys = dict(zip(dimensions, (key or UNKNOWN_GROUP for key in row[:len(dimensions)])))
+        counters = tuple(value or 0 for value in row[len(dimensions):])
+
+        _add(total, counters)
+        for dimension in dimensions:
+            _add(groups[dimension].setdefault(keys[dimension], [0] * len(_COUNTERS)), counters)
+        _add(matrix.setdefault(keys[rows], {}).setdefault(keys[columns], [0] * len(_COUNTERS)), counters)
+
+    return {
+        "total": _metrics(total),
+        **{f"by_{dimension}": _ordered(dimension, groups[dimension]) for dimension in dimensions},
+        "matrix": {
+            "rows": rows,
+            "columns": columns,
+            "cells": {
+                key: _ordered(columns, matrix[key])
+                for key in _ordered_keys(rows, matrix)
+            }
+        }
+    }
@@ -5,6 +5,7 @@ from loguru import logger
 from app.models.client import Client
 from app.models.call_record import CallRecord
 from app.core.tts import generate_tts
+from app.core.events import publish_event
 from ml.stt_engine import recognize_audio
 from ml.classifier_engine import classify_response
 
@@ -145,6 +146,18 @@ async def process_response_audio(
         
         logger.info(f"Обработка завершена для клиента {client_id}: категория={category}")
         
+        # Новый классифицированный звонок для живых дашбордов
+        publish_event('call', {
+            "call_record_id": call_record.id,
+            "client_id": client_id,
+            "fio": client.fio,
+            "creditor": client.creditor,
+            "category": category,
+            "confidence": call_record.confidence,
+            "detected_language": detected_language,
+            "created_at": call_record.created_at
+        })
+        
         return {
             "status": "completed",
             "client_id": client_id,
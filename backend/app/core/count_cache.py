@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.versioning import get_data_versions
+from app.config import settings
+
+# Режимы подсчета total в списках: exact - точное значение (из кэша, если данные
+# не менялись), approximate - допускается значение не старше
+# settings.COUNT_CACHE_APPROX_TTL_SECONDS, none - total не считается
+COUNT_MODES = ('exact', 'approximate', 'none')
+
+# Сколько разных фильтров держать в кэше
+COUNT_CACHE_SIZE = 256
+
+# (список, фильтры) -> (версии данных, количество, время подсчета)
+_count_cache: OrderedDict[tuple, tuple[dict, int, float]] = OrderedDict()
+
+
+async def cached_count(
+    db: AsyncSession,
+    name: str,
+    filters: dict,
+    count_query: Select,
+    mode: str = 'exact'
+) -> Optional[int]:
+    """
+    Возвращает количество строк списка с кэшированием по фильтрам.
+    
+    Значение в кэше привязано к версиям данных clients/call_records: любая
+    запись в эти таблицы делает точное значение устаревшим.
+    
+    Args:
+        db: Сессия БД
+        name: Имя списка (clients, history)
+        filters: Фильтры списка, часть ключа кэша
+        count_query: Запрос SELECT count(...) с теми же фильтрами
+        mode: Режим из COUNT_MODES
+        
+    Returns:
+        int: Количество строк, None в режиме none
+    """
+    if mode == 'none':
+        return None
+    
+    key = (name, tuple(sorted(filters.items())))
+    cached = _count_cache.get(key)
+    
+    if cached is not None:
+        versions, count, computed_at = cached
+        fresh = time.monotonic() - computed_at <= settings.COUNT_CACHE_APPROX_TTL_SECONDS
+        if mode == 'approximate' and fresh:
+            _count_cache.move_to_end(key)
+            return count
+    
+    current_versions = await get_data_versions(db)
+    if cached is not None and cached[0] == current_versions:
+        _count_cache.move_to_end(key)
+        return cached[1]
+    
+    count = await db.scalar(count_query)
+    
+    _count_cache[key] = (current_versions, count, time.monotonic())
+    _count_cache.move_to_end(key)
+    while len(_count_cache) > COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+    
+    return count
@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from loguru import logger
+from app.utils.json_response import dumps
+
+# Сколько событий может ждать отправки одному подписчику. Подписчик, который
+# не успевает их забирать, пропускает накопленное и получает событие resync.
+EVENT_QUEUE_SIZE = 256
+
+_subscribers: set[asyncio.Queue] = set()
+_last_event_id = 0
+
+
+def format_sse(event: str, data, event_id: Optional[int] = None) -> bytes:
+    """Одно событие в формате Server-Sent Events, data - объект или уже готовый JSON."""
+    body = data if isinstance(data, bytes) else dumps(data)
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + body + b"\n\n"
+
+
+def publish_event(event: str, data: dict) -> None:
+    """
+    Рассылает событие всем подписчикам /analytics/stream.
+
+    Событие сериализуется один раз, подписчики получают готовые байты.
+    Не блокирует: переполненная очередь подписчика очищается и в нее
+    кладется resync, по которому поток заново отправляет снимок статистики.
+    """
+    global _last_event_id
+
+    if not _subscribers:
+        return
+
+    _last_event_id += 1
+    message = format_sse(event, data, _last_event_id)
+
+    for queue in _subscribers:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Подписчик потока аналитики не успевает за событиями, отправляется resync")
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+@contextmanager
+def subscribe() -> Iterator[asyncio.Queue]:
+    """
+    Подписка на события: очередь с готовыми SSE сообщениями.
+
+    None в очереди означает, что события были пропущены и клиенту нужен новый снимок.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    _subscribers.add(queue)
+    try:
+        yield queue
+    finally:
+        _subscribers.discard(queue)
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional
+from sqlalchemy import select, func, and_, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.models.client import Client
+from app.models.call_record import CallRecord
+from app.config import settings
+
+# Колонки выгрузки клиентов в порядке EXPORT_HEADERS
+CLIENT_EXPORT_COLUMNS = (
+    Client.fio,
+    Client.iin,
+    Client.creditor,
+    Client.amount,
+    Client.days_overdue,
+    Client.phone,
+    func.coalesce(Client.category, 'не обработано').label('category')
+)
+
+
+# Колонки машинных выгрузок (CSV, NDJSON): имена полей API, категория как есть
+CLIENT_EXPORT_FIELDS = (
+    Client.id,
+    Client.fio,
+    Client.iin,
+    Client.creditor,
+    Client.amount,
+    Client.days_overdue,
+    Client.phone,
+    Client.status,
+    Client.category
+)
+
+
+# Виды выгрузки: basic - только поля клиента, wide - плюс последний звонок
+EXPORT_VIEWS = ('basic', 'wide')
+
+
+def latest_call_subquery():
+    """
+    Звонки клиентов с номером от последнего к первому (row_number() = 1 - последний).
+    """
+    return select(
+        CallRecord.client_id,
+        CallRecord.category.label('call_category'),
+        CallRecord.confidence,
+        CallRecord.detected_language,
+        CallRecord.call_metadata['promised_date'].as_string().label('promised_date'),
+        CallRecord.transcript,
+        CallRecord.created_at.label('called_at'),
+        func.row_number().over(
+            partition_by=CallRecord.client_id,
+            order_by=(CallRecord.created_at.desc(), CallRecord.id.desc())
+        ).label('call_rank')
+    ).subquery('latest_call')
+
+
+def build_export_query(
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    columns: tuple = CLIENT_EXPORT_COLUMNS,
+    view: str = 'basic'
+) -> Select:
+    """
+    Строит запрос выгрузки клиентов: только нужные колонки, без ORM объектов.
+    
+    В виде wide к каждому клиенту присоединяется его последний звонок одним
+    проходом по call_records (оконная функция), без запроса на каждого клиента.
+    """
+    if view not in EXPORT_VIEWS:
+        raise ValueError(f"Неизвестный вид выгрузки: {view}")
+    
+    query = select(*columns)
+    
+    if view == 'wide':
+        latest = latest_call_subquery()
+        query = query.add_columns(
+            latest.c.call_category,
+            latest.c.confidence,
+            latest.c.detected_language,
+            latest.c.promised_date,
+            latest.c.transcript,
+            latest.c.called_at
+        ).outerjoin(
+            latest,
+            and_(latest.c.client_id == Client.id, latest.c.call_rank == 1)
+        )
+    
+    if status:
+        query = query.where(Client.status == status)
+    
+    if category:
+        query = query.where(Client.category == category)
+    
+    return query.order_by(Client.created_at.desc(), Client.id.desc())
+
+
+async def stream_rows(
+    db: AsyncSession,
+    query: Select,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[list[tuple]]:
+    """
+    Отдает результат запроса пачками через серверный курсор (yield_per).
+    
+    В памяти держится только текущая пачка строк.
+    """
+    result = await db.stream(
+        query.execution_options(yield_per=batch_size or settings.EXPORT_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+async def stream_csv(query: Select) -> AsyncIterator[bytes]:
+    """
+    Потоковая CSV выгрузка: заголовок и затем по куску на каждую пачку из БД.
+    
+    Сессия открывается внутри генератора, потому что ответ отдается уже
+    после выхода из обработчика запроса.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow([column.key for column in query.selected_columns])
+    yield buffer.getvalue().encode('utf-8')
+    
+    async with AsyncSessionLocal() as session:
+        async for rows in stream_rows(session, query):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+
+
+async def stream_ndjson(query: Select) -> AsyncIterator[bytes]:
+    """
+    Потоковая NDJSON выгрузка: по одному JSON объекту на строку.
+    """
+    keys = [column.key for column in query.selected_columns]
+    
+    async with AsyncSessionLocal() as session:
+        async for rows in stream_rows(session, query):
+            yield ''.join(
+                json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=str) + '\n'
+                for row in rows
+            ).encode('utf-8')
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.db.versioning import get_data_versions
+from app.core.export import stream_rows
+from app.utils.excel import export_to_excel, EXPORT_HEADERS
+from app.utils.bundle import export_bundle
+from app.config import settings
+
+# Блокировки по ключу кэша: один и тот же файл строится только одним запросом
+_build_locks: dict[str, asyncio.Lock] = {}
+
+
+def export_cache_dir() -> Path:
+    path = Path(settings.EXPORT_PATH) / "cache"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def export_cache_key(
+    db: AsyncSession,
+    query: Select,
+    export_format: str,
+    filters: dict
+) -> str:
+    """
+    Ключ кэша выгрузки: фильтры, колонки, формат и версии данных clients/call_records.
+    
+    Любой коммит, меняющий эти таблицы, увеличивает версию, и старый файл
+    перестает совпадать по ключу.
+    """
+    payload = {
+        'format': export_format,
+        'filters': filters,
+        'columns': [column.key for column in query.selected_columns],
+        'versions': await get_data_versions(db)
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def export_build_lock(key: str) -> asyncio.Lock:
+    return _build_locks.setdefault(key, asyncio.Lock())
+
+
+def get_cached_export(key: str, extension: str) -> Optional[Path]:
+    """
+    Возвращает готовый файл выгрузки из кэша или None.
+    
+    При попадании обновляется mtime файла - по нему считается LRU при вытеснении.
+    """
+    path = export_cache_dir() / f"{key}{extension}"
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def evict_export_cache(keep: Optional[Path] = None) -> int:
+    """
+    Вытесняет файлы из кэша выгрузок.
+    
+    Сначала удаляются файлы старше settings.EXPORT_CACHE_MAX_AGE_HOURS, затем,
+    пока общий размер больше settings.EXPORT_CACHE_MAX_BYTES, - давно не
+    использованные (по mtime). Файл keep не удаляется.
+    
+    Returns:
+        int: Количество удаленных файлов
+    """
+    max_age = settings.EXPORT_CACHE_MAX_AGE_HOURS * 3600
+    now = time.time()
+    
+    entries = []
+    for path in export_cache_dir().iterdir():
+        # Недописанные .part файлы принадлежат идущим выгрузкам
+        if not path.is_file() or path.name.startswith('.'):
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    
+    total_size = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if path == keep:
+            continue
+        if now - mtime <= max_age and total_size <= settings.EXPORT_CACHE_MAX_BYTES:
+            continue
+        path.unlink(missing_ok=True)
+        total_size -= size
+        removed += 1
+    
+    # Блокировки уже собранных файлов больше не нужны
+    for key in [key for key, lock in _build_locks.items() if not lock.locked()]:
+        del _build_locks[key]
+    
+    if removed:
+        logger.info(f"Из кэша выгрузок удалено файлов: {removed}")
+    return removed
+
+
+async def _get_or_build(
+    db: AsyncSession,
+    query: Select,
+    export_format: str,
+    filters: dict,
+    build: Callable[[Path], Awaitable[int]]
+) -> Optional[Path]:
+    """
+    Возвращает файл выгрузки из кэша или собирает его через build и кладет в кэш.
+    
+    build(path) пишет файл и возвращает количество строк; пустые выгрузки
+    в кэше не хранятся.
+    """
+    extension = f".{export_format}"
+    key = await export_cache_key(db, query, export_format, filters)
+    output_path = get_cached_export(key, extension)
+    if output_path is not None:
+        logger.info(f"Выгрузка {key[:12]} отдана из кэша")
+        return output_path
+    
+    async with export_build_lock(key):
+        # Пока ждали блокировку, файл мог собрать параллельный запрос
+        output_path = get_cached_export(key, extension)
+        if output_path is not None:
+            return output_path
+        
+        output_path = export_cache_dir() / f"{key}{extension}"
+        rows_written = await build(output_path)
+        
+        if rows_written == 0:
+            output_path.unlink(missing_ok=True)
+            return None
+        
+        evict_export_cache(keep=output_path)
+        return output_path
+
+
+async def build_cached_export(
+    db: AsyncSession,
+    query: Select,
+    filters: dict,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    headers: list[str] = EXPORT_HEADERS
+) -> Optional[Path]:
+    """
+    Возвращает Excel выгрузку из кэша или собирает ее и кладет в кэш.
+    
+    Returns:
+        Path: Файл выгрузки, None если под фильтры не попал ни один клиент
+    """
+    async def build(output_path: Path) -> int:
+        return await export_to_excel(stream_rows(db, query), str(output_path), headers, on_progress)
+    
+    return await _get_or_build(db, query, 'xlsx', filters, build)
+
+
+async def build_cached_bundle(
+    db: AsyncSession,
+    query: Select,
+    filters: dict,
+    headers: list[str] = EXPORT_HEADERS,
+    key_column: str = 'creditor'
+) -> Optional[Path]:
+    """
+    Возвращает из кэша или собирает ZIP архив с Excel книгой на каждого кредитора.
+    
+    Returns:
+        Path: Архив, None если под фильтры не попал ни один клиент
+    """
+    key_index = [column.key for column in query.selected_columns].index(key_column)
+    
+    async def build(output_path: Path) -> int:
+        return await export_bundle(stream_rows(db, query), str(output_path), headers, key_index)
+    
+    return await _get_or_build(db, query, 'zip', filters, build)
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import select, func
+from loguru import logger
+from app.db.session import AsyncSessionLocal
+from app.models.export_job import ExportJob
+from app.core.export import build_export_query
+from app.core.export_cache import build_cached_export
+from app.utils.excel import EXPORT_HEADERS, WIDE_EXPORT_HEADERS
+
+# Большие выгрузки собираются по одной, чтобы не отнимать БД у интерактивных запросов
+_worker_lock = asyncio.Lock()
+
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора
+_running_tasks: set[asyncio.Task] = set()
+
+
+def enqueue_export_job(job_id: str) -> None:
+    """Ставит задачу выгрузки в очередь фонового обработчика."""
+    task = asyncio.create_task(run_export_job(job_id))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+
+
+async def run_export_job(job_id: str) -> None:
+    """
+    Фоновая сборка Excel выгрузки с сохранением прогресса в export_jobs.
+
+    Файл собирается через кэш выгрузок: если данные не менялись, задача
+    сразу завершается готовым файлом.
+    """
+    async with _worker_lock:
+        async with AsyncSessionLocal() as session:
+            job = await session.get(ExportJob, job_id)
+            if not job:
+                logger.error(f"Задача выгрузки {job_id} не найдена")
+                return
+
+            query = build_export_query(
+                job.status_filter,
+                job.category_filter,
+                view=job.view
+            )
+            headers = WIDE_EXPORT_HEADERS if job.view == 'wide' else EXPORT_HEADERS
+
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            job.rows_written = 0
+            job.rows_total = await session.scalar(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            )
+            await session.commit()
+
+            async def on_progress(rows_written: int):
+                job.rows_written = rows_written
+                await session.commit()
+
+            try:
+                async with AsyncSessionLocal() as export_session:
+                    output_path = await build_cached_export(
+                        export_session,
+                        query,
+                        {'status': job.status_filter, 'category': job.category_filter},
+                        on_progress,
+                        headers
+                    )
+
+                if output_path is not None:
+                    job.file_path = str(output_path)
+                    job.file_size = output_path.stat().st_size
+                    # Файл отдан из кэша без пересборки
+                    if job.rows_written == 0:
+                        job.rows_written = job.rows_total
+
+                job.status = 'completed'
+                logger.info(f"Задача выгрузки {job_id} завершена: {job.rows_written} строк")
+
+            except Exception as e:
+                logger.error(f"Ошибка в задаче выгрузки {job_id}: {e}")
+                job.status = 'failed'
+                job.error = str(e)
+
+            job.finished_at = datetime.utcnow()
+            await session.commit()
+
+
+async def resume_export_jobs() -> None:
+    """Перезапускает выгрузки, прерванные остановкой приложения."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(ExportJob.id)
+            .where(ExportJob.status.in_(['queued', 'running']))
+            .order_by(ExportJob.created_at)
+        )
+        job_ids = result.scalars().all()
+
+    for job_id in job_ids:
+        logger.info(f"Возобновление задачи выгрузки {job_id}")
+        enqueue_export_job(job_id)
@@ -0,0 +1,290 @@
+import asyncio
+import csv
+from collections import Counter
+from typing import Awaitable, Callable, Iterator, Optional
+from sqlalchemy import select, insert, update, case
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.models.client import Client
+from app.models.ingest_batch import IngestBatch
+from app.db.rollups import apply_rollup_deltas, client_rollup_keys
+from app.utils.validation import validate_batch
+
+
+# Поля клиента, которые заполняются из реестра
+CLIENT_FIELDS = ('fio', 'iin', 'creditor', 'amount', 'days_overdue', 'phone')
+
+# Режимы загрузки: insert - существующие ИИН пропускаются,
+# upsert - существующие клиенты обновляются данными из реестра
+INGEST_MODES = ('insert', 'upsert')
+
+# Сколько ИИН проверяется одним запросом `WHERE iin IN (...)`: каждый ИИН -
+# отдельный параметр, а SQLite старше 3.32 допускает не больше 999 параметров
+IIN_LOOKUP_CHUNK_SIZE = 900
+
+
+def _iin_chunks(iins: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(iins), IIN_LOOKUP_CHUNK_SIZE):
+        yield iins[start:start + IIN_LOOKUP_CHUNK_SIZE]
+
+
+async def insert_clients_bulk(
+    rows: list[dict],
+    db: AsyncSession,
+    batch_id: Optional[int] = None
+) -> tuple[int, int]:
+    """
+    Вставляет пачку клиентов одним набором запросов и фиксирует транзакцию.
+
+    Существующие ИИН проверяются запросами `WHERE iin IN (...)` по
+    IIN_LOOKUP_CHUNK_SIZE ИИН, новые клиенты вставляются через executemany.
+
+    Args:
+        rows: Список словарей с полями CLIENT_FIELDS (уже приведенные к типам)
+        db: Сессия БД
+        batch_id: Загрузка (ingest_batches), к которой относятся новые клиенты
+
+    Returns:
+        tuple: (количество добавленных, количество пропущенных дубликатов)
+    """
+    if not rows:
+        return 0, 0
+
+    # Дубликаты внутри самой пачки: оставляем первое вхождение
+    unique_rows: dict[str, dict] = {}
+    for row in rows:
+        unique_rows.setdefault(row['iin'], row)
+    skipped_count = len(rows) - len(unique_rows)
+
+    # Запрос на часть пачки вместо SELECT на каждую строку
+    existing_iins = set()
+    for iins in _iin_chunks(list(unique_rows)):
+        result = await db.execute(select(Client.iin).where(Client.iin.in_(iins)))
+        existing_iins.update(result.scalars().all())
+
+    if existing_iins:
+        logger.warning(f"Пропущено клиентов с существующим ИИН: {len(existing_iins)}")
+        skipped_count += len(existing_iins)
+
+    new_rows = [
+        {**row, 'status': 'pending', 'batch_id': batch_id}
+        for iin, row in unique_rows.items()
+        if iin not in existing_iins
+    ]
+
+    if new_rows:
+        await db.execute(insert(Client.__table__), new_rows)
+        await apply_rollup_deltas(db, Counter(
+            key for row in new_rows for key in client_rollup_keys(row['creditor'], 'pending')
+        ))
+
+    await db.commit()
+
+    return len(new_rows), skipped_count
+
+
+def _dialect_insert(db: AsyncSession):
+    """INSERT с поддержкой ON CONFLICT для текущего диалекта БД."""
+    if db.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(Client.__table__)
+    return sqlite.insert(Client.__table__)
+
+
+async def upsert_clients_bulk(
+    rows: list[dict],
+    db: AsyncSession,
+    batch_id: Optional[int] = None,
+    seen_iins: Optional[set[str]] = None
+) -> dict:
+    """
+    Вставляет новых клиентов и обновляет существующих одним INSERT ... ON CONFLICT.
+
+    Статус и категория сбрасываются только если изменилась сумма долга,
+    иначе клиент, которому уже звонили, не попадает повторно в обзвон.
+    Неизменившиеся строки в запрос не попадают вовсе. Обновленные клиенты
+    остаются в той загрузке, из которой были добавлены впервые.
+
+    Дубликаты ИИН внутри файла обрабатываются как в insert_clients_bulk:
+    берется первая строка, остальные пропускаются.
+
+    Args:
+        rows: Список словарей с полями CLIENT_FIELDS (уже приведенные к типам)
+        db: Сессия БД
+        batch_id: Загрузка (ingest_batches), к которой относятся новые клиенты
+        seen_iins: ИИН из предыдущих пачек того же файла, пополняется ИИН этой пачки
+
+    Returns:
+        dict: Счетчики inserted, updated, unchanged, skipped (дубликаты внутри файла)
+    """
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    if not rows:
+        return stats
+
+    # Дубликаты внутри файла: оставляем первое вхождение
+    unique_rows: dict[str, dict] = {}
+    for row in rows:
+        if seen_iins is None or row['iin'] not in seen_iins:
+            unique_rows.setdefault(row['iin'], row)
+    stats['skipped'] = len(rows) - len(unique_rows)
+    if seen_iins is not None:
+        seen_iins.update(unique_rows)
+    if not unique_rows:
+        return stats
+
+    existing = {}
+    for iins in _iin_chunks(list(unique_rows)):
+        result = await db.execute(
+            select(*(getattr(Client, field) for field in CLIENT_FIELDS), Client.status)
+            .where(Client.iin.in_(iins))
+        )
+        existing.update((row.iin, row._asdict()) for row in result)
+
+    changed_rows = []
+    rollup_deltas = Counter()
+    for iin, row in unique_rows.items():
+        current = existing.get(iin)
+        if current is None:
+            stats['inserted'] += 1
+            rollup_deltas.update(client_rollup_keys(row['creditor'], 'pending'))
+        elif any(current[field] != row[field] for field in CLIENT_FIELDS):
+            stats['updated'] += 1
+            status = 'pending' if current['amount'] != row['amount'] else current['status']
+            rollup_deltas.subtract(client_rollup_keys(current['creditor'], current['status']))
+            rollup_deltas.update(client_rollup_keys(row['creditor'], status))
+        else:
+            stats['unchanged'] += 1
+            continue
+        changed_rows.append({**row, 'status': 'pending', 'batch_id': batch_id})
+
+    if changed_rows:
+        stmt = _dialect_insert(db)
+        debt_changed = Client.__table__.c.amount != stmt.excluded.amount
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['iin'],
+            set_={
+                'fio': stmt.excluded.fio,
+                'creditor': stmt.excluded.creditor,
+                'amount': stmt.excluded.amount,
+                'days_overdue': stmt.excluded.days_overdue,
+                'phone': stmt.excluded.phone,
+                'overdue_bucket': stmt.excluded.overdue_bucket,
+                'amount_band': stmt.excluded.amount_band,
+                'status': case((debt_changed, 'pending'), else_=Client.__table__.c.status),
+                'category': case((debt_changed, None), else_=Client.__table__.c.category)
+            }
+        )
+        await db.execute(stmt, changed_rows)
+        await apply_rollup_deltas(db, rollup_deltas)
+
+    await db.commit()
+
+    return stats
+
+
+def _append_error_report(report_path: str, errors: list[dict]) -> None:
+    """Дописывает отбракованные строки в CSV отчет об ошибках."""
+    with open(report_path, "a", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=';')
+        if f.tell() == 0:
+            writer.writerow(['Строка', 'ИИН', 'Причина'])
+        writer.writerows((error['row'], error['iin'], error['reason']) for error in errors)
+
+
+async def write_batches(
+    batches: Iterator[list[dict]],
+    db: AsyncSession,
+    on_progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+    mode: str = 'insert',
+    error_report_path: Optional[str] = None,
+    batch_id: Optional[int] = None,
+    resume_from: Optional[dict] = None
+) -> dict:
+    """
+    Пишет в БД пачки строк, которые отдает потоковый читатель реестра.
+
+    Читатель синхронный (openpyxl, csv), поэтому каждая следующая пачка
+    разбирается в отдельном потоке и не блокирует event loop. Перед записью
+    пачка целиком проходит validate_batch.
+
+    Args:
+        batches: Итератор пачек сырых строк с полями CLIENT_FIELDS
+        db: Сессия БД
+        on_progress: Callback, вызывается после каждой записанной пачки
+        mode: Режим загрузки из INGEST_MODES
+        error_report_path: CSV файл, куда пишутся отбракованные строки с причинами
+        batch_id: Загрузка (ingest_batches), к которой относятся новые клиенты
+        resume_from: Счетчики прерванного запуска: первые resume_from['parsed']
+            строк уже записаны и пропускаются, счетчики продолжаются с этих значений
+
+    Returns:
+        dict: Счетчики parsed, inserted, updated, unchanged, skipped (дубликаты),
+            failed (ошибки в строках)
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Неизвестный режим загрузки: {mode}")
+
+    stats = {'parsed': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    if resume_from:
+        stats.update(resume_from)
+    rows_to_skip = stats['parsed']
+
+    # ИИН, уже встреченные в файле: в режиме upsert повтор в следующей пачке
+    # иначе перезаписал бы клиента, добавленного первой строкой
+    seen_iins: set[str] = set()
+
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            break
+
+        if rows_to_skip:
+            skipped_rows = min(rows_to_skip, len(batch))
+            rows_to_skip -= skipped_rows
+            batch = batch[skipped_rows:]
+            if not batch:
+                continue
+
+        prepared, errors = validate_batch(batch)
+        if errors:
+            logger.warning(f"Отбраковано строк в пачке: {len(errors)}")
+            stats['failed'] += len(errors)
+            if error_report_path:
+                await asyncio.to_thread(_append_error_report, error_report_path, errors)
+
+        if mode == 'upsert':
+            for key, value in (await upsert_clients_bulk(prepared, db, batch_id, seen_iins)).items():
+                stats[key] += value
+        else:
+            added, skipped = await insert_clients_bulk(prepared, db, batch_id)
+            stats['inserted'] += added
+            stats['skipped'] += skipped
+        stats['parsed'] += len(batch)
+
+        if on_progress:
+            await on_progress(stats)
+
+    return stats
+
+
+async def create_ingest_batch(
+    db: AsyncSession,
+    filename: str,
+    file_hash: Optional[str] = None,
+    mode: str = 'insert'
+) -> int:
+    """Регистрирует новую загрузку реестра и возвращает ее batch_id."""
+    batch = IngestBatch(filename=filename, file_hash=file_hash, mode=mode, status='active')
+    db.add(batch)
+    await db.commit()
+    return batch.id
+
+
+async def finish_ingest_batch(db: AsyncSession, batch_id: int, stats: dict) -> None:
+    """Сохраняет итоговые счетчики загрузки."""
+    await db.execute(
+        update(IngestBatch)
+        .where(IngestBatch.id == batch_id)
+        .values(rows_inserted=stats['inserted'], rows_updated=stats['updated'])
+    )
+    await db.commit()
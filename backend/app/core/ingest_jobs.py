@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import select
+from loguru import logger
+from app.db.session import AsyncSessionLocal
+from app.models.ingest_job import IngestJob
+from app.core.ingest import write_batches, create_ingest_batch, finish_ingest_batch
+from app.utils.registry import iter_registry_batches
+from app.config import settings
+
+# Загрузки пишут в одну БД, поэтому задачи выполняются строго по очереди
+_worker_lock = asyncio.Lock()
+
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора
+_running_tasks: set[asyncio.Task] = set()
+
+
+def enqueue_ingest_job(job_id: str) -> None:
+    """Ставит задачу загрузки реестра в очередь фонового обработчика."""
+    task = asyncio.create_task(run_ingest_job(job_id))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+
+
+async def run_ingest_job(job_id: str) -> None:
+    """
+    Фоновая загрузка реестра в БД с сохранением прогресса в ingest_jobs.
+
+    Состояние задачи пишется в отдельной сессии, чтобы откат пачки клиентов
+    не откатывал счетчики прогресса.
+    """
+    async with _worker_lock:
+        async with AsyncSessionLocal() as session:
+            job = await session.get(IngestJob, job_id)
+            if not job:
+                logger.error(f"Задача загрузки {job_id} не найдена")
+                return
+
+            # Прерванная задача продолжает с уже записанных строк, а не с начала
+            # файла: иначе уже добавленные клиенты считались бы дубликатами
+            # и загрузка недосчитывала бы добавленных
+            resume_from = None
+            if job.batch_id is not None and job.rows_parsed:
+                resume_from = {
+                    'parsed': job.rows_parsed,
+                    'inserted': job.rows_inserted,
+                    'updated': job.rows_updated,
+                    'unchanged': job.rows_unchanged,
+                    'skipped': job.rows_skipped,
+                    'failed': job.rows_failed
+                }
+                logger.info(f"Задача загрузки {job_id} продолжается со строки {job.rows_parsed}")
+
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            if resume_from is None:
+                job.rows_parsed = job.rows_inserted = job.rows_updated = job.rows_unchanged = 0
+                job.rows_skipped = job.rows_failed = 0
+            await session.commit()
+
+            async def on_progress(stats: dict):
+                job.rows_parsed = stats['parsed']
+                job.rows_inserted = stats['inserted']
+                job.rows_updated = stats['updated']
+                job.rows_unchanged = stats['unchanged']
+                job.rows_skipped = stats['skipped']
+                job.rows_failed = stats['failed']
+                await session.commit()
+
+            # Отчет об отбракованных строках пишется заново, при продолжении - дописывается
+            report_path = Path(settings.UPLOAD_PATH) / "reports" / f"{job_id}_errors.csv"
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            if resume_from is None:
+                report_path.unlink(missing_ok=True)
+            job.error_report_path = None
+
+            try:
+                async with AsyncSessionLocal() as ingest_session:
+                    # При перезапуске задачи клиенты дописываются в ту же загрузку
+                    if job.batch_id is None:
+                        job.batch_id = await create_ingest_batch(
+                            ingest_session,
+                            job.filename,
+                            job.file_hash,
+                            job.mode
+                        )
+                        await session.commit()
+
+                    batches = iter_registry_batches(job.file_path, settings.INGEST_CHUNK_SIZE)
+                    stats = await write_batches(
+                        batches,
+                        ingest_session,
+                        on_progress,
+                        job.mode,
+                        str(report_path),
+                        job.batch_id,
+                        resume_from
+                    )
+                    await finish_ingest_batch(ingest_session, job.batch_id, stats)
+
+                if report_path.exists():
+                    job.error_report_path = str(report_path)
+
+                job.status = 'completed'
+                logger.info(
+                    f"Задача загрузки {job_id} завершена: добавлено {job.rows_inserted}, "
+                    f"обновлено {job.rows_updated}, без изменений {job.rows_unchanged}, "
+                    f"пропущено {job.rows_skipped}, ошибок {job.rows_failed}"
+                )
+
+            except Exception as e:
+                logger.error(f"Ошибка в задаче загрузки {job_id}: {e}")
+                job.status = 'failed'
+                job.error = str(e)
+
+            job.finished_at = datetime.utcnow()
+            await session.commit()
+
+
+async def resume_ingest_jobs() -> None:
+    """
+    Перезапускает задачи, прерванные остановкой приложения.
+
+    Задача продолжается после последней записанной пачки. Если пачка
+    записалась, а прогресс нет, повтор безопасен: уже добавленные ИИН
+    будут пропущены как дубликаты.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(IngestJob.id)
+            .where(IngestJob.status.in_(['queued', 'running']))
+            .order_by(IngestJob.created_at)
+        )
+        job_ids = result.scalars().all()
+
+    for job_id in job_ids:
+        logger.info(f"Возобновление задачи загрузки {job_id}")
+        enqueue_ingest_job(job_id)
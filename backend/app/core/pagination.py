@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Режимы пагинации списков: offset - по номеру страницы, cursor - по курсору
+PAGINATION_MODES = ('offset', 'cursor')
+
+
+def encode_cursor(created_at: datetime, row_id: int, direction: str = 'next') -> str:
+    """Кодирует позицию (created_at, id) и направление в непрозрачный токен."""
+    payload = json.dumps({'t': created_at.isoformat(), 'i': row_id, 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int, str]:
+    """
+    Разбирает токен курсора.
+    
+    Raises:
+        ValueError: Токен поврежден или не выдан этим API
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload['t']), int(payload['i']), direction
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    created_column,
+    id_column,
+    page_size: int,
+    cursor: Optional[str] = None,
+    scalars: bool = True
+) -> tuple[list, Optional[str], Optional[str]]:
+    """
+    Страница списка, отсортированного по (created_at, id) от новых к старым, по курсору.
+    
+    Вместо OFFSET следующая страница начинается условием (created_at, id) < позиции
+    курсора, поэтому по составному индексу читается только сама страница,
+    и глубокие страницы стоят столько же, сколько первая.
+    
+    Args:
+        db: Сессия БД
+        query: Запрос с фильтрами, без сортировки и лимита
+        created_column: Колонка created_at
+        id_column: Колонка id
+        page_size: Размер страницы
+        cursor: Токен next_cursor/prev_cursor предыдущего ответа, None - первая страница
+        scalars: True - запрос ORM объектов, False - запрос колонок (строки
+            должны содержать поля created_at и id)
+        
+    Returns:
+        tuple: (объекты или строки страницы, next_cursor, prev_cursor)
+    """
+    key = tuple_(created_column, id_column)
+    direction = 'next'
+    
+    if cursor:
+        created_at, row_id, direction = decode_cursor(cursor)
+        position = tuple_(created_at, row_id)
+        query = query.where(key < position if direction == 'next' else key > position)
+    
+    if direction == 'next':
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column.asc(), id_column.asc())
+    
+    # Лишняя строка показывает, есть ли страница дальше в этом направлении
+    result = await db.execute(query.limit(page_size + 1))
+    items = list(result.scalars().unique().all() if scalars else result.all())
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    
+    if direction == 'prev':
+        items.reverse()
+    
+    if not items:
+        return items, None, None
+    
+    first, last = items[0], items[-1]
+    if direction == 'next':
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+    
+    next_cursor = encode_cursor(last.created_at, last.id, 'next') if has_next else None
+    prev_cursor = encode_cursor(first.created_at, first.id, 'prev') if has_prev else None
+    
+    return items, next_cursor, prev_cursor
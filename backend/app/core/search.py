@@ -0,0 +1,190 @@
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+# Токенайзер FTS5: без учета регистра и диакритики, индекс префиксов для поиска по началу слова
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+FTS_PREFIX = "2 3 4"
+
+# Сколько последних совпадений ранжируется по bm25. Ранжирование всех совпадений
+# по частому слову ("иван", "завтра") на миллионах строк занимает сотни мс.
+SEARCH_RANK_CANDIDATES = 1000
+
+# FTS5 таблицы и триггеры, которые держат их в синхронизации с clients и call_records.
+# Таблицы хранят свою копию текста, rowid совпадает с id исходной строки.
+# phone_local - номер без кода страны, чтобы искать по "701..." и "8701...".
+FTS_SCHEMA = {
+    'clients_fts': [
+        f"""CREATE VIRTUAL TABLE clients_fts USING fts5(
+            fio, iin, phone, phone_local,
+            tokenize = '{FTS_TOKENIZE}', prefix = '{FTS_PREFIX}'
+        )""",
+        """INSERT INTO clients_fts (rowid, fio, iin, phone, phone_local)
+            SELECT id, fio, iin, phone, substr(phone, 3) FROM clients""",
+    ],
+    'call_records_fts': [
+        f"""CREATE VIRTUAL TABLE call_records_fts USING fts5(
+            transcript,
+            tokenize = '{FTS_TOKENIZE}', prefix = '{FTS_PREFIX}'
+        )""",
+        """INSERT INTO call_records_fts (rowid, transcript)
+            SELECT id, transcript FROM call_records WHERE transcript IS NOT NULL""",
+    ],
+}
+
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts (rowid, fio, iin, phone, phone_local)
+        VALUES (new.id, new.fio, new.iin, new.phone, substr(new.phone, 3));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+        DELETE FROM clients_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF fio, iin, phone ON clients BEGIN
+        DELETE FROM clients_fts WHERE rowid = old.id;
+        INSERT INTO clients_fts (rowid, fio, iin, phone, phone_local)
+        VALUES (new.id, new.fio, new.iin, new.phone, substr(new.phone, 3));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS call_records_fts_insert AFTER INSERT ON call_records
+        WHEN new.transcript IS NOT NULL BEGIN
+        INSERT INTO call_records_fts (rowid, transcript) VALUES (new.id, new.transcript);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS call_records_fts_delete AFTER DELETE ON call_records BEGIN
+        DELETE FROM call_records_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS call_records_fts_update AFTER UPDATE OF transcript ON call_records BEGIN
+        DELETE FROM call_records_fts WHERE rowid = old.id;
+        INSERT INTO call_records_fts (rowid, transcript)
+        SELECT new.id, new.transcript WHERE new.transcript IS NOT NULL;
+    END""",
+]
+
+
+def setup_fulltext_search(connection) -> None:
+    """
+    Создает FTS5 таблицы и триггеры (только SQLite), новые таблицы заполняет из БД.
+
+    Вызывается при старте приложения через run_sync после create_all.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+
+    existing = set(connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ).scalars())
+
+    for table, statements in FTS_SCHEMA.items():
+        if table in existing:
+            continue
+        logger.info(f"Создание индекса полнотекстового поиска {table}")
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+
+    for statement in FTS_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def _query_tokens(query: str) -> list[str]:
+    return re.findall(r'\w+', query)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Превращает строку поиска в запрос FTS5: все слова по префиксу.
+
+    Строка из цифр и разделителей номера ("+7 701 123-45") ищется как один
+    префикс ИИН или телефона, с ведущей 8 ищется и вариант с 7. Для слов
+    добавляется вариант с точным совпадением: он не меняет набор результатов,
+    но поднимает точные совпадения в ранжировании. Каждый токен берется
+    в кавычки, поэтому синтаксис FTS5 из ввода не интерпретируется.
+
+    Returns:
+        str: Запрос для MATCH, None если в строке нет ни одного слова
+    """
+    compact = re.sub(r'[\s()+\-]', '', query)
+    if compact.isdigit():
+        # 8 в начале - либо ИИН, либо телефон в местном формате (+7)
+        if compact.startswith('8') and len(compact) > 1:
+            return f'"{compact}"* OR "7{compact[1:]}"*'
+        return f'"{compact}"*'
+
+    tokens = _query_tokens(query)
+    if not tokens:
+        return None
+    prefix = ' '.join(f'"{token}"*' for token in tokens)
+    exact = ' '.join(f'"{token}"' for token in tokens)
+    return f'({prefix}) OR ({exact})'
+
+
+def highlight(text_value: Optional[str], query: str, max_words: int = 16) -> Optional[str]:
+    """
+    Фрагмент текста вокруг первого найденного слова, найденные слова в <b></b>.
+    """
+    if not text_value:
+        return text_value
+
+    prefixes = tuple(token.lower() for token in _query_tokens(query))
+    words = text_value.split()
+    matched = [
+        i for i, word in enumerate(words)
+        if re.sub(r'^\W+', '', word).lower().startswith(prefixes)
+    ]
+
+    start = max(0, (matched[0] if matched else 0) - max_words // 4)
+    end = min(len(words), start + max_words)
+    fragment = [
+        f"<b>{word}</b>" if i in matched else word
+        for i, word in enumerate(words[start:end], start=start)
+    ]
+
+    return ('… ' if start > 0 else '') + ' '.join(fragment) + (' …' if end < len(words) else '')
+
+
+def fulltext_available(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == 'sqlite'
+
+
+async def search_client_ids(db: AsyncSession, query: str, limit: int) -> list[int]:
+    """
+    ID клиентов по ФИО, ИИН или телефону, от наиболее релевантных.
+
+    По релевантности сортируются SEARCH_RANK_CANDIDATES последних совпадений.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    result = await db.execute(
+        text(
+            "SELECT rowid FROM ("
+            "  SELECT rowid, rank FROM clients_fts WHERE clients_fts MATCH :match "
+            "  ORDER BY rowid DESC LIMIT :candidates"
+            ") ORDER BY rank LIMIT :limit"
+        ),
+        {'match': match, 'candidates': SEARCH_RANK_CANDIDATES, 'limit': limit}
+    )
+    return list(result.scalars())
+
+
+async def search_call_record_ids(db: AsyncSession, query: str, limit: int) -> list[int]:
+    """
+    ID звонков по словам транскрипта, от наиболее релевантных.
+
+    По релевантности сортируются SEARCH_RANK_CANDIDATES последних совпадений.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    result = await db.execute(
+        text(
+            "SELECT rowid FROM ("
+            "  SELECT rowid, rank FROM call_records_fts WHERE call_records_fts MATCH :match "
+            "  ORDER BY rowid DESC LIMIT :candidates"
+            ") ORDER BY rank LIMIT :limit"
+        ),
+        {'match': match, 'candidates': SEARCH_RANK_CANDIDATES, 'limit': limit}
+    )
+    return list(result.scalars())
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.call_bucket import CallBucket
+
+TIMESERIES_GRANULARITIES = ('hour', 'day', 'week', 'month')
+TIMESERIES_GROUPS = ('category', 'creditor', 'language')
+
+# Ограничение на количество точек ряда (год по часам - 8760)
+TIMESERIES_MAX_BUCKETS = 10000
+
+# Название группы для звонков без категории или языка (еще не классифицированы)
+UNKNOWN_GROUP = 'unknown'
+
+# Длина интервалов фиксированного размера (месяц считается по календарю)
+BUCKET_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Начало интервала, в который попадает момент времени. Неделя начинается с понедельника."""
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket_start(start: datetime, granularity: str) -> datetime:
+    """Начало следующего интервала."""
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + BUCKET_STEPS[granularity]
+
+
+def bucket_range(date_from: datetime, date_to: datetime, granularity: str) -> tuple[datetime, datetime, int]:
+    """
+    Границы целых интервалов, которые пересекаются с [date_from, date_to).
+
+    Returns:
+        tuple: (начало первого интервала, конец последнего, количество интервалов)
+
+    Raises:
+        ValueError: Неизвестный интервал, пустой диапазон или больше TIMESERIES_MAX_BUCKETS точек
+    """
+    if granularity not in TIMESERIES_GRANULARITIES:
+        raise ValueError(f"Неизвестный интервал: {granularity}")
+
+    # Время в БД хранится в UTC без часового пояса
+    if date_from.tzinfo is not None:
+        date_from = date_from.astimezone(timezone.utc).replace(tzinfo=None)
+    if date_to.tzinfo is not None:
+        date_to = date_to.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if date_from >= date_to:
+        raise ValueError("Начало диапазона должно быть раньше конца")
+
+    first = bucket_start(date_from, granularity)
+    last = bucket_start(date_to - timedelta(microseconds=1), granularity)
+    if granularity == 'month':
+        count = (last.year - first.year) * 12 + last.month - first.month + 1
+    else:
+        count = (last - first) // BUCKET_STEPS[granularity] + 1
+
+    if count > TIMESERIES_MAX_BUCKETS:
+        raise ValueError(f"Слишком много точек, максимум {TIMESERIES_MAX_BUCKETS}: увеличьте интервал")
+
+    return first, next_bucket_start(last, granularity), count
+
+
+def bucket_starts(date_from: datetime, date_to: datetime, granularity: str) -> list[datetime]:
+    """Начала интервалов, которые пересекаются с [date_from, date_to)."""
+    first, _, count = bucket_range(date_from, date_to, granularity)
+
+    if granularity == 'month':
+        starts = [first]
+        while len(starts) < count:
+            starts.append(next_bucket_start(starts[-1], granularity))
+        return starts
+
+    step = BUCKET_STEPS[granularity]
+    return [first + step * i for i in range(count)]
+
+
+async def get_timeseries(
+    db: AsyncSession,
+    granularity: str,
+    date_from: datetime,
+    date_to: datetime,
+    group_by: Optional[str] = None,
+    filters: Optional[dict] = None
+) -> list[dict]:
+    """
+    Ряд количества звонков из call_buckets, без обращения к call_records.
+
+    Часовой ряд читается из часовых интервалов, остальные - из дневных
+    и складываются в неделю или месяц. Диапазон расширяется до целых
+    интервалов, пустые интервалы возвращаются с нулями.
+
+    Args:
+        db: Сессия БД
+        granularity: Интервал из TIMESERIES_GRANULARITIES
+        date_from: Начало диапазона
+        date_to: Конец диапазона (не включается)
+        group_by: Разбивка из TIMESERIES_GROUPS
+        filters: Отбор {поле из TIMESERIES_GROUPS: значение}
+
+    Returns:
+        list: Точки {"start", "total"} и при group_by - "groups" {значение: количество}
+    """
+    if group_by is not None and group_by not in TIMESERIES_GROUPS:
+        raise ValueError(f"Неизвестная разбивка: {group_by}")
+
+    starts = bucket_starts(date_from, date_to, granularity)
+    source = 'hour' if granularity == 'hour' else 'day'
+    columns = [CallBucket.bucket_start]
+    if group_by:
+        columns.append(getattr(CallBucket, group_by))
+
+    query = (
+        select(func.sum(CallBucket.calls), *columns)
+        .where(CallBucket.granularity == source)
+        .where(CallBucket.bucket_start >= starts[0])
+        .where(CallBucket.bucket_start < next_bucket_start(starts[-1], granularity))
+        .group_by(*columns)
+    )
+    for field, value in (filters or {}).items():
+        if field not in TIMESERIES_GROUPS:
+            raise ValueError(f"Неизвестный фильтр: {field}")
+        if value is not None:
+            query = query.where(getattr(CallBucket, field) == ('' if value == UNKNOWN_GROUP else value))
+
+    points = {start: {"start": start, "total": 0} for start in starts}
+    if group_by:
+        for point in points.values():
+            point["groups"] = {}
+
+    for calls, start, *group in await db.execute(query):
+        if not calls:
+            continue
+        point = points[bucket_start(start, granularity)]
+        point["total"] += calls
+        if group_by:
+            group = group[0] or UNKNOWN_GROUP
+            point["groups"][group] = point["groups"].get(group, 0) + calls
+
+    return list(points.values())
@@ -0,0 +1,336 @@
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event, select, delete, insert, func, inspect
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from loguru import logger
+from app.models.client import Client
+from app.models.call_record import CallRecord
+from app.models.stat_rollup import StatRollup
+from app.models.call_bucket import CallBucket
+from app.core.events import publish_event
+
+# Разрезы счетчиков в stat_rollups:
+# status - клиенты по статусу, creditor - клиенты по кредитору,
+# creditor_completed - обработанные клиенты по кредитору,
+# category - звонки по категории
+ROLLUP_DIMENSIONS = ('status', 'creditor', 'creditor_completed', 'category')
+
+# Интервалы call_buckets: неделя и месяц складываются из дневных
+BUCKET_GRANULARITIES = ('hour', 'day')
+
+# Поля, от которых зависят счетчики
+CLIENT_ROLLUP_FIELDS = ('creditor', 'status')
+CALL_ROLLUP_FIELDS = ('created_at', 'category', 'detected_language')
+
+
+def client_rollup_keys(creditor: str, status: str) -> list[tuple[str, str]]:
+    """Счетчики, в которые входит клиент с данным кредитором и статусом."""
+    keys = [('status', status), ('creditor', creditor)]
+    if status == 'completed':
+        keys.append(('creditor_completed', creditor))
+    return keys
+
+
+def call_rollup_keys(created_at, category: Optional[str], language: Optional[str], creditor: str) -> tuple[list, list]:
+    """
+    Счетчики stat_rollups и интервалы call_buckets, в которые входит звонок.
+
+    Returns:
+        tuple: (ключи stat_rollups, ключи call_buckets)
+    """
+    rollup_keys = [('category', category)] if category is not None else []
+
+    # В SQLite агрегат по времени возвращается строкой
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    hour = created_at.replace(minute=0, second=0, microsecond=0)
+    dims = (category or '', creditor, language or '')
+    bucket_keys = [('hour', hour, *dims), ('day', hour.replace(hour=0), *dims)]
+
+    return rollup_keys, bucket_keys
+
+
+def _upsert(dialect_name: str, table, counter: str):
+    if dialect_name == 'postgresql':
+        stmt = postgresql.insert(table)
+    else:
+        stmt = sqlite.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={counter: table.c[counter] + stmt.excluded[counter]}
+    )
+
+
+def _rollup_params(deltas: Counter) -> list[dict]:
+    return [
+        {'dimension': dimension, 'key': key, 'value': value}
+        for (dimension, key), value in sorted(deltas.items())
+        if value
+    ]
+
+
+def _bucket_params(deltas: Counter) -> list[dict]:
+    return [
+        {
+            'granularity': granularity, 'bucket_start': bucket_start,
+            'category': category, 'creditor': creditor, 'language': language, 'calls': calls
+        }
+        for (granularity, bucket_start, category, creditor, language), calls in sorted(deltas.items())
+        if calls
+    ]
+
+
+def _delta_statements(dialect_name: str, deltas: Counter, bucket_deltas: Counter) -> list[tuple]:
+    """Upsert запросы с параметрами, которые прибавляют изменения к счетчикам."""
+    statements = []
+    params = _rollup_params(deltas)
+    if params:
+        statements.append((_upsert(dialect_name, StatRollup.__table__, 'value'), params))
+    params = _bucket_params(bucket_deltas)
+    if params:
+        statements.append((_upsert(dialect_name, CallBucket.__table__, 'calls'), params))
+    return statements
+
+
+async def apply_rollup_deltas(db: AsyncSession, deltas: Counter, bucket_deltas: Optional[Counter] = None) -> None:
+    """
+    Прибавляет изменения к счетчикам stat_rollups и call_buckets в текущей транзакции.
+
+    Нужен для массовых INSERT/UPDATE/DELETE в обход ORM (загрузка реестра,
+    откат загрузки): изменения ORM объектов учитываются автоматически при flush.
+    """
+    dialect_name = db.get_bind().dialect.name
+    for stmt, params in _delta_statements(dialect_name, deltas, bucket_deltas or Counter()):
+        await db.execute(stmt, params)
+    _pending_events(db.sync_session).update(deltas)
+
+
+def _pending_events(session: Session) -> Counter:
+    """Изменения счетчиков в текущей транзакции, которые уйдут в поток аналитики после коммита."""
+    return session.info.setdefault('rollup_events', Counter())
+
+
+def _has_changes(obj, keys: tuple) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[key].history.has_changes() for key in keys)
+
+
+def _previous_values(session: Session, obj, keys: tuple) -> tuple:
+    """Значения полей объекта до изменений в этой сессии."""
+    values = []
+    for key in keys:
+        history = inspect(obj).attrs[key].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            # Старое значение не было загружено (объект истек после rollback)
+            table = type(obj).__table__
+            return tuple(session.connection().execute(
+                select(*(table.c[name] for name in keys)).where(table.c.id == obj.id)
+            ).one())
+    return tuple(values)
+
+
+def _call_creditor(session: Session, call: CallRecord) -> str:
+    """Кредитор клиента звонка: из сессии, без запроса если клиент уже загружен."""
+    if call.client_id is None:
+        return call.client.creditor
+    client = session.identity_map.get(session.identity_key(Client, call.client_id))
+    if client is not None:
+        return client.creditor
+    return session.connection().execute(
+        select(Client.creditor).where(Client.id == call.client_id)
+    ).scalar_one()
+
+
+@event.listens_for(Session, "before_flush")
+def _track_rollups(session, flush_context, instances):
+    """
+    Переносит в счетчики изменения клиентов и звонков, которые записывает flush.
+
+    Счетчики обновляются в той же транзакции, что и сами данные: смены статусов
+    в call_pipeline и счетчики фиксируются или откатываются вместе.
+    """
+    deltas = Counter()
+    bucket_deltas = Counter()
+
+    def count_call(values: tuple, creditor: str, sign: int) -> None:
+        rollup_keys, bucket_keys = call_rollup_keys(*values, creditor)
+        for key in rollup_keys:
+            deltas[key] += sign
+        for key in bucket_keys:
+            bucket_deltas[key] += sign
+
+    for obj in session.new:
+        if isinstance(obj, Client):
+            deltas.update(client_rollup_keys(obj.creditor, obj.status or 'pending'))
+        elif isinstance(obj, CallRecord):
+            # Значение по умолчанию проставляем заранее, чтобы знать час звонка
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            count_call((obj.created_at, obj.category, obj.detected_language), _call_creditor(session, obj), 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Client) and _has_changes(obj, CLIENT_ROLLUP_FIELDS):
+            deltas.subtract(client_rollup_keys(*_previous_values(session, obj, CLIENT_ROLLUP_FIELDS)))
+            deltas.update(client_rollup_keys(obj.creditor, obj.status))
+        elif isinstance(obj, CallRecord) and _has_changes(obj, CALL_ROLLUP_FIELDS):
+            creditor = _call_creditor(session, obj)
+            count_call(_previous_values(session, obj, CALL_ROLLUP_FIELDS), creditor, -1)
+            count_call((obj.created_at, obj.category, obj.detected_language), creditor, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Client):
+            deltas.subtract(client_rollup_keys(*_previous_values(session, obj, CLIENT_ROLLUP_FIELDS)))
+        elif isinstance(obj, CallRecord):
+            count_call(_previous_values(session, obj, CALL_ROLLUP_FIELDS), _call_creditor(session, obj), -1)
+
+    connection = session.connection()
+    for stmt, params in _delta_statements(connection.dialect.name, deltas, bucket_deltas):
+        connection.execute(stmt, params)
+    _pending_events(session).update(deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_rollups(session):
+    """Отправляет зафиксированные изменения счетчиков подписчикам одним событием stats."""
+    changes = {}
+    for (dimension, key), value in session.info.pop('rollup_events', Counter()).items():
+        if value:
+            changes.setdefault(dimension, {})[key] = value
+    if changes:
+        publish_event('stats', changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollup_events(session):
+    session.info.pop('rollup_events', None)
+
+
+def _hour_start(dialect_name: str):
+    """Начало часа звонка в SQL."""
+    if dialect_name == 'postgresql':
+        return func.date_trunc('hour', CallRecord.created_at)
+    return func.strftime('%Y-%m-%d %H:00:00', CallRecord.created_at)
+
+
+async def aggregate_rollups(db: AsyncSession, clients_where=None, calls_where=None) -> tuple[Counter, Counter]:
+    """
+    Считает значения счетчиков агрегатами по clients и call_records.
+
+    Args:
+        db: Сессия БД
+        clients_where: Условие на клиентов (по умолчанию все)
+        calls_where: Условие на звонки (по умолчанию все)
+
+    Returns:
+        tuple: (счетчики stat_rollups, интервалы call_buckets)
+    """
+    counters = Counter()
+    buckets = Counter()
+
+    clients_query = select(Client.creditor, Client.status, func.count()).group_by(Client.creditor, Client.status)
+    if clients_where is not None:
+        clients_query = clients_query.where(clients_where)
+    for creditor, status, count in await db.execute(clients_query):
+        for key in client_rollup_keys(creditor, status):
+            counters[key] += count
+
+    hour = _hour_start(db.get_bind().dialect.name)
+    calls_query = (
+        select(hour, CallRecord.category, CallRecord.detected_language, Client.creditor, func.count())
+        .join(Client, Client.id == CallRecord.client_id)
+        .group_by(hour, CallRecord.category, CallRecord.detected_language, Client.creditor)
+    )
+    if calls_where is not None:
+        calls_query = calls_query.where(calls_where)
+    for created_at, category, language, creditor, count in await db.execute(calls_query):
+        rollup_keys, bucket_keys = call_rollup_keys(created_at, category, language, creditor)
+        for key in rollup_keys:
+            counters[key] += count
+        for key in bucket_keys:
+            buckets[key] += count
+
+    return counters, buckets
+
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    """
+    Пересчитывает stat_rollups и call_buckets из исходных таблиц одной транзакцией.
+
+    Счетчики очищаются до пересчета: в SQLite это сразу берет блокировку записи,
+    и изменения, сделанные во время пересчета, не теряются. Кредитор звонка
+    при пересчете берется текущий, а не на момент звонка.
+
+    Returns:
+        int: Количество записанных счетчиков и интервалов
+    """
+    await db.execute(delete(StatRollup))
+    await db.execute(delete(CallBucket))
+
+    counters, buckets = await aggregate_rollups(db)
+    rollup_params = _rollup_params(counters)
+    bucket_params = _bucket_params(buckets)
+    if rollup_params:
+        await db.execute(insert(StatRollup.__table__), rollup_params)
+    if bucket_params:
+        await db.execute(insert(CallBucket.__table__), bucket_params)
+    await db.commit()
+
+    logger.info(f"Счетчики статистики пересчитаны: {len(rollup_params)}, интервалов звонков: {len(bucket_params)}")
+    return len(rollup_params) + len(bucket_params)
+
+
+def _mismatches(stored: Counter, actual: Counter) -> dict:
+    return {
+        key: (stored[key], actual[key])
+        for key in sorted(set(stored) | set(actual))
+        if stored[key] != actual[key]
+    }
+
+
+async def check_rollups(db: AsyncSession) -> dict[tuple, tuple[int, int]]:
+    """
+    Сверяет счетчики и интервалы звонков с агрегатами по исходным таблицам.
+
+    Returns:
+        dict: Расхождения {(разрез, ключ) или (интервал, начало, категория, кредитор, язык):
+            (значение счетчика, фактическое значение)}
+    """
+    counters, buckets = await aggregate_rollups(db)
+
+    result = await db.execute(select(StatRollup.dimension, StatRollup.key, StatRollup.value))
+    stored_counters = Counter({(row.dimension, row.key): row.value for row in result})
+
+    result = await db.execute(select(CallBucket))
+    stored_buckets = Counter({
+        (bucket.granularity, bucket.bucket_start, bucket.category, bucket.creditor, bucket.language): bucket.calls
+        for bucket in result.scalars()
+    })
+
+    return {**_mismatches(stored_counters, counters), **_mismatches(stored_buckets, buckets)}
+
+
+async def ensure_rollups(db: AsyncSession) -> None:
+    """Заполняет счетчики при первом запуске на уже существующих данных."""
+    has_rollups = await db.scalar(select(StatRollup.dimension).limit(1))
+    has_clients = await db.scalar(select(Client.id).limit(1))
+    has_buckets = await db.scalar(select(CallBucket.granularity).limit(1))
+    has_calls = await db.scalar(select(CallRecord.id).limit(1))
+    if (has_rollups is None and has_clients is not None) or (has_buckets is None and has_calls is not None):
+        await rebuild_rollups(db)
+
+
+async def get_rollups(db: AsyncSession) -> dict[str, dict[str, int]]:
+    """Счетчики по разрезам {разрез: {ключ: значение}}, нулевые пропускаются."""
+    query = select(StatRollup.dimension, StatRollup.key, StatRollup.value).where(StatRollup.value != 0)
+
+    rollups = {dimension: {} for dimension in ROLLUP_DIMENSIONS}
+    for row in await db.execute(query.order_by(StatRollup.dimension, StatRollup.key)):
+        rollups.setdefault(row.dimension, {})[row.key] = row.value
+    return rollups
@@ -0,0 +1,71 @@
+from sqlalchemy import inspect, literal
+from loguru import logger
+from app.db.base import Base
+
+# Столбцы и индексы, добавленные в модели уже существующих таблиц.
+# create_all не меняет таблицы, которые уже есть в БД, поэтому в БД,
+# созданной раньше, они добавляются при старте через ensure_schema.
+ADDED_COLUMNS: dict[str, tuple[str, ...]] = {
+    'clients': ('batch_id', 'overdue_bucket', 'amount_band'),
+    'ingest_jobs': (
+        'file_hash', 'file_size', 'mode', 'rows_updated', 'rows_unchanged',
+        'error_report_path', 'batch_id'
+    ),
+    'export_jobs': ('view',),
+}
+
+ADDED_INDEXES: dict[str, tuple[str, ...]] = {
+    'clients': (
+        'ix_clients_batch_id', 'ix_clients_batch_id_status',
+        'ix_clients_created_at_id', 'ix_clients_status_created_at_id',
+        'ix_clients_breakdown'
+    ),
+    'ingest_jobs': ('ix_ingest_jobs_file_hash',),
+    'call_records': (
+        'ix_call_records_client_id_created_at',
+        'ix_call_records_created_at_id', 'ix_call_records_category_created_at_id'
+    ),
+}
+
+
+def _add_column_sql(connection, table_name: str, column) -> str:
+    """ALTER TABLE ... ADD COLUMN для столбца модели."""
+    dialect = connection.dialect
+    sql = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}"
+
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = literal(default.arg).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        sql += f" DEFAULT {value}"
+        if not column.nullable:
+            sql += " NOT NULL"
+
+    for foreign_key in column.foreign_keys:
+        sql += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+
+    return sql
+
+
+def ensure_schema(connection) -> None:
+    """
+    Добавляет в существующие таблицы столбцы ADDED_COLUMNS и индексы ADDED_INDEXES,
+    которых в них нет. Повторный запуск ничего не меняет.
+
+    Вызывается при старте приложения через run_sync после create_all.
+    """
+    inspector = inspect(connection)
+
+    for table_name, names in ADDED_COLUMNS.items():
+        table = Base.metadata.tables[table_name]
+        existing = {column['name'] for column in inspector.get_columns(table_name)}
+        for name in names:
+            if name not in existing:
+                logger.info(f"Добавление столбца {table_name}.{name}")
+                connection.exec_driver_sql(_add_column_sql(connection, table_name, table.c[name]))
+
+    for table_name, names in ADDED_INDEXES.items():
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        for index in Base.metadata.tables[table_name].indexes:
+            if index.name in names and index.name not in existing:
+                logger.info(f"Создание индекса {index.name}")
+                index.create(connection, checkfirst=True)
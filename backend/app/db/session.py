@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from app.config import settings
 
@@ -7,6 +8,19 @@ engine = create_async_engine(
     future=True
 )
 
+
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """
+        WAL журнал: длинные чтения (выгрузки) не блокируют запись, и наоборот.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -21,3 +35,8 @@ async def get_db():
         finally:
             await session.close()
 
+
+
+# Учет версий данных и счетчики статистики подключаются к сессиям при импорте
+from app.db import versioning  # noqa: E402,F401
+from app.db import rollups  # noqa: E402,F401
@@ -0,0 +1,85 @@
+from sqlalchemy import event, select
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.data_version import DataVersion
+
+# Таблицы, для которых ведется версия данных (ключи кэшей выгрузок и аналитики)
+VERSIONED_TABLES = ('clients', 'call_records')
+
+# Версии, зафиксированные этим процессом: быстрый признак "данные менялись"
+# без запроса к БД. Между процессами версии сверяются по таблице data_versions.
+_local_versions: dict[str, int] = {name: 0 for name in VERSIONED_TABLES}
+
+
+def _changed_tables(session: Session) -> set:
+    return session.info.setdefault('changed_tables', set())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    """Запоминает таблицы, которые меняют INSERT/UPDATE/DELETE через session.execute."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and table.name in VERSIONED_TABLES:
+        _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    """Запоминает таблицы объектов, которые будут записаны при flush."""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table in VERSIONED_TABLES and (obj not in session.dirty or session.is_modified(obj)):
+            _changed_tables(session).add(table)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session):
+    """
+    Увеличивает версии измененных таблиц в той же транзакции, что и сами изменения.
+    """
+    # Объекты, которые еще не сброшены в БД, запишутся при коммите
+    session.flush()
+
+    changed = session.info.get('changed_tables')
+    if not changed:
+        return
+
+    if session.get_bind().dialect.name == 'postgresql':
+        stmt = postgresql.insert(DataVersion.__table__)
+    else:
+        stmt = sqlite.insert(DataVersion.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': DataVersion.__table__.c.version + 1}
+    )
+    session.execute(stmt, [{'name': name, 'version': 1} for name in sorted(changed)])
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_versions(session):
+    for name in session.info.pop('changed_tables', ()):
+        _local_versions[name] += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session):
+    session.info.pop('changed_tables', None)
+
+
+def local_data_version() -> tuple:
+    """Версии данных, зафиксированные этим процессом."""
+    return tuple(_local_versions[name] for name in VERSIONED_TABLES)
+
+
+async def get_data_versions(db: AsyncSession) -> dict[str, int]:
+    """Текущие версии таблиц VERSIONED_TABLES из БД."""
+    result = await db.execute(
+        select(DataVersion.name, DataVersion.version)
+        .where(DataVersion.name.in_(VERSIONED_TABLES))
+    )
+    versions = {name: 0 for name in VERSIONED_TABLES}
+    versions.update({row.name: row.version for row in result})
+    return versions
@@ -0,0 +1,19 @@
+from app.models.client import Client
+from app.models.call_record import CallRecord
+from app.models.ingest_job import IngestJob
+from app.models.ingest_batch import IngestBatch
+from app.models.data_version import DataVersion
+from app.models.export_job import ExportJob
+from app.models.stat_rollup import StatRollup
+from app.models.call_bucket import CallBucket
+
+__all__ = [
+    "Client",
+    "CallRecord",
+    "IngestJob",
+    "IngestBatch",
+    "DataVersion",
+    "ExportJob",
+    "StatRollup",
+    "CallBucket"
+]
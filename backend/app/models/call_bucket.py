@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.base import Base
+
+
+class CallBucket(Base):
+    """
+    Количество звонков за час или день в разрезе категории, кредитора и языка.
+
+    Пустая строка в category/language - звонок еще не классифицирован.
+    """
+    __tablename__ = "call_buckets"
+
+    granularity = Column(String, primary_key=True)  # hour | day
+    bucket_start = Column(DateTime, primary_key=True)
+    category = Column(String, primary_key=True)
+    creditor = Column(String, primary_key=True)
+    language = Column(String, primary_key=True)
+    calls = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+
+
+class CallRecord(Base):
+    __tablename__ = "call_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False, index=True)
+    tts_text = Column(Text, nullable=True)
+    tts_audio_path = Column(String, nullable=True)
+    response_audio_path = Column(String, nullable=True)
+    transcript = Column(Text, nullable=True)
+    detected_language = Column(String, nullable=True)
+    category = Column(String, nullable=True)
+    confidence = Column(Float, nullable=True)
+    call_metadata = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    client = relationship("Client", back_populates="call_records")
+
+    __table_args__ = (
+        # Последний звонок клиента: окно по client_id с сортировкой по времени
+        Index("ix_call_records_client_id_created_at", "client_id", "created_at"),
+        # Пагинация истории по курсору (created_at, id), в том числе с фильтром по категории
+        Index("ix_call_records_created_at_id", "created_at", "id"),
+        Index("ix_call_records_category_created_at_id", "category", "created_at", "id"),
+    )
@@ -0,0 +1,36 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+from app.utils.debt_buckets import overdue_bucket_default, amount_band_default
+
+
+class Client(Base):
+    __tablename__ = "clients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fio = Column(String, nullable=False)
+    iin = Column(String, unique=True, index=True, nullable=False)
+    creditor = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    days_overdue = Column(Integer, nullable=False)
+    phone = Column(String, nullable=False)
+    status = Column(String, default='pending', nullable=False, index=True)
+    category = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+    batch_id = Column(Integer, ForeignKey("ingest_batches.id"), nullable=True, index=True)
+    # Интервалы просрочки и суммы для разбивки аналитики, считаются при вставке
+    overdue_bucket = Column(String, default=overdue_bucket_default, nullable=True)
+    amount_band = Column(String, default=amount_band_default, nullable=True)
+
+    call_records = relationship("CallRecord", back_populates="client", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_clients_batch_id_status", "batch_id", "status"),
+        # Пагинация по курсору (created_at, id), в том числе с фильтром по статусу
+        Index("ix_clients_created_at_id", "created_at", "id"),
+        Index("ix_clients_status_created_at_id", "status", "created_at", "id"),
+        # Разбивка /analytics/breakdown читается только из этого индекса
+        Index("ix_clients_breakdown", "creditor", "overdue_bucket", "amount_band", "category"),
+    )
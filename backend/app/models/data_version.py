@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.db.base import Base
+
+
+class DataVersion(Base):
+    """Счетчик изменений таблицы: увеличивается при каждом коммите, который ее меняет."""
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
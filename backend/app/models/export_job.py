@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from app.db.base import Base
+
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    id = Column(String, primary_key=True)
+    status_filter = Column(String, nullable=True)
+    category_filter = Column(String, nullable=True)
+    view = Column(String, default='basic', nullable=False)
+    status = Column(String, default='queued', nullable=False, index=True)
+    rows_total = Column(Integer, nullable=True)
+    rows_written = Column(Integer, default=0, nullable=False)
+    file_path = Column(String, nullable=True)
+    file_size = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
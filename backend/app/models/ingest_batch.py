@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.base import Base
+
+
+class IngestBatch(Base):
+    __tablename__ = "ingest_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    file_hash = Column(String, nullable=True, index=True)
+    mode = Column(String, default='insert', nullable=False)
+    status = Column(String, default='active', nullable=False, index=True)
+    rows_inserted = Column(Integer, default=0, nullable=False)
+    rows_updated = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    rolled_back_at = Column(DateTime, nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.db.base import Base
+
+
+class StatRollup(Base):
+    """
+    Счетчик статистики по разрезу: статусы клиентов, категории звонков,
+    звонки по дням, клиенты по кредиторам. Ведется вместе с изменениями данных.
+    """
+    __tablename__ = "stat_rollups"
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
@@ -60,20 +60,38 @@ class PaginationParams(BaseModel):
 
 class ClientListResponse(BaseModel):
     items: List[ClientResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class ClientSearchResponse(BaseModel):
+    query: str
+    items: List[ClientResponse]
 
 
 class CallRecordWithClient(CallRecordResponse):
     client: ClientResponse
 
 
+class CallSearchItem(CallRecordWithClient):
+    snippet: Optional[str] = None
+
+
+class CallSearchResponse(BaseModel):
+    query: str
+    items: List[CallSearchItem]
+
+
 class CallHistoryResponse(BaseModel):
     items: List[CallRecordWithClient]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
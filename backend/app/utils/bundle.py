@@ -0,0 +1,166 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Sequence
+from openpyxl import Workbook
+from loguru import logger
+from app.config import settings
+
+# Символы, недопустимые в именах файлов внутри архива
+UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def _spool_partitions(
+    spool_dir: Path,
+    rows: list[Sequence],
+    key_index: int,
+    spools: dict[str, Path]
+) -> None:
+    """
+    Раскладывает пачку строк по файлам партиций (по значению колонки key_index).
+
+    Строки дописываются в файл партиции pickle-кусками, типы значений
+    (даты, числа) сохраняются как есть.
+    """
+    partitions: dict[str, list] = {}
+    for row in rows:
+        partitions.setdefault(row[key_index] or '', []).append(row)
+
+    for key, partition in partitions.items():
+        if key not in spools:
+            spools[key] = spool_dir / f"{len(spools)}.pkl"
+        with open(spools[key], "ab") as f:
+            pickle.dump(partition, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_workbook_from_spool(spool_path: str, output_path: str, headers: list[str]) -> int:
+    """
+    Собирает write-only книгу из файла партиции. Выполняется в процессе пула.
+
+    Returns:
+        int: Количество записанных строк
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Клиенты")
+    sheet.append(headers)
+
+    rows_written = 0
+    with open(spool_path, "rb") as f:
+        while True:
+            try:
+                rows = pickle.load(f)
+            except EOFError:
+                break
+            for row in rows:
+                sheet.append(row)
+            rows_written += len(rows)
+
+    workbook.save(output_path)
+    return rows_written
+
+
+def bundle_filename(key: str, used: set) -> str:
+    """Имя книги в архиве по значению партиции, уникальное внутри архива."""
+    name = UNSAFE_FILENAME_CHARS.sub('_', key).strip(' .') or 'без_кредитора'
+    candidate = name
+    suffix = 2
+    while candidate.lower() in used:
+        candidate = f"{name}_{suffix}"
+        suffix += 1
+    used.add(candidate.lower())
+    return f"{candidate}.xlsx"
+
+
+def _zip_workbooks(workbooks: list[tuple[str, Path]], output_path: Path) -> None:
+    # xlsx уже сжат, повторное сжатие только тратит CPU
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in workbooks:
+            archive.write(path, arcname)
+
+
+async def export_bundle(
+    row_batches: AsyncIterator[list[Sequence]],
+    output_path: str,
+    headers: list[str],
+    key_index: int
+) -> int:
+    """
+    Экспортирует строки в ZIP архив с отдельной Excel книгой на каждое значение колонки.
+
+    Строки читаются из БД за один проход и по мере чтения раскладываются
+    по временным файлам партиций. Книги партиций собираются параллельно
+    в пуле процессов (settings.EXPORT_BUNDLE_WORKERS, не больше числа ядер),
+    затем складываются в архив. Архив пишется во временный файл и переименовывается.
+
+    Args:
+        row_batches: Асинхронный поток пачек строк в порядке headers
+        output_path: Путь для сохранения архива
+        headers: Заголовки колонок
+        key_index: Номер колонки, по которой строки делятся на книги
+
+    Returns:
+        int: Количество выгруженных строк
+    """
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f".{output.name}.part")
+
+    try:
+        with tempfile.TemporaryDirectory(dir=output.parent) as work_dir:
+            work_dir = Path(work_dir)
+            spools: dict[str, Path] = {}
+
+            rows_total = 0
+            async for rows in row_batches:
+                await asyncio.to_thread(_spool_partitions, work_dir, rows, key_index, spools)
+                rows_total += len(rows)
+
+            if rows_total == 0:
+                return 0
+
+            used_names: set = set()
+            workbooks = [
+                (bundle_filename(key, used_names), spool.with_suffix('.xlsx'))
+                for key, spool in sorted(spools.items())
+            ]
+
+            jobs = [
+                (str(spools[key]), str(path), headers)
+                for key, (_, path) in zip(sorted(spools), workbooks)
+            ]
+            
+            cpu_count = os.cpu_count() or 1
+            workers = min(settings.EXPORT_BUNDLE_WORKERS or cpu_count, cpu_count, len(jobs))
+            if workers <= 1:
+                # На одном ядре пул процессов только добавляет время на запуск
+                for job in jobs:
+                    await asyncio.to_thread(write_workbook_from_spool, *job)
+            else:
+                # spawn: дочерние процессы не наследуют потоки и соединения приложения
+                loop = asyncio.get_running_loop()
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as pool:
+                    await asyncio.gather(*(
+                        loop.run_in_executor(pool, write_workbook_from_spool, *job)
+                        for job in jobs
+                    ))
+
+            await asyncio.to_thread(_zip_workbooks, workbooks, tmp_path)
+
+        os.replace(tmp_path, output)
+        logger.info(f"Экспортировано {rows_total} строк в {len(workbooks)} книгах: {output_path}")
+
+        return rows_total
+
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте архива: {e}")
+        tmp_path.unlink(missing_ok=True)
+        raise
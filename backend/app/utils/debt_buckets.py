@@ -0,0 +1,52 @@
+from typing import Optional
+from sqlalchemy import case
+
+# Интервалы просрочки и суммы долга: (название, верхняя граница включительно).
+# Последний интервал без границы.
+OVERDUE_BUCKETS: tuple[tuple[str, Optional[int]], ...] = (
+    ('0-30', 30),
+    ('31-90', 90),
+    ('90+', None),
+)
+
+AMOUNT_BANDS: tuple[tuple[str, Optional[float]], ...] = (
+    ('0-50k', 50_000),
+    ('50k-200k', 200_000),
+    ('200k-1m', 1_000_000),
+    ('1m+', None),
+)
+
+
+def _bucket(value, buckets) -> str:
+    for name, upper in buckets:
+        if upper is None or value <= upper:
+            return name
+    return buckets[-1][0]
+
+
+def overdue_bucket(days_overdue: int) -> str:
+    """Интервал просрочки из OVERDUE_BUCKETS."""
+    return _bucket(days_overdue, OVERDUE_BUCKETS)
+
+
+def amount_band(amount: float) -> str:
+    """Интервал суммы долга из AMOUNT_BANDS."""
+    return _bucket(amount, AMOUNT_BANDS)
+
+
+def bucket_case(column, buckets):
+    """То же разбиение в SQL (CASE), для заполнения уже загруженных клиентов."""
+    return case(
+        *((column <= upper, name) for name, upper in buckets if upper is not None),
+        else_=buckets[-1][0]
+    )
+
+
+def overdue_bucket_default(context) -> str:
+    """Значение столбца clients.overdue_bucket по умолчанию: из days_overdue вставляемой строки."""
+    return overdue_bucket(context.get_current_parameters()['days_overdue'])
+
+
+def amount_band_default(context) -> str:
+    """Значение столбца clients.amount_band по умолчанию: из amount вставляемой строки."""
+    return amount_band(context.get_current_parameters()['amount'])
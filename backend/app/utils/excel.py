@@ -1,103 +1,167 @@
+import asyncio
+import os
 import pandas as pd
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Sequence
+from openpyxl import Workbook, load_workbook
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
-from app.models.client import Client
 from app.schemas.client import ClientCreate
+from app.core.ingest import write_batches, create_ingest_batch, finish_ingest_batch
+from app.config import settings
+
+
+# Маппинг возможных вариантов названий колонок (все ключи в нижнем регистре)
+COLUMN_MAPPING = {
+    'фио': 'fio',
+    'fio': 'fio',
+    'name': 'fio',
+    'клиент': 'fio',
+
+    'иин': 'iin',
+    'iin': 'iin',
+    'id': 'iin',
+
+    'кредитор': 'creditor',
+    'creditor': 'creditor',
+    'bank': 'creditor',
+
+    'сумма': 'amount',
+    'amount': 'amount',
+    'debt': 'amount',
+    'sum': 'amount',
+
+    'дни просрочки': 'days_overdue',
+    'days_overdue': 'days_overdue',
+    'delay': 'days_overdue',
+    'days': 'days_overdue',
+
+    'телефон': 'phone',
+    'phone': 'phone',
+    'tel': 'phone',
+    'mobile': 'phone'
+}
+
+REQUIRED_COLUMNS = ['fio', 'iin', 'creditor', 'amount', 'days_overdue', 'phone']
+
+
+def normalize_columns(headers: Iterable) -> list[Optional[str]]:
+    """
+    Приводит заголовки реестра к внутренним именам полей через COLUMN_MAPPING.
+    
+    Пустые заголовки возвращаются как None.
+    """
+    columns = []
+    for header in headers:
+        if header is None:
+            columns.append(None)
+            continue
+        name = str(header).strip().lower()
+        columns.append(COLUMN_MAPPING.get(name, name))
+    return columns
+
+
+def check_required_columns(columns: list[Optional[str]]) -> None:
+    """Проверяет наличие всех обязательных колонок, иначе ValueError."""
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    
+    if missing_columns:
+        raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing_columns)}")
+
+
+def _is_empty(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+def iter_row_batches(
+    columns: list[Optional[str]],
+    rows: Iterable[Sequence],
+    batch_size: int,
+    first_row: int = 2
+) -> Iterator[list[dict]]:
+    """
+    Превращает поток строк реестра в пачки словарей с обязательными полями.
+    
+    Каждой строке добавляется '_row' - номер строки в исходном файле
+    (first_row - номер первой строки данных, после заголовка). Полностью
+    пустые строки пропускаются, частично заполненные отбраковываются
+    на этапе валидации.
+    """
+    check_required_columns(columns)
+    indexes = {col: columns.index(col) for col in REQUIRED_COLUMNS}
+    
+    batch = []
+    for row_number, values in enumerate(rows, start=first_row):
+        row = {
+            col: values[i] if i < len(values) else None
+            for col, i in indexes.items()
+        }
+        if all(_is_empty(value) for value in row.values()):
+            continue
+        
+        row['_row'] = row_number
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+
+def iter_excel_batches(file_path: str, batch_size: int) -> Iterator[list[dict]]:
+    """
+    Потоково читает Excel файл пачками по batch_size строк.
+    
+    .xlsx читается через openpyxl в режиме read_only: в памяти держится только
+    текущая пачка, а не весь лист. Старый формат .xls openpyxl не читает,
+    поэтому он по-прежнему загружается через pandas целиком.
+    """
+    if Path(file_path).suffix.lower() == '.xls':
+        df = pd.read_excel(file_path)
+        yield from iter_row_batches(
+            normalize_columns(df.columns),
+            df.itertuples(index=False, name=None),
+            batch_size
+        )
+        return
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("Файл пуст")
+        
+        yield from iter_row_batches(normalize_columns(header), rows, batch_size)
+    finally:
+        workbook.close()
 
 
 async def read_excel_to_db(file_path: str, db: AsyncSession) -> tuple[int, int]:
     """
     Читает Excel файл и создает записи Client в БД.
     
+    Файл читается потоково пачками по settings.INGEST_CHUNK_SIZE строк, каждая
+    пачка сразу уходит в БД, поэтому пиковая память не зависит от размера файла.
+    
     Ожидаемые колонки: ФИО, ИИН, Кредитор, Сумма, Дни просрочки, Телефон
     
     Returns:
         tuple: (количество успешно добавленных, количество ошибок)
     """
     try:
-        df = pd.read_excel(file_path)
-        
-        # Нормализация названий колонок (убираем пробелы, приводим к нижнему регистру)
-        df.columns = df.columns.str.strip().str.lower()
-        
-        # Маппинг возможных вариантов названий колонок (все ключи в нижнем регистре)
-        column_mapping = {
-            'фио': 'fio',
-            'fio': 'fio',
-            'name': 'fio',
-            'клиент': 'fio',
-            
-            'иин': 'iin',
-            'iin': 'iin',
-            'id': 'iin',
-            
-            'кредитор': 'creditor',
-            'creditor': 'creditor',
-            'bank': 'creditor',
-            
-            'сумма': 'amount',
-            'amount': 'amount',
-            'debt': 'amount',
-            'sum': 'amount',
-            
-            'дни просрочки': 'days_overdue',
-            'days_overdue': 'days_overdue',
-            'delay': 'days_overdue',
-            'days': 'days_overdue',
-            
-            'телефон': 'phone',
-            'phone': 'phone',
-            'tel': 'phone',
-            'mobile': 'phone'
-        }
-        
-        # Переименовываем колонки
-        df.rename(columns=column_mapping, inplace=True)
-        
-        # Проверяем наличие всех необходимых колонок
-        required_columns = ['fio', 'iin', 'creditor', 'amount', 'days_overdue', 'phone']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing_columns)}")
+        batch_id = await create_ingest_batch(db, Path(file_path).name)
+        batches = iter_excel_batches(file_path, settings.INGEST_CHUNK_SIZE)
+        stats = await write_batches(batches, db, batch_id=batch_id)
+        await finish_ingest_batch(db, batch_id, stats)
+        added_count = stats['inserted']
+        error_count = stats['skipped'] + stats['failed']
         
-        # Удаляем пустые строки
-        df = df.dropna(subset=required_columns)
-        
-        added_count = 0
-        error_count = 0
-        
-        for _, row in df.iterrows():
-            try:
-                # Проверяем, существует ли клиент с таким ИИН
-                existing = await db.execute(
-                    Client.__table__.select().where(Client.iin == str(row['iin']))
-                )
-                if existing.fetchone():
-                    logger.warning(f"Клиент с ИИН {row['iin']} уже существует, пропускаем")
-                    error_count += 1
-                    continue
-                
-                client = Client(
-                    fio=str(row['fio']).strip(),
-                    iin=str(row['iin']).strip(),
-                    creditor=str(row['creditor']).strip(),
-                    amount=float(row['amount']),
-                    days_overdue=int(row['days_overdue']),
-                    phone=str(row['phone']).strip(),
-                    status='pending'
-                )
-                
-                db.add(client)
-                added_count += 1
-                
-            except Exception as e:
-                logger.error(f"Ошибка при обработке строки {row.get('iin', 'unknown')}: {e}")
-                error_count += 1
-                continue
-        
-        await db.commit()
         logger.info(f"Успешно добавлено клиентов: {added_count}, ошибок: {error_count}")
         
         return added_count, error_count
@@ -108,41 +172,72 @@ async def read_excel_to_db(file_path: str, db: AsyncSession) -> tuple[int, int]:
         raise
 
 
-async def export_to_excel(clients: list[Client], output_path: str) -> str:
+# Колонки выгрузки клиентов, категория в 7-й колонке
+EXPORT_HEADERS = ['ФИО', 'ИИН', 'Кредитор', 'Сумма', 'Дни просрочки', 'Телефон', 'Категория']
+
+# Широкая выгрузка: поля клиента и его последний звонок
+WIDE_EXPORT_HEADERS = EXPORT_HEADERS + [
+    'Категория звонка', 'Уверенность', 'Язык', 'Дата обещания', 'Транскрипт', 'Дата звонка'
+]
+
+
+def _append_rows(sheet, rows: list[Sequence]) -> None:
+    for row in rows:
+        sheet.append(row)
+
+
+async def export_to_excel(
+    row_batches: AsyncIterator[list[Sequence]],
+    output_path: str,
+    headers: list[str] = EXPORT_HEADERS,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> int:
     """
-    Экспортирует список клиентов в Excel файл с категориями в 7-й колонке.
+    Потоково экспортирует строки в Excel файл через write-only книгу openpyxl.
+    
+    Строки дописываются в лист по мере получения пачек из БД, поэтому в памяти
+    держится только текущая пачка. Книга пишется во временный файл и
+    переименовывается после сохранения.
     
     Args:
-        clients: Список объектов Client
+        row_batches: Асинхронный поток пачек строк в порядке headers
         output_path: Путь для сохранения файла
+        headers: Заголовки колонок
+        on_progress: Callback с количеством записанных строк после каждой пачки
         
     Returns:
-        str: Путь к сохраненному файлу
+        int: Количество выгруженных строк
     """
+    output = Path(output_path)
+    tmp_path = output.with_name(f".{output.name}.part")
+    sheet = None
+    
     try:
-        data = []
-        for client in clients:
-            data.append({
-                'ФИО': client.fio,
-                'ИИН': client.iin,
-                'Кредитор': client.creditor,
-                'Сумма': client.amount,
-                'Дни просрочки': client.days_overdue,
-                'Телефон': client.phone,
-                'Категория': client.category or 'не обработано'
-            })
+        # Создаем директорию если не существует
+        output.parent.mkdir(parents=True, exist_ok=True)
         
-        df = pd.DataFrame(data)
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Клиенты")
+        sheet.append(headers)
         
-        # Создаем директорию если не существует
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        rows_written = 0
+        async for rows in row_batches:
+            await asyncio.to_thread(_append_rows, sheet, rows)
+            rows_written += len(rows)
+            if on_progress:
+                await on_progress(rows_written)
         
-        df.to_excel(output_path, index=False, engine='openpyxl')
-        logger.info(f"Экспортировано {len(clients)} клиентов в {output_path}")
+        await asyncio.to_thread(workbook.save, tmp_path)
+        os.replace(tmp_path, output)
+        logger.info(f"Экспортировано {rows_written} строк в {output_path}")
         
-        return output_path
+        return rows_written
         
     except Exception as e:
         logger.error(f"Ошибка при экспорте в Excel: {e}")
+        # Закрываем недописанный лист, иначе его временный файл openpyxl
+        # остается открытым до сборки мусора
+        if sheet is not None and not sheet.closed:
+            sheet.close()
+        tmp_path.unlink(missing_ok=True)
         raise
-
@@ -0,0 +1,35 @@
+import json
+from datetime import date, datetime
+from typing import Any
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(content: Any) -> bytes:
+    """Сериализует словари/списки из БД в JSON: через orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """
+    JSON ответ без валидации response_model.
+    
+    Для эндпоинтов, которые сами собирают ответ из строк БД в форме схемы:
+    данные сериализуются один раз, без построения Pydantic моделей.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,277 @@
+import asyncio
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.core.ingest import write_batches, create_ingest_batch, finish_ingest_batch
+from app.models.client import Client
+from app.utils.validation import validate_batch
+from app.utils.excel import (
+    iter_excel_batches,
+    iter_row_batches,
+    normalize_columns,
+    check_required_columns,
+    REQUIRED_COLUMNS
+)
+from app.config import settings
+
+# Поддерживаемые форматы реестров
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+CSV_EXTENSIONS = ('.csv',)
+PARQUET_EXTENSIONS = ('.parquet',)
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + PARQUET_EXTENSIONS
+
+# Сколько байт из начала CSV используется для определения кодировки и разделителя
+CSV_SNIFF_SIZE = 64 * 1024
+CSV_ENCODINGS = ('utf-8-sig', 'cp1251')
+CSV_DELIMITERS = ';,\t|'
+
+
+def detect_csv_format(file_path: str) -> tuple[str, str]:
+    """
+    Определяет кодировку и разделитель CSV по началу файла.
+    
+    Кодировки проверяются по порядку CSV_ENCODINGS: выгрузки из 1С и банковских
+    систем часто приходят в cp1251.
+    
+    Returns:
+        tuple: (кодировка, разделитель)
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(CSV_SNIFF_SIZE)
+    
+    # Обрезаем по последнему переводу строки, чтобы не разрезать многобайтный символ
+    if len(sample) == CSV_SNIFF_SIZE and b"\n" in sample:
+        sample = sample[:sample.rindex(b"\n")]
+    
+    for encoding in CSV_ENCODINGS:
+        try:
+            text = sample.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("Не удалось определить кодировку CSV файла")
+    
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        header = text.splitlines()[0] if text else ""
+        delimiter = max(CSV_DELIMITERS, key=header.count)
+    
+    return encoding, delimiter
+
+
+def iter_csv_batches(file_path: str, batch_size: int) -> Iterator[list[dict]]:
+    """
+    Потоково читает CSV реестр пачками по batch_size строк.
+    """
+    encoding, delimiter = detect_csv_format(file_path)
+    logger.info(f"CSV {file_path}: кодировка {encoding}, разделитель {delimiter!r}")
+    
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("Файл пуст")
+        
+        yield from iter_row_batches(normalize_columns(header), reader, batch_size)
+
+
+def iter_parquet_batches(file_path: str, batch_size: int) -> Iterator[list[dict]]:
+    """
+    Читает Parquet реестр по группам строк, загружая только нужные колонки.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Для загрузки Parquet требуется пакет pyarrow")
+    
+    parquet_file = pq.ParquetFile(file_path)
+    try:
+        source_columns = parquet_file.schema_arrow.names
+        columns = normalize_columns(source_columns)
+        check_required_columns(columns)
+        
+        # Читаем только обязательные колонки
+        selected = [source_columns[columns.index(col)] for col in REQUIRED_COLUMNS]
+        
+        def iter_rows():
+            for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=selected):
+                data = record_batch.to_pydict()
+                yield from zip(*(data[name] for name in selected))
+        
+        # Пачки собираются через границы групп строк, а строки нумеруются
+        # как в Excel: первая строка данных - 2, как будто есть строка заголовка
+        yield from iter_row_batches(REQUIRED_COLUMNS, iter_rows(), batch_size)
+    finally:
+        parquet_file.close()
+
+
+def iter_registry_batches(file_path: str, batch_size: int) -> Iterator[list[dict]]:
+    """
+    Выбирает потоковый читатель реестра по расширению файла.
+    """
+    suffix = Path(file_path).suffix.lower()
+    
+    if suffix in EXCEL_EXTENSIONS:
+        return iter_excel_batches(file_path, batch_size)
+    if suffix in CSV_EXTENSIONS:
+        return iter_csv_batches(file_path, batch_size)
+    if suffix in PARQUET_EXTENSIONS:
+        return iter_parquet_batches(file_path, batch_size)
+    
+    raise ValueError(f"Неподдерживаемый формат файла: {suffix}")
+
+
+def read_registry_head(file_path: str, limit: int) -> tuple[list, list[tuple]]:
+    """
+    Читает заголовок и первые limit строк реестра, не трогая остальной файл.
+    
+    Returns:
+        tuple: (исходные заголовки, первые строки)
+    """
+    suffix = Path(file_path).suffix.lower()
+    
+    if suffix == '.xls':
+        df = pd.read_excel(file_path, nrows=limit)
+        return list(df.columns), list(df.itertuples(index=False, name=None))
+    
+    if suffix in EXCEL_EXTENSIONS:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True, max_row=limit + 1)
+            header = next(rows, None)
+            if header is None:
+                raise ValueError("Файл пуст")
+            return list(header), list(rows)
+        finally:
+            workbook.close()
+    
+    if suffix in CSV_EXTENSIONS:
+        encoding, delimiter = detect_csv_format(file_path)
+        with open(file_path, "r", encoding=encoding, newline="") as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError("Файл пуст")
+            return header, [tuple(row) for row in islice(reader, limit)]
+    
+    if suffix in PARQUET_EXTENSIONS:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для загрузки Parquet требуется пакет pyarrow")
+        
+        parquet_file = pq.ParquetFile(file_path)
+        try:
+            header = parquet_file.schema_arrow.names
+            record_batch = next(parquet_file.iter_batches(batch_size=limit), None)
+            if record_batch is None:
+                return header, []
+            data = record_batch.to_pydict()
+            return header, list(zip(*(data[name] for name in header)))
+        finally:
+            parquet_file.close()
+    
+    raise ValueError(f"Неподдерживаемый формат файла: {suffix}")
+
+
+async def preview_registry(
+    file_path: str,
+    db: AsyncSession,
+    rows: int,
+    sample: int
+) -> dict:
+    """
+    Пробный разбор реестра без записи в БД.
+    
+    Читаются только первые rows строк: показывается, как колонки легли на
+    COLUMN_MAPPING, результат валидации и оценка доли дубликатов по выборке
+    из sample ИИН (один запрос к БД).
+    """
+    headers, head_rows = await asyncio.to_thread(read_registry_head, file_path, rows)
+    columns = normalize_columns(headers)
+    
+    mapping = {
+        str(header): column
+        for header, column in zip(headers, columns)
+        if header is not None and column in REQUIRED_COLUMNS
+    }
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    unmapped_columns = [
+        str(header)
+        for header, column in zip(headers, columns)
+        if header is not None and column not in REQUIRED_COLUMNS
+    ]
+    
+    preview = {
+        "mapping": mapping,
+        "missing_columns": missing_columns,
+        "unmapped_columns": unmapped_columns,
+        "rows_read": len(head_rows),
+        "valid_rows": 0,
+        "invalid_rows": 0,
+        "errors": [],
+        "sample": [],
+        "duplicates": {"sampled": 0, "existing_in_db": 0, "repeated_in_file": 0, "rate": 0.0}
+    }
+    
+    if missing_columns:
+        return preview
+    
+    batch = next(iter_row_batches(columns, head_rows, max(len(head_rows), 1)), [])
+    valid, errors = validate_batch(batch)
+    
+    preview["valid_rows"] = len(valid)
+    preview["invalid_rows"] = len(errors)
+    preview["errors"] = errors
+    preview["sample"] = valid
+    
+    # Оценка дубликатов по выборке ИИН
+    sample_iins = [row['iin'] for row in valid[:sample]]
+    unique_iins = set(sample_iins)
+    existing_count = 0
+    if unique_iins:
+        result = await db.execute(
+            select(func.count(Client.id)).where(Client.iin.in_(list(unique_iins)))
+        )
+        existing_count = result.scalar() or 0
+    
+    repeated = len(sample_iins) - len(unique_iins)
+    preview["duplicates"] = {
+        "sampled": len(sample_iins),
+        "existing_in_db": existing_count,
+        "repeated_in_file": repeated,
+        "rate": round((existing_count + repeated) / len(sample_iins), 4) if sample_iins else 0.0
+    }
+    
+    return preview
+
+
+async def read_registry_to_db(file_path: str, db: AsyncSession) -> tuple[int, int]:
+    """
+    Читает реестр (Excel, CSV или Parquet) и создает записи Client в БД.
+    
+    Returns:
+        tuple: (количество успешно добавленных, количество ошибок)
+    """
+    try:
+        batch_id = await create_ingest_batch(db, Path(file_path).name)
+        batches = iter_registry_batches(file_path, settings.INGEST_CHUNK_SIZE)
+        stats = await write_batches(batches, db, batch_id=batch_id)
+        await finish_ingest_batch(db, batch_id, stats)
+        
+        logger.info(f"Успешно добавлено клиентов: {stats['inserted']}, ошибок: {stats['skipped'] + stats['failed']}")
+        
+        return stats['inserted'], stats['skipped'] + stats['failed']
+        
+    except Exception as e:
+        logger.error(f"Ошибка при чтении реестра: {e}")
+        await db.rollback()
+        raise
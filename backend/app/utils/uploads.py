@@ -0,0 +1,69 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+from fastapi import UploadFile
+from loguru import logger
+
+# Размер куска, которым тело запроса переносится на диск
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+async def spool_upload(
+    file: UploadFile,
+    directory: Path,
+    filename: Optional[str] = None
+) -> tuple[Path, str, int]:
+    """
+    Потоково сохраняет загруженный файл на диск и считает его SHA-256.
+    
+    Тело читается кусками по UPLOAD_CHUNK_SIZE, запись и хеширование идут
+    в отдельном потоке, поэтому файл не держится в памяти целиком и не
+    блокирует event loop. Файл сначала пишется во временный, а затем
+    атомарно переименовывается.
+    
+    Args:
+        file: Загруженный файл
+        directory: Директория для сохранения
+        filename: Имя итогового файла. Если не указано, имя строится из хеша
+            содержимого и исходного имени, так что разные файлы с одинаковым
+            именем не перезаписывают друг друга
+        
+    Returns:
+        tuple: (путь к файлу, sha256 в hex, размер в байтах)
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / f".{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    
+    try:
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+                size += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        
+        file_hash = hasher.hexdigest()
+        if filename is None:
+            filename = f"{file_hash[:16]}_{Path(file.filename or 'upload').name}"
+        
+        file_path = directory / filename
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+        
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    logger.info(f"Файл сохранен: {file_path} ({size} байт, sha256={file_hash[:16]})")
+    
+    return file_path, file_hash, size
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from app.config import settings
+
+# Названия полей для сообщений об ошибках
+FIELD_NAMES = {
+    'fio': 'ФИО',
+    'iin': 'ИИН',
+    'creditor': 'Кредитор',
+    'amount': 'Сумма',
+    'days_overdue': 'Дни просрочки',
+    'phone': 'Телефон'
+}
+
+# Верхние границы сумм и дней просрочки: большие значения - ошибка в реестре
+# (лишние разряды, экспоненциальная запись), а не реальный долг
+MAX_AMOUNT = 1e12
+MAX_DAYS_OVERDUE = 36500
+
+# Веса для контрольного разряда ИИН: первый проход и повторный, если остаток 10
+IIN_WEIGHTS_FIRST = np.arange(1, 12)
+IIN_WEIGHTS_SECOND = np.array([3, 4, 5, 6, 7, 8, 9, 10, 11, 1, 2])
+
+
+def _as_text(column: pd.Series) -> pd.Series:
+    """Приводит колонку к строкам без пробелов по краям, пустые значения - <NA>."""
+    text = column.astype('string').str.strip()
+    return text.mask(text == '')
+
+
+def _to_number(column: pd.Series) -> pd.Series:
+    """Числа из ячеек; строки вида '1 000,50' тоже распознаются."""
+    text = column.astype('string').str.replace(r'[\s\xa0]', '', regex=True).str.replace(',', '.')
+    return pd.to_numeric(text, errors='coerce')
+
+
+def normalize_iin(column: pd.Series) -> pd.Series:
+    """
+    Приводит ИИН к строке из цифр.
+
+    Excel хранит ИИН числом и теряет ведущий ноль (родившиеся в 2000-х),
+    поэтому числовые значения дополняются нулями до 12 знаков.
+    """
+    numeric = column.map(lambda value: isinstance(value, (int, float)), na_action='ignore')
+    text = _as_text(column).str.replace(r'\.0$', '', regex=True)
+    return text.where(~numeric.fillna(False).astype(bool), text.str.zfill(12))
+
+
+def iin_checksum_valid(iins: pd.Series) -> pd.Series:
+    """
+    Проверяет контрольный разряд 12-значных ИИН (алгоритм РК).
+
+    Контрольная сумма считается по всей колонке матричным умножением.
+    """
+    result = pd.Series(False, index=iins.index)
+    well_formed = iins.str.fullmatch(r'\d{12}').fillna(False).astype(bool)
+    if not well_formed.any():
+        return result
+
+    joined = ''.join(iins[well_formed]).encode('ascii')
+    digits = np.frombuffer(joined, dtype=np.uint8).reshape(-1, 12).astype(np.int64) - ord('0')
+
+    control = digits[:, :11] @ IIN_WEIGHTS_FIRST % 11
+    second = digits[:, :11] @ IIN_WEIGHTS_SECOND % 11
+    control = np.where(control == 10, second, control)
+
+    result[well_formed] = (control != 10) & (control == digits[:, 11])
+    return result
+
+
+def normalize_phone(column: pd.Series) -> pd.Series:
+    """
+    Приводит телефоны к формату E.164.
+
+    Казахстанские номера без кода страны (10 цифр) и с 8 в начале
+    переводятся в +7. Номера, которые нельзя привести, возвращаются как <NA>.
+    """
+    text = _as_text(column).str.replace(r'\.0$', '', regex=True)
+    has_plus = text.str.startswith('+').fillna(False).astype(bool)
+    digits = text.str.replace(r'\D', '', regex=True)
+    length = digits.str.len()
+
+    digits = digits.mask(length == 10, '7' + digits)
+    digits = digits.mask(
+        (length == 11) & digits.str.startswith('8').fillna(False).astype(bool) & ~has_plus,
+        '7' + digits.str[1:]
+    )
+
+    length = digits.str.len()
+    valid = (length >= 11) & (length <= 15)
+    return ('+' + digits).where(valid.fillna(False).astype(bool))
+
+
+def validate_batch(batch: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    Валидирует и нормализует пачку строк реестра по колонкам.
+
+    Строки убираются из пачки, если в них пустые поля, сумма или дни
+    просрочки не конечные числа, отрицательные или больше MAX_AMOUNT /
+    MAX_DAYS_OVERDUE, дни просрочки дробные, ИИН не из 12 цифр или с неверной
+    контрольной суммой (settings.INGEST_VALIDATE_IIN_CHECKSUM), телефон нельзя
+    привести к E.164.
+
+    Args:
+        batch: Пачка сырых строк с полями реестра и номером строки '_row'
+
+    Returns:
+        tuple: (валидные строки с приведенными типами,
+                ошибки вида {'row': номер строки, 'iin': ИИН, 'reason': причины})
+    """
+    if not batch:
+        return [], []
+
+    df = pd.DataFrame.from_records(batch)
+    reasons = pd.Series('', index=df.index, dtype='string')
+
+    def reject(mask: pd.Series, reason: str):
+        nonlocal reasons
+        mask = mask.fillna(False).astype(bool)
+        reasons = reasons.mask(mask, reasons + reason + '; ')
+
+    raw_iin = df['iin'].copy()
+
+    for field in ('fio', 'creditor'):
+        df[field] = _as_text(df[field])
+        reject(df[field].isna(), f"пустое поле {FIELD_NAMES[field]}")
+
+    df['iin'] = normalize_iin(df['iin'])
+    well_formed = df['iin'].str.fullmatch(r'\d{12}').fillna(False).astype(bool)
+    reject(~well_formed, "ИИН должен состоять из 12 цифр")
+    if settings.INGEST_VALIDATE_IIN_CHECKSUM:
+        reject(well_formed & ~iin_checksum_valid(df['iin']), "неверная контрольная сумма ИИН")
+
+    # Границы проверяются до приведения к int64: бесконечность и 1e30
+    # иначе превращаются в -2^63, а дробные дни молча обрезаются
+    df['amount'] = _to_number(df['amount'])
+    finite = np.isfinite(df['amount']).fillna(False)
+    reject(df['amount'].isna(), "сумма не является числом")
+    reject(df['amount'].notna() & ~finite, "сумма не является конечным числом")
+    reject(finite & (df['amount'] < 0), "отрицательная сумма")
+    reject(finite & (df['amount'] > MAX_AMOUNT), f"сумма больше {MAX_AMOUNT:.0f}")
+
+    df['days_overdue'] = _to_number(df['days_overdue'])
+    finite = np.isfinite(df['days_overdue']).fillna(False)
+    reject(df['days_overdue'].isna(), "дни просрочки не являются числом")
+    reject(df['days_overdue'].notna() & ~finite, "дни просрочки не являются конечным числом")
+    reject(finite & (df['days_overdue'] < 0), "отрицательные дни просрочки")
+    reject(finite & (df['days_overdue'] > MAX_DAYS_OVERDUE), f"дней просрочки больше {MAX_DAYS_OVERDUE}")
+    reject(finite & (df['days_overdue'] % 1 != 0), "дробные дни просрочки")
+
+    df['phone'] = normalize_phone(df['phone'])
+    reject(df['phone'].isna(), "некорректный телефон")
+
+    valid = reasons == ''
+
+    errors_df = pd.DataFrame({
+        'row': df.loc[~valid, '_row'],
+        'iin': raw_iin[~valid].astype('string').fillna(''),
+        'reason': reasons[~valid].str.rstrip('; ')
+    })
+
+    valid_df = df.loc[valid, ['fio', 'iin', 'creditor', 'amount', 'days_overdue', 'phone']]
+    valid_df = valid_df.astype({
+        'fio': object,
+        'iin': object,
+        'creditor': object,
+        'amount': float,
+        'days_overdue': 'int64',
+        'phone': object
+    })
+
+    return valid_df.to_dict('records'), errors_df.to_dict('records')
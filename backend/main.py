@@ -3,10 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from loguru import logger
 from pathlib import Path
-from app.api.v1 import upload, clients, process, export, history, analytics
+from app.api.v1 import upload, clients, process, export, history, analytics, batches
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, AsyncSessionLocal
+from app.db.rollups import ensure_rollups
+from app.db.schema import ensure_schema
 from app.config import settings
+from app.core.ingest_jobs import resume_ingest_jobs
+from app.core.export_jobs import resume_export_jobs
+from app.core.search import setup_fulltext_search
+from app.core.breakdown import backfill_debt_buckets
 
 # Настройка логирования
 Path("logs").mkdir(exist_ok=True)
@@ -30,6 +36,7 @@ app.include_router(process.router, prefix="/api/v1", tags=["process"])
 app.include_router(export.router, prefix="/api/v1", tags=["export"])
 app.include_router(history.router, prefix="/api/v1", tags=["history"])
 app.include_router(analytics.router, prefix="/api/v1", tags=["analytics"])
+app.include_router(batches.router, prefix="/api/v1", tags=["batches"])
 
 
 @app.on_event("startup")
@@ -40,8 +47,19 @@ async def startup_event():
     # Создаем таблицы БД
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_schema)
+        await conn.run_sync(setup_fulltext_search)
+        await conn.run_sync(backfill_debt_buckets)
+    
+    # Счетчики статистики для БД, созданной до их появления
+    async with AsyncSessionLocal() as session:
+        await ensure_rollups(session)
     
     logger.info("База данных инициализирована")
+    
+    # Возобновляем загрузки реестров и выгрузки, прерванные перезапуском
+    await resume_ingest_jobs()
+    await resume_export_jobs()
 
 
 @app.on_event("shutdown")
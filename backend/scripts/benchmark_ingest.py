@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк загрузки реестров должников.
+
+Генерирует синтетические реестры (Excel, CSV, Parquet) с реалистичными
+русскими и казахскими ФИО, корректными ИИН, кредиторами и телефонами,
+с заданной долей дубликатов и битых строк. Каждый сценарий загружается
+в отдельном процессе в чистую SQLite БД, замеряются строки/сек,
+пиковая память (RSS) и размер БД. Результаты пишутся в JSON и могут
+сравниваться с сохраненным baseline.
+
+Использование:
+    python scripts/benchmark_ingest.py
+    python scripts/benchmark_ingest.py --sizes 10000 100000 1000000
+    python scripts/benchmark_ingest.py --formats csv parquet --output new.json --baseline old.json
+"""
+
+# Fix Windows console encoding for Unicode
+import sys
+import io
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Пути
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+DEFAULT_DATA_DIR = PROJECT_ROOT / "data" / "benchmarks"
+
+HEADER = ['ФИО', 'ИИН', 'Кредитор', 'Сумма', 'Дни просрочки', 'Телефон']
+
+# Сценарии: формат файла и режим загрузки
+SCENARIOS = {
+    'xlsx': ('.xlsx', 'insert'),
+    'csv': ('.csv', 'insert'),
+    'parquet': ('.parquet', 'insert'),
+    'xlsx-upsert': ('.xlsx', 'upsert'),
+}
+
+# ============ Генерация данных ============
+
+SURNAMES_RU = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Козлов', 'Новиков', 'Морозов']
+SURNAMES_KZ = ['Ахметов', 'Нурланов', 'Сериков', 'Жумабаев', 'Касымов', 'Омаров', 'Тулегенов', 'Абенов', 'Искаков', 'Мухамедиев']
+NAMES_RU = ['Александр', 'Дмитрий', 'Сергей', 'Андрей', 'Алексей', 'Елена', 'Ольга', 'Наталья', 'Анна', 'Ирина']
+NAMES_KZ = ['Нурлан', 'Ерлан', 'Асхат', 'Данияр', 'Арман', 'Айгерим', 'Динара', 'Гульнара', 'Жанар', 'Сауле']
+PATRONYMICS_RU = ['Александрович', 'Сергеевич', 'Иванович', 'Петрович', 'Андреевич']
+PATRONYMICS_KZ = ['Серикович', 'Нурланович', 'Бауыржанович', 'Маратович', 'Ерланович']
+CREDITORS = [
+    'Kaspi Bank', 'Halyk Bank', 'Freedom Bank', 'Home Credit Bank', 'Jusan Bank',
+    'Bereke Bank', 'Евразийский банк', 'Банк ЦентрКредит', 'МФО Солва', 'МФО KMF'
+]
+PHONE_PREFIXES = ['700', '701', '702', '705', '707', '708', '747', '771', '775', '778']
+
+IIN_WEIGHTS_FIRST = list(range(1, 12))
+IIN_WEIGHTS_SECOND = [3, 4, 5, 6, 7, 8, 9, 10, 11, 1, 2]
+
+
+def make_iin(rng: random.Random) -> str:
+    """ИИН с датой рождения, разрядом века/пола и корректным контрольным разрядом."""
+    while True:
+        birth = date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55))
+        century = 3 if birth.year < 2000 else 5
+        digits = f"{birth:%y%m%d}{century + rng.randint(0, 1)}{rng.randint(0, 9999):04d}"
+        values = [int(d) for d in digits]
+
+        control = sum(v * w for v, w in zip(values, IIN_WEIGHTS_FIRST)) % 11
+        if control == 10:
+            control = sum(v * w for v, w in zip(values, IIN_WEIGHTS_SECOND)) % 11
+        if control != 10:
+            return digits + str(control)
+
+
+def make_fio(rng: random.Random) -> str:
+    female = rng.random() < 0.5
+    if rng.random() < 0.5:
+        surname, name, patronymic = rng.choice(SURNAMES_KZ), rng.choice(NAMES_KZ), rng.choice(PATRONYMICS_KZ)
+    else:
+        surname, name, patronymic = rng.choice(SURNAMES_RU), rng.choice(NAMES_RU), rng.choice(PATRONYMICS_RU)
+    if female:
+        surname += 'а'
+        patronymic = patronymic[:-2] + 'на' if patronymic.endswith('ич') else patronymic
+    return f"{surname} {name} {patronymic}"
+
+
+def make_phone(rng: random.Random) -> str:
+    number = f"{rng.choice(PHONE_PREFIXES)}{rng.randint(0, 9999999):07d}"
+    style = rng.randint(0, 2)
+    if style == 0:
+        return f"+7{number}"
+    if style == 1:
+        return f"8 ({number[:3]}) {number[3:6]}-{number[6:8]}-{number[8:]}"
+    return f"7{number}"
+
+
+def break_row(row: list, rng: random.Random) -> list:
+    """Портит одно поле строки так, как это бывает в реальных реестрах."""
+    field = rng.randint(0, 4)
+    if field == 0:
+        row[0] = ''
+    elif field == 1:
+        row[1] = row[1][:-1] + str((int(row[1][-1]) + 1) % 10)
+    elif field == 2:
+        row[3] = 'нет данных'
+    elif field == 3:
+        row[4] = -rng.randint(1, 100)
+    else:
+        row[5] = '123'
+    return row
+
+
+def generate_rows(size: int, duplicate_share: float, broken_share: float, seed: int):
+    """Генерирует строки реестра с долей дубликатов ИИН и битых строк."""
+    rng = random.Random(seed)
+    issued = []
+
+    for _ in range(size):
+        if issued and rng.random() < duplicate_share:
+            iin = rng.choice(issued)
+        else:
+            iin = make_iin(rng)
+            if len(issued) < 100000:
+                issued.append(iin)
+
+        row = [
+            make_fio(rng),
+            iin,
+            rng.choice(CREDITORS),
+            round(rng.uniform(5000, 5000000), 2),
+            rng.randint(1, 720),
+            make_phone(rng)
+        ]
+
+        if rng.random() < broken_share:
+            row = break_row(row, rng)
+        yield row
+
+
+def write_registry(path: Path, rows, fmt: str) -> None:
+    """Пишет реестр потоково, не держа все строки в памяти."""
+    if fmt == '.xlsx':
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(HEADER)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+
+    elif fmt == '.csv':
+        # Типичная выгрузка из 1С: cp1251, разделитель ';', десятичная запятая
+        with open(path, "w", encoding="cp1251", newline="") as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(HEADER)
+            for row in rows:
+                row = list(row)
+                if isinstance(row[3], float):
+                    row[3] = str(row[3]).replace('.', ',')
+                writer.writerow(row)
+
+    elif fmt == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, pa.string()) for name in HEADER])
+        with pq.ParquetWriter(path, schema) as writer:
+            chunk = []
+            for row in rows:
+                chunk.append([None if value is None else str(value) for value in row])
+                if len(chunk) >= 50000:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(HEADER, r)) for r in chunk], schema))
+                    chunk = []
+            if chunk:
+                writer.write_table(pa.Table.from_pylist([dict(zip(HEADER, r)) for r in chunk], schema))
+
+    else:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+
+def ensure_registry(data_dir: Path, size: int, fmt: str, args) -> Path:
+    """Генерирует реестр или берет уже сгенерированный с теми же параметрами."""
+    name = f"registry_{size}_d{args.duplicates}_b{args.broken}_s{args.seed}{fmt}"
+    path = data_dir / name
+    if not path.exists():
+        print(f"  Генерация {name}...")
+        started = time.perf_counter()
+        tmp_path = path.with_suffix(path.suffix + '.part')
+        write_registry(tmp_path, generate_rows(size, args.duplicates, args.broken, args.seed), fmt)
+        os.replace(tmp_path, path)
+        print(f"  Готово за {time.perf_counter() - started:.1f} с")
+    return path
+
+
+# ============ Запуск сценария (в дочернем процессе) ============
+
+def peak_rss_mb():
+    """Пиковая память процесса в МБ (None, если измерить нечем)."""
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux отдает КБ, macOS - байты
+        return round(rss / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / 1024 / 1024, 1)
+    except ImportError:
+        return None
+
+
+def run_case(file_path: str, mode: str, db_path: str) -> dict:
+    """Загружает реестр в чистую БД и возвращает замеры."""
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{db_path}"
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    from app.db.base import Base
+    from app.db.session import engine, AsyncSessionLocal
+    from app.db.rollups import ensure_rollups
+    from app.db.schema import ensure_schema
+    import app.models  # noqa: F401 - регистрирует таблицы
+    from app.core.search import setup_fulltext_search
+    from app.core.breakdown import backfill_debt_buckets
+    from app.core.ingest import write_batches
+    from app.utils.excel import read_excel_to_db
+    from app.utils.registry import read_registry_to_db, iter_registry_batches
+    from app.config import settings
+
+    async def main():
+        # Та же подготовка БД, что при старте приложения (main.py): индексы
+        # и триггеры полнотекстового поиска замедляют вставку и входят в замер
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(ensure_schema)
+            await conn.run_sync(setup_fulltext_search)
+            await conn.run_sync(backfill_debt_buckets)
+
+        async with AsyncSessionLocal() as session:
+            await ensure_rollups(session)
+
+        async with AsyncSessionLocal() as session:
+            stats = {}
+            if mode == 'upsert':
+                # Повторная загрузка того же реестра поверх уже загруженного
+                await read_registry_to_db(file_path, session)
+                started = time.perf_counter()
+                batches = iter_registry_batches(file_path, settings.INGEST_CHUNK_SIZE)
+                stats = await write_batches(batches, session, mode='upsert')
+            elif file_path.endswith('.xlsx'):
+                started = time.perf_counter()
+                stats['inserted'], stats['errors'] = await read_excel_to_db(file_path, session)
+            else:
+                started = time.perf_counter()
+                stats['inserted'], stats['errors'] = await read_registry_to_db(file_path, session)
+            elapsed = time.perf_counter() - started
+
+        await engine.dispose()
+        return stats, elapsed
+
+    stats, elapsed = asyncio.run(main())
+
+    db_size = sum(
+        os.path.getsize(path)
+        for path in (db_path, db_path + '-wal')
+        if os.path.exists(path)
+    )
+
+    return {
+        "seconds": round(elapsed, 3),
+        "stats": stats,
+        "peak_rss_mb": peak_rss_mb(),
+        "db_size_mb": round(db_size / 1024 / 1024, 2),
+        "chunk_size": settings.INGEST_CHUNK_SIZE
+    }
+
+
+# ============ Оркестрация ============
+
+def run_scenario(file_path: Path, mode: str) -> dict:
+    """Запускает сценарий в отдельном процессе, чтобы пиковая память была честной."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = str(Path(tmp_dir) / "bench.db")
+        result = subprocess.run(
+            [sys.executable, __file__, '--run-case', str(file_path), mode, db_path],
+            capture_output=True,
+            text=True,
+            encoding='utf-8'
+        )
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "неизвестная ошибка")
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare_with_baseline(results: list[dict], baseline_path: Path) -> None:
+    """Печатает изменение скорости относительно baseline."""
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    previous = {(r['scenario'], r['rows']): r for r in baseline.get('results', [])}
+
+    print(f"\nСравнение с {baseline_path}:")
+    for result in results:
+        old = previous.get((result['scenario'], result['rows']))
+        if not old or not old.get('rows_per_sec'):
+            print(f"  {result['scenario']:>12} {result['rows']:>9}: нет в baseline")
+            continue
+        delta = (result['rows_per_sec'] - old['rows_per_sec']) / old['rows_per_sec'] * 100
+        print(
+            f"  {result['scenario']:>12} {result['rows']:>9}: "
+            f"{old['rows_per_sec']:>10.0f} -> {result['rows_per_sec']:>10.0f} строк/с ({delta:+.1f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки реестров")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help="размеры реестров (по умолчанию 10000 100000; добавьте 1000000)")
+    parser.add_argument('--formats', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="сценарии загрузки")
+    parser.add_argument('--duplicates', type=float, default=0.05, help="доля дубликатов ИИН")
+    parser.add_argument('--broken', type=float, default=0.01, help="доля битых строк")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR,
+                        help="куда складывать сгенерированные реестры")
+    parser.add_argument('--output', type=Path, default=None, help="JSON файл с результатами")
+    parser.add_argument('--baseline', type=Path, default=None, help="JSON baseline для сравнения")
+    parser.add_argument('--run-case', nargs=3, metavar=('FILE', 'MODE', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case), ensure_ascii=False))
+        return 0
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    output = args.output or args.data_dir / f"ingest_{datetime.now():%Y%m%d_%H%M%S}.json"
+
+    print("=== Ingest Benchmark ===")
+    results = []
+
+    for size in args.sizes:
+        for scenario in args.formats:
+            fmt, mode = SCENARIOS[scenario]
+            file_path = ensure_registry(args.data_dir, size, fmt, args)
+
+            try:
+                measured = run_scenario(file_path, mode)
+            except Exception as e:
+                print(f"  ERROR {scenario} {size}: {e}")
+                continue
+
+            result = {
+                "scenario": scenario,
+                "format": fmt.lstrip('.'),
+                "mode": mode,
+                "rows": size,
+                "file_size_mb": round(file_path.stat().st_size / 1024 / 1024, 2),
+                "rows_per_sec": round(size / measured['seconds'], 1) if measured['seconds'] else None,
+                **measured
+            }
+            results.append(result)
+
+            print(
+                f"  {scenario:>12} {size:>9} строк: {measured['seconds']:>8.2f} с, "
+                f"{result['rows_per_sec']:>10.0f} строк/с, RSS {measured['peak_rss_mb']} МБ, "
+                f"БД {measured['db_size_mb']} МБ"
+            )
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "params": {"duplicates": args.duplicates, "broken": args.broken, "seed": args.seed},
+        "results": results
+    }
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
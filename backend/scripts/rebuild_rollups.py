@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сверка и пересчет счетчиков статистики (stat_rollups, call_buckets).
+
+Счетчики ведутся вместе с изменениями clients и call_records. Скрипт
+сравнивает их с агрегатами по исходным таблицам и при необходимости
+пересчитывает заново.
+
+Использование:
+    python scripts/rebuild_rollups.py --check
+    python scripts/rebuild_rollups.py
+"""
+
+# Fix Windows console encoding for Unicode
+import sys
+import io
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+import argparse
+import asyncio
+from pathlib import Path
+
+# Пути
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, AsyncSessionLocal  # noqa: E402
+from app.db.rollups import check_rollups, rebuild_rollups  # noqa: E402
+from app.db.schema import ensure_schema  # noqa: E402
+import app.models  # noqa: E402,F401 - регистрирует таблицы
+
+
+async def run(check_only: bool) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_schema)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            mismatches = await check_rollups(session)
+
+            for key, (stored, actual) in mismatches.items():
+                print(f"{' / '.join(map(str, key)):<70} счетчик {stored:>10}  факт {actual:>10}")
+            print(f"Расхождений: {len(mismatches)}")
+
+            if check_only:
+                return 1 if mismatches else 0
+
+            count = await rebuild_rollups(session)
+            print(f"Пересчитано счетчиков: {count}")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка и пересчет счетчиков статистики")
+    parser.add_argument('--check', action='store_true',
+                        help="только сверить, код выхода 1 при расхождениях")
+    args = parser.parse_args()
+
+    return asyncio.run(run(args.check))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
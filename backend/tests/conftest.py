@@ -0,0 +1,63 @@
+"""
+Общие фикстуры тестов.
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+from app.api.deps import get_database
+from app.db.session import AsyncSessionLocal  # noqa: F401 - подключает учет версий и счетчики к сессиям
+import app.models  # noqa: F401 - регистрирует таблицы
+
+
+@pytest.fixture
+def run_with_db():
+    """
+    Выполняет сценарий с сессией к БД в памяти.
+
+    prepare - создание схемы через run_sync, по умолчанию create_all.
+    """
+    def run(scenario, prepare=None):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(prepare or Base.metadata.create_all)
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    await scenario(session)
+            finally:
+                await engine.dispose()
+
+        asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def api_client():
+    """
+    HTTP клиент к приложению с указанными роутерами, которые работают
+    через переданную сессию тестовой БД.
+    """
+    def make(session, *routers) -> httpx.AsyncClient:
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router, prefix="/api/v1")
+
+        async def override_database():
+            yield session
+
+        app.dependency_overrides[get_database] = override_database
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    return make
@@ -0,0 +1,118 @@
+"""
+Unit tests для кэша ответов аналитики.
+
+Запуск:
+    pytest tests/test_analytics_cache.py -v
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Client
+from app.core import analytics_cache
+from app.core.analytics_cache import cached_analytics
+from app.config import settings
+
+
+class Computation:
+    """Подсчет ответа, который запоминает количество вызовов."""
+
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {'calls': self.calls}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(monkeypatch):
+    monkeypatch.setattr(settings, 'ANALYTICS_CACHE_TTL_SECONDS', 60)
+    analytics_cache._analytics_cache.clear()
+    for key in analytics_cache.cache_stats:
+        analytics_cache.cache_stats[key] = 0
+
+
+class TestAnalyticsCache:
+    """Тесты кэша аналитики."""
+
+    def test_hit_until_data_changes(self, run_with_db):
+        """Повторный запрос отдается из кэша, запись в clients сбрасывает его."""
+        async def scenario(session):
+            compute = Computation()
+
+            assert await cached_analytics(session, 'statistics', {}, compute) == {'calls': 1}
+            assert await cached_analytics(session, 'statistics', {}, compute) == {'calls': 1}
+            assert await cached_analytics(session, 'statistics', {'day': 1}, compute) == {'calls': 2}
+
+            session.add(Client(
+                fio='Клиент', iin='000000000001', creditor='Kaspi Bank',
+                amount=1000, days_overdue=10, phone='+77011234567'
+            ))
+            await session.commit()
+
+            assert await cached_analytics(session, 'statistics', {}, compute) == {'calls': 3}
+            assert analytics_cache.cache_stats == {'hits': 1, 'misses': 3, 'coalesced': 0}
+
+        run_with_db(scenario)
+
+    def test_expired_entry_revalidated(self, monkeypatch, run_with_db):
+        """После TTL ответ сверяется с версиями в БД и без изменений не пересчитывается."""
+        async def scenario(session):
+            compute = Computation()
+            await cached_analytics(session, 'statistics', {}, compute)
+
+            monkeypatch.setattr(settings, 'ANALYTICS_CACHE_TTL_SECONDS', 1)
+            key = ('statistics', ())
+            versions, local_version, result, checked_at = analytics_cache._analytics_cache[key]
+            analytics_cache._analytics_cache[key] = (versions, local_version, result, checked_at - 10)
+
+            assert await cached_analytics(session, 'statistics', {}, compute) == {'calls': 1}
+            assert compute.calls == 1
+            assert analytics_cache.cache_stats['misses'] == 2
+
+        run_with_db(scenario)
+
+    def test_concurrent_requests_single_flight(self, run_with_db):
+        """Одинаковые одновременные запросы считаются один раз."""
+        async def scenario(session):
+            compute = Computation(delay=0.05)
+
+            results = await asyncio.gather(*(
+                cached_analytics(session, 'timeseries', {'granularity': 'day'}, compute)
+                for _ in range(10)
+            ))
+
+            assert results == [{'calls': 1}] * 10
+            assert compute.calls == 1
+            assert analytics_cache.cache_stats == {'hits': 0, 'misses': 1, 'coalesced': 9}
+
+        run_with_db(scenario)
+
+    def test_error_shared_and_not_cached(self, run_with_db):
+        """Ошибка подсчета получают все ожидающие, в кэш она не попадает."""
+        async def scenario(session):
+            async def failing():
+                await asyncio.sleep(0.01)
+                raise RuntimeError("ошибка")
+
+            results = await asyncio.gather(
+                *(cached_analytics(session, 'statistics', {}, failing) for _ in range(3)),
+                return_exceptions=True
+            )
+            assert all(isinstance(result, RuntimeError) for result in results)
+
+            assert await cached_analytics(session, 'statistics', {}, Computation()) == {'calls': 1}
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
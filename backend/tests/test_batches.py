@@ -0,0 +1,153 @@
+"""
+Unit tests для загрузок реестров (ingest_batches) и их отката.
+
+Запуск:
+    pytest tests/test_batches.py -v
+"""
+
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, func
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Client, CallRecord, IngestBatch, IngestJob
+from app.db.rollups import check_rollups, get_rollups
+from app.api.v1 import batches, upload
+from app.config import settings
+
+REGISTRY_CSV = (
+    "ФИО;ИИН;Кредитор;Сумма;Дни просрочки;Телефон\n"
+    "Иванов Иван;512531261074;Банк;1000;10;+77011234567\n"
+).encode('utf-8')
+
+
+async def add_batch(session, number: int, creditor: str) -> int:
+    """Загрузка с двумя клиентами, у одного из них звонок (через ORM, как pipeline)."""
+    batch = IngestBatch(filename=f'{creditor}.csv', mode='insert', status='active')
+    session.add(batch)
+    await session.flush()
+
+    clients = [
+        Client(
+            fio='Клиент', iin=f'{number}{i:011d}', creditor=creditor, amount=1000,
+            days_overdue=10, phone='+77011234567', batch_id=batch.id
+        )
+        for i in range(2)
+    ]
+    session.add_all(clients)
+    await session.flush()
+
+    clients[0].status = 'completed'
+    clients[0].category = 'promise'
+    session.add(CallRecord(
+        client_id=clients[0].id, category='promise', detected_language='ru',
+        created_at=datetime(2024, 3, 1, 10)
+    ))
+    await session.commit()
+    return batch.id
+
+
+async def count(session, model, *where) -> int:
+    return (await session.execute(select(func.count()).select_from(model).where(*where))).scalar_one()
+
+
+class TestRollback:
+    """Тесты отката загрузки."""
+
+    def test_rollback_deletes_only_batch(self, run_with_db, api_client):
+        """Удаляются клиенты и звонки загрузки, другие загрузки и счетчики сходятся."""
+        async def scenario(session):
+            first = await add_batch(session, 1, 'Kaspi')
+            second = await add_batch(session, 2, 'Halyk')
+
+            async with api_client(session, batches.router) as client:
+                response = await client.delete(f"/api/v1/batches/{first}")
+                assert response.status_code == 200
+                assert response.json()['deleted_clients'] == 2
+                assert response.json()['deleted_call_records'] == 1
+
+                response = await client.delete(f"/api/v1/batches/{first}")
+                assert response.status_code == 400
+
+                listed = (await client.get("/api/v1/batches")).json()
+
+            assert await count(session, Client, Client.batch_id == first) == 0
+            assert await count(session, Client, Client.batch_id == second) == 2
+            assert await count(session, CallRecord) == 1
+            assert (await session.get(IngestBatch, first)).status == 'rolled_back'
+            assert {item['batch_id']: item['status'] for item in listed['items']} == {
+                first: 'rolled_back', second: 'active'
+            }
+
+            # Счетчики уменьшены ровно на удаленные данные
+            assert await check_rollups(session) == {}
+            rollups = await get_rollups(session)
+            assert rollups['creditor'] == {'Halyk': 2}
+            assert rollups['category'] == {'promise': 1}
+
+        run_with_db(scenario)
+
+    @pytest.mark.parametrize('job_status', ['queued', 'running'])
+    def test_rollback_conflicts_with_active_job(self, run_with_db, api_client, job_status):
+        """Пока реестр загружается, откат возвращает 409 и ничего не удаляет."""
+        async def scenario(session):
+            batch_id = await add_batch(session, 1, 'Kaspi')
+            session.add(IngestJob(
+                id='job', filename='Kaspi.csv', file_path='Kaspi.csv',
+                status=job_status, batch_id=batch_id
+            ))
+            await session.commit()
+
+            async with api_client(session, batches.router) as client:
+                response = await client.delete(f"/api/v1/batches/{batch_id}")
+
+            assert response.status_code == 409
+            assert await count(session, Client) == 2
+
+        run_with_db(scenario)
+
+    def test_reupload_after_rollback(self, run_with_db, api_client, monkeypatch, tmp_path):
+        """Откаченный реестр можно загрузить снова: он не считается дубликатом."""
+        monkeypatch.setattr(settings, 'UPLOAD_PATH', str(tmp_path))
+        monkeypatch.setattr(upload, 'enqueue_ingest_job', lambda job_id: None)
+
+        async def scenario(session):
+            async with api_client(session, upload.router, batches.router) as client:
+                async def post():
+                    response = await client.post(
+                        "/api/v1/upload", files={'file': ('registry.csv', REGISTRY_CSV)}
+                    )
+                    assert response.status_code == 200
+                    return response.json()
+
+                first = await post()
+                assert first['duplicate'] is False
+
+                # Задача загрузки отработала и создала загрузку
+                batch = IngestBatch(filename='registry.csv', mode='insert', status='active')
+                session.add(batch)
+                await session.flush()
+                job = await session.get(IngestJob, first['job_id'])
+                job.batch_id = batch.id
+                job.status = 'completed'
+                await session.commit()
+
+                assert (await post())['duplicate'] is True
+
+                response = await client.delete(f"/api/v1/batches/{batch.id}")
+                assert response.status_code == 200
+
+                again = await post()
+                assert again['duplicate'] is False
+                assert again['job_id'] != first['job_id']
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
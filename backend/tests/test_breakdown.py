@@ -0,0 +1,171 @@
+"""
+Unit tests для разбивки конверсии по кредиторам, просрочке и сумме долга.
+
+Запуск:
+    pytest tests/test_breakdown.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import select, text
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+from app.models import Client
+from app.core.ingest import insert_clients_bulk, upsert_clients_bulk
+from app.db.schema import ensure_schema
+from app.core.breakdown import backfill_debt_buckets, get_breakdown
+from app.utils.debt_buckets import overdue_bucket, amount_band
+
+
+def make_row(n: int, creditor: str = 'Банк', amount: float = 1000, days_overdue: int = 10) -> dict:
+    return {
+        'fio': f'Клиент {n}', 'iin': f'{n:012d}', 'creditor': creditor,
+        'amount': amount, 'days_overdue': days_overdue, 'phone': '+77011234567'
+    }
+
+
+class TestDebtBuckets:
+    """Тесты границ интервалов."""
+
+    def test_overdue_bucket(self):
+        assert overdue_bucket(0) == '0-30'
+        assert overdue_bucket(30) == '0-30'
+        assert overdue_bucket(31) == '31-90'
+        assert overdue_bucket(90) == '31-90'
+        assert overdue_bucket(91) == '90+'
+
+    def test_amount_band(self):
+        assert amount_band(50_000) == '0-50k'
+        assert amount_band(50_000.01) == '50k-200k'
+        assert amount_band(1_000_000) == '200k-1m'
+        assert amount_band(5_000_000) == '1m+'
+
+
+class TestBucketColumns:
+    """Тесты заполнения интервалов при вставке и обновлении клиентов."""
+
+    def test_filled_on_orm_and_bulk_insert(self, run_with_db):
+        async def scenario(session):
+            session.add(Client(**make_row(1, days_overdue=120, amount=300_000)))
+            await session.commit()
+            await insert_clients_bulk([make_row(2, days_overdue=45, amount=10)], session)
+
+            result = await session.execute(
+                select(Client.iin, Client.overdue_bucket, Client.amount_band).order_by(Client.iin)
+            )
+            assert [tuple(row) for row in result] == [
+                ('000000000001', '90+', '200k-1m'),
+                ('000000000002', '31-90', '0-50k'),
+            ]
+
+        run_with_db(scenario)
+
+    def test_recomputed_on_upsert(self, run_with_db):
+        async def scenario(session):
+            await upsert_clients_bulk([make_row(1, days_overdue=10)], session)
+            await upsert_clients_bulk([make_row(1, days_overdue=100, amount=2_000_000)], session)
+
+            result = await session.execute(select(Client.overdue_bucket, Client.amount_band))
+            assert tuple(result.one()) == ('90+', '1m+')
+
+        run_with_db(scenario)
+
+    def test_backfill_existing_table(self, run_with_db):
+        """БД, созданная до появления столбцов, дополняется и заполняется при старте."""
+        def create_old_table(connection):
+            connection.exec_driver_sql(
+                "CREATE TABLE clients (id INTEGER PRIMARY KEY, fio VARCHAR, iin VARCHAR, "
+                "creditor VARCHAR, amount FLOAT, days_overdue INTEGER, phone VARCHAR, "
+                "status VARCHAR, category VARCHAR, created_at DATETIME, processed_at DATETIME, "
+                "batch_id INTEGER)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO clients (fio, iin, creditor, amount, days_overdue, phone, status) "
+                "VALUES ('Клиент', '000000000001', 'Банк', 75000, 60, '+77011234567', 'pending')"
+            )
+            Base.metadata.create_all(connection)
+            ensure_schema(connection)
+            backfill_debt_buckets(connection)
+
+        async def scenario(session):
+            result = await session.execute(select(Client.overdue_bucket, Client.amount_band))
+            assert tuple(result.one()) == ('31-90', '50k-200k')
+
+            indexes = await session.execute(text("PRAGMA index_list('clients')"))
+            assert 'ix_clients_breakdown' in {row[1] for row in indexes}
+
+        run_with_db(scenario, prepare=create_old_table)
+
+
+class TestBreakdown:
+    """Тесты разбивки конверсии."""
+
+    def test_breakdown_tables_and_matrix(self, run_with_db):
+        async def scenario(session):
+            clients = [
+                (make_row(1, 'А', days_overdue=10), 'promise'),
+                (make_row(2, 'А', days_overdue=10), 'ignore'),
+                (make_row(3, 'А', days_overdue=100, amount=500_000), 'wrong_number'),
+                (make_row(4, 'А', days_overdue=100, amount=500_000), None),
+                (make_row(5, 'Б', days_overdue=40), 'promise'),
+                (make_row(6, 'Б', days_overdue=40), 'refusal'),
+            ]
+            for row, category in clients:
+                session.add(Client(**row, category=category))
+            await session.commit()
+
+            breakdown = await get_breakdown(session)
+
+            total = breakdown['total']
+            assert (total['clients'], total['called'], total['promise']) == (6, 5, 2)
+            assert total['promise_rate'] == 40
+
+            # Нет ответа (ignore) - отдельный столбец, а не отказ
+            assert (total['refusal'], total['ignore']) == (1, 1)
+            assert total['refusal_rate'] == total['ignore_rate'] == 20
+            assert breakdown['by_creditor']['А']['refusal'] == 0
+
+            creditor_a = breakdown['by_creditor']['А']
+            assert creditor_a['clients'] == 4
+            assert creditor_a['called'] == 3
+            assert creditor_a['wrong_number_rate'] == pytest.approx(100 / 3)
+
+            # Интервалы в порядке границ, а не по алфавиту
+            assert list(breakdown['by_overdue']) == ['0-30', '31-90', '90+']
+            assert list(breakdown['by_amount']) == ['0-50k', '200k-1m']
+
+            cells = breakdown['matrix']['cells']
+            assert list(cells) == ['А', 'Б']
+            assert cells['А']['0-30']['promise_rate'] == 50
+            assert cells['А']['90+']['clients'] == 2
+            assert list(cells['Б']) == ['31-90']
+            assert cells['Б']['31-90']['refusal_rate'] == 50
+
+        run_with_db(scenario)
+
+    def test_breakdown_filter_and_validation(self, run_with_db):
+        async def scenario(session):
+            session.add(Client(**make_row(1, 'А')))
+            session.add(Client(**make_row(2, 'Б')))
+            await session.commit()
+
+            breakdown = await get_breakdown(session, rows='amount', columns='creditor', creditor='Б')
+            assert list(breakdown['by_creditor']) == ['Б']
+            assert breakdown['total']['promise_rate'] == 0
+            assert breakdown['matrix']['cells'] == {'0-50k': {'Б': breakdown['by_creditor']['Б']}}
+
+            with pytest.raises(ValueError):
+                await get_breakdown(session, rows='overdue', columns='overdue')
+            with pytest.raises(ValueError):
+                await get_breakdown(session, rows='region')
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
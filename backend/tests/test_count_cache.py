@@ -0,0 +1,117 @@
+"""
+Unit tests для версий данных и кэша количества строк в списках.
+
+Запуск:
+    pytest tests/test_count_cache.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import select, func, update
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.versioning import get_data_versions
+from app.models import Client
+from app.core import count_cache
+from app.core.count_cache import cached_count
+
+
+def make_client(number: int, status: str = 'pending') -> Client:
+    return Client(
+        fio=f'Клиент {number}', iin=f'{number:012d}', creditor='Kaspi Bank',
+        amount=1000, days_overdue=10, phone='+77011234567', status=status
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    count_cache._count_cache.clear()
+
+
+def count_pending():
+    return select(func.count(Client.id)).where(Client.status == 'pending')
+
+
+class TestDataVersions:
+    """Тесты учета версий данных."""
+
+    def test_commit_bumps_version(self, run_with_db):
+        """Коммит с изменением клиентов увеличивает версию clients."""
+        async def scenario(session):
+            assert await get_data_versions(session) == {'clients': 0, 'call_records': 0}
+
+            session.add(make_client(1))
+            await session.commit()
+            assert (await get_data_versions(session))['clients'] == 1
+
+            await session.execute(update(Client).values(status='completed'))
+            await session.commit()
+            assert (await get_data_versions(session))['clients'] == 2
+
+            # Чтение версию не меняет
+            await session.execute(select(Client))
+            await session.commit()
+            assert await get_data_versions(session) == {'clients': 2, 'call_records': 0}
+
+        run_with_db(scenario)
+
+    def test_rollback_keeps_version(self, run_with_db):
+        """Откаченные изменения версию не меняют."""
+        async def scenario(session):
+            session.add(make_client(1))
+            await session.rollback()
+            await session.commit()
+
+            assert (await get_data_versions(session))['clients'] == 0
+
+        run_with_db(scenario)
+
+
+class TestCountCache:
+    """Тесты кэша количества строк."""
+
+    def test_exact_count_invalidated_by_write(self, run_with_db):
+        """Точный режим пересчитывает total после записи в клиентов."""
+        async def scenario(session):
+            session.add_all([make_client(1), make_client(2)])
+            await session.commit()
+
+            filters = {'status': 'pending'}
+            assert await cached_count(session, 'clients', filters, count_pending()) == 2
+
+            session.add(make_client(3))
+            await session.commit()
+            assert await cached_count(session, 'clients', filters, count_pending()) == 3
+
+        run_with_db(scenario)
+
+    def test_approximate_count_may_be_stale(self, run_with_db):
+        """Приблизительный режим отдает значение из кэша до истечения TTL."""
+        async def scenario(session):
+            session.add(make_client(1))
+            await session.commit()
+
+            filters = {'status': 'pending'}
+            assert await cached_count(session, 'clients', filters, count_pending(), 'approximate') == 1
+
+            session.add(make_client(2))
+            await session.commit()
+            assert await cached_count(session, 'clients', filters, count_pending(), 'approximate') == 1
+            assert await cached_count(session, 'clients', filters, count_pending(), 'exact') == 2
+
+        run_with_db(scenario)
+
+    def test_none_mode(self, run_with_db):
+        """В режиме none количество не считается."""
+        async def scenario(session):
+            assert await cached_count(session, 'clients', {}, count_pending(), 'none') is None
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
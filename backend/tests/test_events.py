@@ -0,0 +1,97 @@
+"""
+Unit tests для событий потока аналитики (/analytics/stream).
+
+Запуск:
+    pytest tests/test_events.py -v
+"""
+
+import asyncio
+import json
+import pytest
+import sys
+from pathlib import Path
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Client
+from app.core import events
+from app.core.events import publish_event, subscribe, format_sse
+
+
+def event_data(message: bytes) -> dict:
+    return json.loads(message.split(b'data: ', 1)[1])
+
+
+def drain(queue) -> list:
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+class TestEventHub:
+    """Тесты рассылки событий."""
+
+    def test_format_sse(self):
+        assert format_sse('stats', {'a': 1}, 7) == b'id: 7\nevent: stats\ndata: {"a":1}\n\n'
+        assert format_sse('snapshot', b'{}') == b'event: snapshot\ndata: {}\n\n'
+
+    def test_fan_out_serialized_once(self):
+        """Все подписчики получают один и тот же объект сообщения."""
+        async def scenario():
+            with subscribe() as first, subscribe() as second:
+                publish_event('call', {'category': 'promise'})
+                [message] = drain(first)
+                assert drain(second)[0] is message
+                assert b'event: call' in message
+            assert events.subscriber_count() == 0
+
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_gets_resync(self, monkeypatch):
+        """Переполненная очередь очищается, подписчик получает resync (None)."""
+        monkeypatch.setattr(events, 'EVENT_QUEUE_SIZE', 2)
+
+        async def scenario():
+            with subscribe() as queue:
+                for i in range(3):
+                    publish_event('bulk_progress', {'processed': i})
+                assert drain(queue) == [None]
+
+        asyncio.run(scenario())
+
+
+class TestRollupEvents:
+    """Тесты событий stats после коммита."""
+
+    def test_commit_publishes_deltas(self, run_with_db):
+        """Коммит отправляет изменения счетчиков, откат - ничего."""
+        async def scenario(session):
+            with subscribe() as queue:
+                client = Client(
+                    fio='Клиент', iin='000000000001', creditor='Kaspi Bank',
+                    amount=1000, days_overdue=10, phone='+77011234567'
+                )
+                session.add(client)
+                await session.commit()
+
+                client.status = 'processing'
+                await session.flush()
+                await session.rollback()
+
+                client.status = 'failed'
+                await session.commit()
+
+                messages = drain(queue)
+
+            assert [event_data(message) for message in messages] == [
+                {'status': {'pending': 1}, 'creditor': {'Kaspi Bank': 1}},
+                {'status': {'pending': -1, 'failed': 1}},
+            ]
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,374 @@
+"""
+Unit tests для выгрузки клиентов: запросы, Excel, CSV, NDJSON и фоновые задачи.
+
+Запуск:
+    pytest tests/test_export.py -v
+"""
+
+import asyncio
+import csv
+import io
+import json
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+from app.models import Client, CallRecord
+from app.core import export, export_jobs
+from app.core.export import build_export_query, stream_csv, stream_ndjson, CLIENT_EXPORT_FIELDS
+from app.core.export_cache import build_cached_export
+from app.utils.excel import export_to_excel, EXPORT_HEADERS, WIDE_EXPORT_HEADERS
+from app.models import ExportJob
+from app.api.v1 import export as export_api
+from app.config import settings
+from app.utils.bundle import _spool_partitions, write_workbook_from_spool, bundle_filename
+
+
+def seed_clients(session: Session) -> None:
+    """Два клиента: с двумя звонками и без звонков."""
+    called = Client(
+        fio='Иванов Иван', iin='512531261074', creditor='Kaspi Bank',
+        amount=150000, days_overdue=30, phone='+77011234567',
+        status='completed', category='promise',
+        created_at=datetime(2024, 1, 2)
+    )
+    not_called = Client(
+        fio='Петров Петр', iin='081958120404', creditor='Halyk Bank',
+        amount=50000, days_overdue=10, phone='+77017654321',
+        status='pending', created_at=datetime(2024, 1, 1)
+    )
+    session.add_all([called, not_called])
+    session.flush()
+
+    session.add_all([
+        CallRecord(
+            client_id=called.id, transcript='Не могу сейчас', category='refusal',
+            confidence=0.6, detected_language='ru', created_at=datetime(2024, 2, 1)
+        ),
+        CallRecord(
+            client_id=called.id, transcript='Заплачу в пятницу', category='promise',
+            confidence=0.9, detected_language='ru',
+            call_metadata={'promised_date': '2024-03-08', 'confidence': 0.9},
+            created_at=datetime(2024, 3, 1)
+        )
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def session():
+    """БД в памяти с двумя клиентами: с двумя звонками и без звонков."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        seed_clients(session)
+        yield session
+
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    """
+    Файловая БД с теми же клиентами для кода, который сам открывает сессии
+    через AsyncSessionLocal (потоковые выгрузки, фоновые задачи).
+    """
+    db_path = tmp_path / 'clients.db'
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_clients(session)
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    monkeypatch.setattr(export, 'AsyncSessionLocal', factory)
+    monkeypatch.setattr(export_jobs, 'AsyncSessionLocal', factory)
+    monkeypatch.setattr(settings, 'EXPORT_PATH', str(tmp_path / 'exports'))
+    return factory
+
+
+async def collect(stream) -> bytes:
+    return b''.join([chunk async for chunk in stream])
+
+
+class TestExportQuery:
+    """Тесты запросов выгрузки."""
+
+    def test_basic_export_replaces_empty_category(self, session):
+        """В Excel выгрузке пустая категория заменяется на 'не обработано'."""
+        rows = session.execute(build_export_query()).all()
+
+        assert [row.iin for row in rows] == ['512531261074', '081958120404']
+        assert rows[1].category == 'не обработано'
+
+    def test_filters(self, session):
+        """Фильтр по статусу применяется к клиентам."""
+        rows = session.execute(build_export_query(status='pending')).all()
+
+        assert [row.iin for row in rows] == ['081958120404']
+
+    def test_wide_export_joins_latest_call(self, session):
+        """Широкая выгрузка берет только последний звонок клиента."""
+        rows = session.execute(
+            build_export_query(columns=CLIENT_EXPORT_FIELDS, view='wide')
+        ).all()
+
+        assert len(rows) == 2
+        called, not_called = rows
+        assert called.transcript == 'Заплачу в пятницу'
+        assert called.call_category == 'promise'
+        assert called.confidence == 0.9
+        assert called.promised_date == '2024-03-08'
+        assert not_called.transcript is None
+        assert not_called.call_category is None
+
+    def test_wide_xlsx_has_promised_date(self, session, tmp_path):
+        """Дата обещания из call_metadata попадает в свою колонку широкой Excel выгрузки."""
+        rows = [tuple(row) for row in session.execute(build_export_query(view='wide'))]
+
+        async def batches():
+            yield rows
+
+        output = tmp_path / 'wide.xlsx'
+        asyncio.run(export_to_excel(batches(), str(output), WIDE_EXPORT_HEADERS))
+
+        header, called, not_called = load_workbook(output).active.iter_rows(values_only=True)
+        column = header.index('Дата обещания')
+        assert called[column] == '2024-03-08'
+        assert not_called[column] is None
+
+    def test_unknown_view(self):
+        """Неизвестный вид выгрузки - ValueError."""
+        with pytest.raises(ValueError):
+            build_export_query(view='full')
+
+
+class TestExportToExcel:
+    """Тесты потоковой записи Excel выгрузки."""
+
+    def test_roundtrip(self, tmp_path):
+        """Пачки строк записываются по порядку и читаются openpyxl обратно."""
+        rows = [
+            (f'Клиент {n}', f'{n:012d}', 'Kaspi Bank', 1000.5 * n, n, '+77011234567', 'pending', 'promise')
+            for n in range(1, 8)
+        ]
+        progress = []
+
+        async def batches():
+            for start in range(0, len(rows), 3):
+                yield rows[start:start + 3]
+
+        async def on_progress(rows_written: int):
+            progress.append(rows_written)
+
+        output = tmp_path / 'export' / 'clients.xlsx'
+        written = asyncio.run(export_to_excel(batches(), str(output), on_progress=on_progress))
+
+        assert written == 7
+        assert progress == [3, 6, 7]
+
+        workbook = load_workbook(output, read_only=True)
+        assert workbook.sheetnames == ['Клиенты']
+        assert list(workbook.active.iter_rows(values_only=True)) == [tuple(EXPORT_HEADERS), *rows]
+        workbook.close()
+
+        assert [path.name for path in output.parent.iterdir()] == ['clients.xlsx']
+
+    def test_error_leaves_no_file(self, tmp_path):
+        """При ошибке чтения из БД не остается ни итогового, ни временного файла."""
+        async def batches():
+            yield [('Клиент', '000000000001')]
+            raise RuntimeError("соединение с БД потеряно")
+
+        output = tmp_path / 'clients.xlsx'
+        with pytest.raises(RuntimeError):
+            asyncio.run(export_to_excel(batches(), str(output)))
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_save_error_removes_part(self, tmp_path, monkeypatch):
+        """Недописанный временный .part файл удаляется, если сохранение книги упало."""
+        save = Workbook.save
+
+        def broken_save(workbook, path):
+            save(workbook, path)
+            raise OSError("нет места на диске")
+
+        monkeypatch.setattr(Workbook, 'save', broken_save)
+
+        async def batches():
+            yield [('Клиент', '000000000001')]
+
+        with pytest.raises(OSError):
+            asyncio.run(export_to_excel(batches(), str(tmp_path / 'clients.xlsx')))
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestStreamingExport:
+    """Тесты потоковых CSV и NDJSON выгрузок."""
+
+    # Общие колонки Excel и машинных выгрузок
+    SHARED_FIELDS = ('fio', 'iin', 'creditor', 'amount', 'days_overdue', 'phone')
+    WIDE_FIELDS = ('call_category', 'confidence', 'detected_language', 'promised_date', 'transcript')
+
+    @pytest.mark.parametrize('view', ['basic', 'wide'])
+    def test_csv_and_ndjson_match_xlsx(self, session_factory, view):
+        """CSV и NDJSON отдают тех же клиентов в том же порядке и с теми же значениями, что Excel."""
+        headers = WIDE_EXPORT_HEADERS if view == 'wide' else EXPORT_HEADERS
+        fields = self.SHARED_FIELDS + (self.WIDE_FIELDS if view == 'wide' else ())
+
+        async def main():
+            async with session_factory() as db:
+                xlsx_path = await build_cached_export(
+                    db, build_export_query(view=view), {'view': view}, headers=headers
+                )
+            query = build_export_query(columns=CLIENT_EXPORT_FIELDS, view=view)
+            return xlsx_path, await collect(stream_csv(query)), await collect(stream_ndjson(query))
+
+        xlsx_path, csv_body, ndjson_body = asyncio.run(main())
+
+        header, *xlsx_rows = load_workbook(xlsx_path).active.iter_rows(values_only=True)
+        assert list(header) == headers
+        # Колонки Excel выгрузки в порядке fields
+        xlsx_columns = list(self.SHARED_FIELDS) + ['category'] + list(self.WIDE_FIELDS)
+        expected = [
+            {field: row[xlsx_columns.index(field)] for field in fields}
+            for row in xlsx_rows
+        ]
+        assert [row['iin'] for row in expected] == ['512531261074', '081958120404']
+
+        ndjson_rows = [json.loads(line) for line in ndjson_body.decode('utf-8').splitlines()]
+        ndjson_values = [{field: row[field] for field in fields} for row in ndjson_rows]
+        assert ndjson_values == expected
+
+        # В CSV те же значения строками (дробные суммы как 150000.0, а не как в Excel)
+        csv_rows = list(csv.DictReader(io.StringIO(csv_body.decode('utf-8'))))
+        assert [{field: row[field] for field in fields} for row in csv_rows] == [
+            {field: '' if value is None else str(value) for field, value in row.items()}
+            for row in ndjson_values
+        ]
+
+        # Без категории: в Excel подпись, в машинных выгрузках пусто
+        assert xlsx_rows[1][xlsx_columns.index('category')] == 'не обработано'
+        assert ndjson_rows[1]['category'] is None
+
+
+class TestExportJobs:
+    """Тесты фоновых задач выгрузки."""
+
+    def test_job_lifecycle_and_ranged_download(self, session_factory, api_client, monkeypatch):
+        """queued -> completed с прогрессом, файл скачивается по частям через Range."""
+        jobs = []
+        monkeypatch.setattr(export_api, 'enqueue_export_job', jobs.append)
+
+        async def main():
+            async with session_factory() as db, api_client(db, export_api.router) as client:
+                response = await client.post("/api/v1/export/jobs", params={'view': 'wide'})
+                assert response.status_code == 200
+                job_id = response.json()['job_id']
+                assert jobs == [job_id]
+
+                status = (await client.get(f"/api/v1/export/jobs/{job_id}")).json()
+                assert (status['status'], status['download_url']) == ('queued', None)
+                assert (await client.get(f"/api/v1/export/jobs/{job_id}/download")).status_code == 409
+
+                await export_jobs.run_export_job(job_id)
+                db.expire_all()
+
+                status = (await client.get(f"/api/v1/export/jobs/{job_id}")).json()
+                assert status['status'] == 'completed'
+                assert (status['rows_total'], status['rows_written'], status['progress']) == (2, 2, 100)
+                assert status['download_url'] == f"/api/v1/export/jobs/{job_id}/download"
+
+                full = await client.get(status['download_url'])
+                head = await client.get(status['download_url'], headers={'Range': 'bytes=0-99'})
+                tail = await client.get(status['download_url'], headers={'Range': 'bytes=100-'})
+
+                return status, full, head, tail
+
+        status, full, head, tail = asyncio.run(main())
+
+        assert full.status_code == 200
+        assert len(full.content) == status['file_size']
+        assert (head.status_code, tail.status_code) == (206, 206)
+        assert head.headers['content-range'] == f"bytes 0-99/{status['file_size']}"
+        assert head.content + tail.content == full.content
+
+        header, called, _ = load_workbook(io.BytesIO(full.content)).active.iter_rows(values_only=True)
+        assert list(header) == WIDE_EXPORT_HEADERS
+        assert called[WIDE_EXPORT_HEADERS.index('Транскрипт')] == 'Заплачу в пятницу'
+
+    def test_failed_job(self, session_factory, monkeypatch):
+        """Ошибка сборки переводит задачу в failed с текстом ошибки."""
+        async def broken_export(*args, **kwargs):
+            raise RuntimeError("нет места на диске")
+
+        monkeypatch.setattr(export_jobs, 'build_cached_export', broken_export)
+
+        async def main():
+            async with session_factory() as db:
+                db.add(ExportJob(id='job', status='queued'))
+                await db.commit()
+
+            await export_jobs.run_export_job('job')
+
+            async with session_factory() as db:
+                return await db.get(ExportJob, 'job')
+
+        job = asyncio.run(main())
+
+        assert job.status == 'failed'
+        assert job.error == "нет места на диске"
+        assert job.file_path is None
+        assert job.finished_at is not None
+
+
+class TestBundle:
+    """Тесты выгрузки по кредиторам."""
+
+    def test_partitions_roundtrip(self, tmp_path):
+        """Строки раскладываются по кредиторам и собираются в отдельные книги."""
+        rows = [
+            ('Иванов', '1', 'Kaspi Bank', 100.0),
+            ('Петров', '2', 'Halyk Bank', 200.0),
+            ('Сидоров', '3', 'Kaspi Bank', 300.0)
+        ]
+        spools = {}
+        _spool_partitions(tmp_path, rows[:2], 2, spools)
+        _spool_partitions(tmp_path, rows[2:], 2, spools)
+
+        assert set(spools) == {'Kaspi Bank', 'Halyk Bank'}
+
+        output = tmp_path / 'kaspi.xlsx'
+        headers = ['ФИО', 'ИИН', 'Кредитор', 'Сумма']
+        assert write_workbook_from_spool(str(spools['Kaspi Bank']), str(output), headers) == 2
+
+        sheet = load_workbook(output, read_only=True).active
+        assert list(sheet.iter_rows(values_only=True)) == [tuple(headers), rows[0], rows[2]]
+
+    def test_bundle_filename(self):
+        """Имена книг без недопустимых символов и без повторов."""
+        used = set()
+
+        assert bundle_filename('ТОО "Кредит/Плюс"', used) == 'ТОО _Кредит_Плюс_.xlsx'
+        assert bundle_filename('Kaspi Bank', used) == 'Kaspi Bank.xlsx'
+        assert bundle_filename('kaspi bank', used) == 'kaspi bank_2.xlsx'
+        assert bundle_filename('', used) == 'без_кредитора.xlsx'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,79 @@
+"""
+Unit tests для кэша выгрузок.
+
+Запуск:
+    pytest tests/test_export_cache.py -v
+"""
+
+import os
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.export_cache import get_cached_export, evict_export_cache, export_cache_dir
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Кэш выгрузок во временной директории."""
+    monkeypatch.setattr(settings, 'EXPORT_PATH', str(tmp_path))
+    return export_cache_dir()
+
+
+def make_file(directory, name, size, age_seconds=0):
+    path = directory / name
+    path.write_bytes(b'x' * size)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestExportCache:
+    """Тесты попаданий и вытеснения."""
+
+    def test_miss_and_hit(self, cache_dir):
+        """Отсутствующий файл - промах, существующий - попадание с обновлением mtime."""
+        assert get_cached_export('abc', '.xlsx') is None
+
+        path = make_file(cache_dir, 'abc.xlsx', 10, age_seconds=600)
+        assert get_cached_export('abc', '.xlsx') == path
+        assert time.time() - path.stat().st_mtime < 60
+
+    def test_evicts_old_files(self, cache_dir, monkeypatch):
+        """Файлы старше EXPORT_CACHE_MAX_AGE_HOURS удаляются."""
+        monkeypatch.setattr(settings, 'EXPORT_CACHE_MAX_AGE_HOURS', 1)
+        old = make_file(cache_dir, 'old.xlsx', 10, age_seconds=7200)
+        fresh = make_file(cache_dir, 'fresh.xlsx', 10)
+
+        assert evict_export_cache() == 1
+        assert not old.exists()
+        assert fresh.exists()
+
+    def test_evicts_least_recently_used_over_size_limit(self, cache_dir, monkeypatch):
+        """При превышении размера удаляются давно не использованные файлы."""
+        monkeypatch.setattr(settings, 'EXPORT_CACHE_MAX_BYTES', 250)
+        lru = make_file(cache_dir, 'lru.xlsx', 100, age_seconds=300)
+        middle = make_file(cache_dir, 'middle.xlsx', 100, age_seconds=200)
+        recent = make_file(cache_dir, 'recent.xlsx', 100, age_seconds=100)
+
+        assert evict_export_cache(keep=recent) == 1
+        assert not lru.exists()
+        assert middle.exists()
+        assert recent.exists()
+
+    def test_keeps_partial_files(self, cache_dir, monkeypatch):
+        """Недописанные .part файлы не трогаются."""
+        monkeypatch.setattr(settings, 'EXPORT_CACHE_MAX_BYTES', 0)
+        part = make_file(cache_dir, '.abc.xlsx.part', 100)
+
+        assert evict_export_cache() == 0
+        assert part.exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
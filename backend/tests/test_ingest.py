@@ -0,0 +1,150 @@
+"""
+Unit tests для записи реестра в БД пачками.
+
+Запуск:
+    pytest tests/test_ingest.py -v
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import event, select, func, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+from app.models import Client
+from app.core.ingest import write_batches, insert_clients_bulk, upsert_clients_bulk
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def skip_iin_checksum(monkeypatch):
+    monkeypatch.setattr(settings, 'INGEST_VALIDATE_IIN_CHECKSUM', False)
+
+
+def make_row(n: int, amount: float = 1000) -> dict:
+    """Сырая строка реестра, как ее отдает читатель файла."""
+    return {
+        '_row': n + 1, 'fio': f'Клиент {n}', 'iin': f'{n:012d}', 'creditor': 'Банк',
+        'amount': amount, 'days_overdue': 10, 'phone': '+77011234567'
+    }
+
+
+def make_batches(rows: list[dict], size: int):
+    return iter([rows[i:i + size] for i in range(0, len(rows), size)])
+
+
+async def count_clients(session) -> int:
+    return (await session.execute(select(func.count()).select_from(Client))).scalar_one()
+
+
+class TestResume:
+    """Тесты продолжения прерванной загрузки."""
+
+    def test_resume_continues_counters(self, run_with_db):
+        """Продолжение пропускает записанные строки и прибавляет к сохраненным счетчикам."""
+        async def scenario(session):
+            rows = [make_row(n) for n in range(1, 8)]
+
+            # Первый запуск успел записать одну пачку и был прерван
+            interrupted = await write_batches(make_batches(rows[:3], 3), session)
+            assert interrupted['inserted'] == 3
+
+            stats = await write_batches(make_batches(rows, 3), session, resume_from=interrupted)
+
+            assert stats['parsed'] == 7
+            assert stats['inserted'] == 7
+            assert stats['skipped'] == 0
+            assert await count_clients(session) == 7
+
+        run_with_db(scenario)
+
+    def test_resume_inside_batch(self, run_with_db):
+        """Размер пачки при продолжении может не совпадать с прерванным запуском."""
+        async def scenario(session):
+            rows = [make_row(n) for n in range(1, 6)]
+            interrupted = await write_batches(make_batches(rows[:2], 2), session)
+
+            stats = await write_batches(make_batches(rows, 3), session, resume_from=interrupted)
+
+            assert (stats['parsed'], stats['inserted'], stats['skipped']) == (5, 5, 0)
+
+        run_with_db(scenario)
+
+
+class TestUpsertDuplicates:
+    """Тесты дубликатов ИИН внутри файла в режиме upsert."""
+
+    @pytest.mark.parametrize('first_mode', ['insert', 'upsert'])
+    def test_reupload_identical_file(self, run_with_db, first_mode):
+        """Повторная загрузка того же файла ничего не обновляет и не сбрасывает статусы."""
+        async def scenario(session):
+            rows = [make_row(n) for n in range(1, 6)]
+            # Повтор ИИН с другой суммой в той же пачке и в следующей
+            rows.insert(2, make_row(1, amount=5000))
+            rows.append(make_row(2, amount=7000))
+
+            first = await write_batches(make_batches(rows, 4), session, mode=first_mode)
+            assert (first['inserted'], first['skipped']) == (5, 2)
+
+            await session.execute(update(Client).values(status='completed', category='promise'))
+            await session.commit()
+
+            stats = await write_batches(make_batches(rows, 4), session, mode='upsert')
+
+            assert stats['updated'] == 0
+            assert stats['unchanged'] == 5
+            assert stats['skipped'] == 2
+
+            result = await session.execute(select(Client.amount, Client.status).order_by(Client.iin))
+            assert [tuple(row) for row in result] == [(1000, 'completed')] * 5
+
+        run_with_db(scenario)
+
+
+class TestBulkChunks:
+    """Тесты пачек больше лимита параметров SQLite."""
+
+    def test_large_batch_under_variable_limit(self):
+        """В запросах пачки из 2500 ИИН не больше 999 параметров (лимит SQLite < 3.32)."""
+        rows = [
+            {key: value for key, value in make_row(n).items() if key != '_row'}
+            for n in range(1, 2501)
+        ]
+
+        parameter_counts = []
+
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://")
+
+            # Число параметров каждого запроса (executemany - на одну строку)
+            @event.listens_for(engine.sync_engine, "before_cursor_execute")
+            def count_parameters(conn, cursor, statement, parameters, context, executemany):
+                parameter_counts.append(len(parameters[0] if executemany else parameters))
+
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    assert await insert_clients_bulk(rows[:2000], session) == (2000, 0)
+                    assert await insert_clients_bulk(rows, session) == (500, 2000)
+
+                    stats = await upsert_clients_bulk(rows, session)
+                    assert (stats['inserted'], stats['unchanged']) == (0, 2500)
+
+                    assert await count_clients(session) == 2500
+            finally:
+                await engine.dispose()
+
+        asyncio.run(main())
+
+        assert max(parameter_counts) <= 999
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,71 @@
+"""
+Unit tests для курсоров пагинации и сериализации списков.
+
+Запуск:
+    pytest tests/test_pagination.py -v
+"""
+
+import json
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.pagination import encode_cursor, decode_cursor
+from app.utils import json_response
+
+
+class TestCursor:
+    """Тесты кодирования курсоров."""
+
+    def test_roundtrip(self):
+        """Курсор восстанавливает позицию с точностью до микросекунд."""
+        created_at = datetime(2024, 5, 17, 10, 30, 15, 123456)
+
+        cursor = encode_cursor(created_at, 42, 'prev')
+
+        assert decode_cursor(cursor) == (created_at, 42, 'prev')
+
+    def test_cursor_is_url_safe(self):
+        """В токене нет символов, которые нужно экранировать в query string."""
+        cursor = encode_cursor(datetime(2024, 1, 1), 10 ** 9)
+
+        assert not set(cursor) & set('+/=&?')
+
+    @pytest.mark.parametrize('cursor', ['garbage', '', 'e30', encode_cursor(datetime(2024, 1, 1), 1, 'up')])
+    def test_invalid_cursor(self, cursor):
+        """Поврежденный курсор - ValueError."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+
+class TestJSONResponse:
+    """Тесты сериализации ответов списков."""
+
+    CONTENT = {
+        'items': [{'id': 1, 'fio': 'Иванов', 'created_at': datetime(2024, 5, 17, 10, 30, 15, 123456)}],
+        'total': None
+    }
+
+    def test_datetime_as_iso(self):
+        """Даты сериализуются в ISO формате, как у Pydantic."""
+        data = json.loads(json_response.dumps(self.CONTENT))
+
+        assert data['items'][0]['created_at'] == '2024-05-17T10:30:15.123456'
+        assert data['items'][0]['fio'] == 'Иванов'
+        assert data['total'] is None
+
+    def test_without_orjson(self, monkeypatch):
+        """Без orjson ответ тот же через стандартный json."""
+        expected = json.loads(json_response.dumps(self.CONTENT))
+        monkeypatch.setattr(json_response, 'orjson', None)
+
+        assert json.loads(json_response.dumps(self.CONTENT)) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Unit tests для потокового чтения реестров Excel, CSV и Parquet.
+
+Запуск:
+    pytest tests/test_registry.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from openpyxl import Workbook
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.registry import detect_csv_format, iter_csv_batches, iter_parquet_batches
+from app.utils.excel import iter_excel_batches
+from app.utils.validation import validate_batch
+from app.config import settings
+
+HEADER = ['ФИО', 'ИИН', 'Кредитор', 'Сумма', 'Дни просрочки', 'Телефон']
+
+
+@pytest.fixture(autouse=True)
+def skip_iin_checksum(monkeypatch):
+    monkeypatch.setattr(settings, 'INGEST_VALIDATE_IIN_CHECKSUM', False)
+
+
+def make_rows(count: int) -> list[list]:
+    return [
+        [f'Клиент {n}', f'{n:012d}', 'Банк', 1000 + n, 10, '+77011234567']
+        for n in range(1, count + 1)
+    ]
+
+
+def write_xlsx(path: Path, rows: list[list]) -> Path:
+    workbook = Workbook()
+    workbook.active.append(HEADER)
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return path
+
+
+class TestExcel:
+    """Тесты потокового чтения xlsx."""
+
+    def test_batches_keep_row_numbers(self, tmp_path):
+        """Пачки фиксированного размера, '_row' - номер строки листа и через границы пачек."""
+        rows = make_rows(9)
+        # Пустая строка пропускается, но нумерация следующих не сдвигается
+        rows.insert(4, [None] * len(HEADER))
+        path = write_xlsx(tmp_path / 'registry.xlsx', rows)
+
+        batches = list(iter_excel_batches(str(path), 4))
+
+        assert [len(batch) for batch in batches] == [4, 4, 1]
+        assert [row['_row'] for batch in batches for row in batch] == [2, 3, 4, 5, 7, 8, 9, 10, 11]
+        assert batches[1][0]['fio'] == 'Клиент 5'
+        assert batches[2][0] == {
+            'fio': 'Клиент 9', 'iin': '000000000009', 'creditor': 'Банк',
+            'amount': 1009, 'days_overdue': 10, 'phone': '+77011234567', '_row': 11
+        }
+
+    def test_missing_columns(self, tmp_path):
+        path = tmp_path / 'registry.xlsx'
+        workbook = Workbook()
+        workbook.active.append(['ФИО', 'ИИН'])
+        workbook.save(path)
+
+        with pytest.raises(ValueError, match='Отсутствуют обязательные колонки'):
+            list(iter_excel_batches(str(path), 4))
+
+
+class TestCsv:
+    """Тесты определения формата и чтения CSV."""
+
+    def test_cp1251_semicolon(self, tmp_path):
+        """Выгрузка из 1С: cp1251, разделитель ';', дробная часть через запятую."""
+        path = tmp_path / 'registry.csv'
+        path.write_bytes((
+            "ФИО;ИИН;Кредитор;Сумма;Дни просрочки;Телефон\r\n"
+            "Иванов Иван;000000000001;Банк;1 500,50;10;+77011234567\r\n"
+            "Петров Петр;000000000002;Банк;200,25;5;+77011234568\r\n"
+        ).encode('cp1251'))
+
+        assert detect_csv_format(str(path)) == ('cp1251', ';')
+
+        batches = list(iter_csv_batches(str(path), 10))
+        assert len(batches) == 1
+        assert [row['fio'] for row in batches[0]] == ['Иванов Иван', 'Петров Петр']
+        assert [row['_row'] for row in batches[0]] == [2, 3]
+
+        valid, errors = validate_batch(batches[0])
+        assert errors == []
+        assert [row['amount'] for row in valid] == [1500.5, 200.25]
+
+    def test_utf8_bom_comma(self, tmp_path):
+        """UTF-8 с BOM: BOM не попадает в имя первой колонки."""
+        path = tmp_path / 'registry.csv'
+        path.write_bytes((
+            "ФИО,ИИН,Кредитор,Сумма,Дни просрочки,Телефон\n"
+            "Иванов Иван,000000000001,Банк,1500.5,10,+77011234567\n"
+        ).encode('utf-8-sig'))
+
+        assert detect_csv_format(str(path)) == ('utf-8-sig', ',')
+
+        batch, = iter_csv_batches(str(path), 10)
+        assert batch[0]['fio'] == 'Иванов Иван'
+
+        valid, errors = validate_batch(batch)
+        assert errors == []
+        assert valid[0]['amount'] == 1500.5
+
+
+class TestParquet:
+    """Тесты чтения Parquet."""
+
+    def test_batches_match_xlsx(self, tmp_path):
+        """Номера строк и границы пачек такие же, как у того же реестра в xlsx."""
+        pa = pytest.importorskip('pyarrow')
+        pq = pytest.importorskip('pyarrow.parquet')
+
+        rows = make_rows(10)
+
+        xlsx_path = write_xlsx(tmp_path / 'registry.xlsx', rows)
+
+        # Группы строк по 3 не совпадают с размером пачки
+        parquet_path = tmp_path / 'registry.parquet'
+        table = pa.table({name: list(values) for name, values in zip(HEADER, zip(*rows))})
+        pq.write_table(table, parquet_path, row_group_size=3)
+
+        xlsx_batches = list(iter_excel_batches(str(xlsx_path), 4))
+        parquet_batches = list(iter_parquet_batches(str(parquet_path), 4))
+
+        assert [len(batch) for batch in parquet_batches] == [4, 4, 2]
+        assert parquet_batches == xlsx_batches
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+"""
+Unit tests для счетчиков статистики (stat_rollups).
+
+Запуск:
+    pytest tests/test_rollups.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.rollups import check_rollups, get_rollups, rebuild_rollups
+from app.models import Client, CallRecord, StatRollup, CallBucket
+from app.core.ingest import insert_clients_bulk, upsert_clients_bulk
+
+
+def make_client(number: int, creditor: str = 'Kaspi Bank') -> Client:
+    return Client(
+        fio=f'Клиент {number}', iin=f'{number:012d}', creditor=creditor,
+        amount=1000, days_overdue=10, phone='+77011234567'
+    )
+
+
+def make_row(number: int, creditor: str = 'Kaspi Bank', amount: float = 1000) -> dict:
+    return {
+        'fio': f'Клиент {number}', 'iin': f'{number:012d}', 'creditor': creditor,
+        'amount': amount, 'days_overdue': 10, 'phone': '+77011234567'
+    }
+
+
+class TestPipelineRollups:
+    """Тесты счетчиков при изменениях через ORM (как в call_pipeline)."""
+
+    def test_status_transitions(self, run_with_db):
+        """Смены статуса и категория звонка попадают в счетчики при коммите."""
+        async def scenario(session):
+            client = make_client(1)
+            session.add_all([client, make_client(2, creditor='Halyk Bank')])
+            await session.commit()
+
+            client.status = 'processing'
+            await session.commit()
+
+            call = CallRecord(client_id=client.id, tts_text='Здравствуйте')
+            session.add(call)
+            await session.commit()
+
+            call.category = 'promise'
+            client.status = 'completed'
+            client.category = 'promise'
+            await session.commit()
+
+            rollups = await get_rollups(session)
+            assert rollups['status'] == {'completed': 1, 'pending': 1}
+            assert rollups['creditor'] == {'Halyk Bank': 1, 'Kaspi Bank': 1}
+            assert rollups['creditor_completed'] == {'Kaspi Bank': 1}
+            assert rollups['category'] == {'promise': 1}
+            assert await check_rollups(session) == {}
+
+            # Звонок переложен из интервалов без категории в интервалы promise
+            result = await session.execute(select(CallBucket.granularity, CallBucket.category, CallBucket.calls))
+            assert sorted(result) == [('day', '', 0), ('day', 'promise', 1), ('hour', '', 0), ('hour', 'promise', 1)]
+
+        run_with_db(scenario)
+
+    def test_rollback_discards_changes(self, run_with_db):
+        """Откаченная транзакция не меняет счетчики, в том числе для истекших объектов."""
+        async def scenario(session):
+            client = make_client(1)
+            session.add(client)
+            await session.commit()
+
+            client.status = 'processing'
+            await session.flush()
+            await session.rollback()
+
+            # После rollback объект истек, старый статус читается из БД
+            client.status = 'failed'
+            await session.commit()
+
+            assert (await get_rollups(session))['status'] == {'failed': 1}
+            assert await check_rollups(session) == {}
+
+        run_with_db(scenario)
+
+
+class TestBulkRollups:
+    """Тесты счетчиков при массовой загрузке и пересчете."""
+
+    def test_insert_and_upsert(self, run_with_db):
+        """Загрузка и повторная загрузка реестра сохраняют счетчики точными."""
+        async def scenario(session):
+            await insert_clients_bulk([make_row(1), make_row(2), make_row(3)], session)
+            for client in (await session.execute(select(Client).where(Client.id <= 2))).scalars():
+                client.status = 'completed'
+            await session.commit()
+
+            # Новая сумма долга возвращает клиента в pending, смена кредитора - нет
+            await upsert_clients_bulk([
+                make_row(1, amount=2000),
+                make_row(2, creditor='Halyk Bank'),
+                make_row(4)
+            ], session)
+
+            rollups = await get_rollups(session)
+            assert rollups['status'] == {'completed': 1, 'pending': 3}
+            assert rollups['creditor_completed'] == {'Halyk Bank': 1}
+            assert await check_rollups(session) == {}
+
+        run_with_db(scenario)
+
+    def test_rebuild_fixes_drift(self, run_with_db):
+        """Пересчет восстанавливает счетчики, check_rollups показывает расхождения."""
+        async def scenario(session):
+            session.add_all([make_client(1), make_client(2)])
+            await session.commit()
+
+            await session.execute(
+                update(StatRollup).where(StatRollup.dimension == 'status').values(value=5)
+            )
+            await session.commit()
+            assert await check_rollups(session) == {('status', 'pending'): (5, 2)}
+
+            await rebuild_rollups(session)
+            assert await check_rollups(session) == {}
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
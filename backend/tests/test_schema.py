@@ -0,0 +1,98 @@
+"""
+Unit tests для дополнения схемы БД, созданной предыдущими версиями.
+
+Запуск:
+    pytest tests/test_schema.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import select, inspect
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+from app.db.schema import ADDED_COLUMNS, ADDED_INDEXES, ensure_schema
+from app.models import Client
+from app.core.breakdown import backfill_debt_buckets
+
+# Таблицы в том виде, в каком их создавали первые версии
+OLD_TABLES = (
+    "CREATE TABLE clients (id INTEGER PRIMARY KEY, fio VARCHAR NOT NULL, "
+    "iin VARCHAR NOT NULL UNIQUE, creditor VARCHAR NOT NULL, amount FLOAT NOT NULL, "
+    "days_overdue INTEGER NOT NULL, phone VARCHAR NOT NULL, status VARCHAR NOT NULL, "
+    "category VARCHAR, created_at DATETIME NOT NULL, processed_at DATETIME)",
+    "CREATE TABLE ingest_jobs (id VARCHAR PRIMARY KEY, filename VARCHAR NOT NULL, "
+    "file_path VARCHAR NOT NULL, status VARCHAR NOT NULL, rows_parsed INTEGER NOT NULL, "
+    "rows_inserted INTEGER NOT NULL, rows_skipped INTEGER NOT NULL, "
+    "rows_failed INTEGER NOT NULL, error TEXT, created_at DATETIME NOT NULL, "
+    "started_at DATETIME, finished_at DATETIME)",
+    "CREATE TABLE call_records (id INTEGER PRIMARY KEY, client_id INTEGER NOT NULL, "
+    "tts_text TEXT, tts_audio_path VARCHAR, response_audio_path VARCHAR, transcript TEXT, "
+    "detected_language VARCHAR, category VARCHAR, confidence FLOAT, call_metadata JSON, "
+    "created_at DATETIME NOT NULL)",
+    "CREATE TABLE export_jobs (id VARCHAR PRIMARY KEY, status_filter VARCHAR, "
+    "category_filter VARCHAR, status VARCHAR NOT NULL, rows_total INTEGER, "
+    "rows_written INTEGER NOT NULL, file_path VARCHAR, file_size INTEGER, error TEXT, "
+    "created_at DATETIME NOT NULL, started_at DATETIME, finished_at DATETIME)",
+    "CREATE INDEX ix_clients_id ON clients (id)",
+    "CREATE UNIQUE INDEX ix_clients_iin ON clients (iin)",
+    "CREATE INDEX ix_clients_status ON clients (status)",
+    "CREATE INDEX ix_call_records_id ON call_records (id)",
+    "CREATE INDEX ix_call_records_client_id ON call_records (client_id)",
+    "CREATE INDEX ix_ingest_jobs_status ON ingest_jobs (status)",
+    "CREATE INDEX ix_export_jobs_status ON export_jobs (status)",
+    "INSERT INTO clients (fio, iin, creditor, amount, days_overdue, phone, status, created_at) "
+    "VALUES ('Клиент', '000000000001', 'Банк', 1000, 10, '+77011234567', 'pending', "
+    "'2024-01-01 00:00:00')",
+)
+
+
+def upgrade_old_db(connection):
+    """Старт приложения на БД старой версии."""
+    for statement in OLD_TABLES:
+        connection.exec_driver_sql(statement)
+    Base.metadata.create_all(connection)
+    ensure_schema(connection)
+    backfill_debt_buckets(connection)
+
+
+class TestEnsureSchema:
+    """Тесты добавления столбцов и индексов в существующие таблицы."""
+
+    def test_old_tables_upgraded(self, run_with_db):
+        """В старые таблицы добавляются новые столбцы и индексы, данные сохраняются."""
+        def check_schema(connection):
+            inspector = inspect(connection)
+            for table_name, names in ADDED_COLUMNS.items():
+                columns = {column['name'] for column in inspector.get_columns(table_name)}
+                assert set(names) <= columns, table_name
+            for table_name, names in ADDED_INDEXES.items():
+                indexes = {index['name'] for index in inspector.get_indexes(table_name)}
+                assert set(names) <= indexes, table_name
+
+            # В старых таблицах есть все индексы моделей, как в созданных заново
+            for table_name in ('clients', 'call_records', 'ingest_jobs', 'export_jobs'):
+                indexes = {index['name'] for index in inspector.get_indexes(table_name)}
+                expected = {index.name for index in Base.metadata.tables[table_name].indexes}
+                assert expected <= indexes, table_name
+
+            # Повторный запуск ничего не меняет
+            ensure_schema(connection)
+
+        async def scenario(session):
+            await (await session.connection()).run_sync(check_schema)
+
+            client = (await session.execute(select(Client))).scalar_one()
+            assert client.iin == '000000000001'
+            assert client.batch_id is None
+            assert (client.overdue_bucket, client.amount_band) == ('0-30', '0-50k')
+
+        run_with_db(scenario, prepare=upgrade_old_db)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,121 @@
+"""
+Unit tests для полнотекстового поиска (SQLite FTS5).
+
+Запуск:
+    pytest tests/test_search.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.base import Base
+import app.models  # noqa: F401 - регистрирует таблицы в Base.metadata
+from app.core.search import setup_fulltext_search, build_match_query, highlight
+
+
+@pytest.fixture
+def connection():
+    """БД в памяти с таблицами, FTS5 индексами и одним клиентом до создания индекса."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO clients (id, fio, iin, creditor, amount, days_overdue, phone, status, created_at) "
+            "VALUES (1, 'Иванов Иван', '512531261074', 'Kaspi Bank', 1000, 10, '+77011234567', 'pending', '2024-01-01')"
+        )
+        setup_fulltext_search(conn)
+
+    with engine.begin() as conn:
+        yield conn
+
+    engine.dispose()
+
+
+def search_clients(conn, query):
+    return conn.execute(
+        text("SELECT rowid FROM clients_fts WHERE clients_fts MATCH :match ORDER BY rank"),
+        {'match': build_match_query(query)}
+    ).scalars().all()
+
+
+def search_calls(conn, query):
+    return conn.execute(
+        text("SELECT rowid FROM call_records_fts WHERE call_records_fts MATCH :match ORDER BY rank"),
+        {'match': build_match_query(query)}
+    ).scalars().all()
+
+
+class TestMatchQuery:
+    """Тесты построения запроса FTS5."""
+
+    def test_words_by_prefix(self):
+        assert build_match_query('Иван Пет') == '("Иван"* "Пет"*) OR ("Иван" "Пет")'
+
+    def test_phone(self):
+        """Телефон с разделителями ищется одним префиксом, 8 - и как 7."""
+        assert build_match_query('+7 (701) 123') == '"7701123"*'
+        assert build_match_query('8701') == '"8701"* OR "7701"*'
+
+    def test_syntax_is_escaped(self):
+        """Операторы FTS5 из ввода не интерпретируются."""
+        assert build_match_query('NEAR("x" OR *') == '("NEAR"* "x"* "OR"*) OR ("NEAR" "x" "OR")'
+        assert build_match_query('"*') is None
+
+
+class TestFulltextIndex:
+    """Тесты FTS5 таблиц и триггеров."""
+
+    def test_existing_rows_indexed(self, connection):
+        """Клиенты, добавленные до создания индекса, находятся."""
+        assert search_clients(connection, 'иван') == [1]
+
+    @pytest.mark.parametrize('query', ['иванов', '5125', '+7 701 123', '8701', '701123'])
+    def test_client_search(self, connection, query):
+        """Поиск по ФИО, ИИН и телефону в разных форматах."""
+        assert search_clients(connection, query) == [1]
+
+    def test_triggers_follow_updates(self, connection):
+        """Изменения и удаления клиентов и транскриптов попадают в индекс."""
+        connection.exec_driver_sql("UPDATE clients SET fio = 'Сапаров Ержан' WHERE id = 1")
+        assert search_clients(connection, 'иван') == []
+        assert search_clients(connection, 'сапар') == [1]
+
+        connection.exec_driver_sql(
+            "INSERT INTO call_records (id, client_id, created_at) VALUES (10, 1, '2024-01-02')"
+        )
+        assert search_calls(connection, 'завтра') == []
+
+        connection.exec_driver_sql("UPDATE call_records SET transcript = 'Заплачу завтра' WHERE id = 10")
+        assert search_calls(connection, 'завтра') == [10]
+
+        connection.exec_driver_sql("DELETE FROM call_records WHERE id = 10")
+        connection.exec_driver_sql("DELETE FROM clients WHERE id = 1")
+        assert search_calls(connection, 'завтра') == []
+        assert search_clients(connection, 'сапар') == []
+
+
+class TestHighlight:
+    """Тесты фрагмента транскрипта."""
+
+    def test_marks_matched_words(self):
+        assert highlight('Я заплачу завтра, честно', 'завтра') == 'Я заплачу <b>завтра,</b> честно'
+
+    def test_long_text_is_cut_around_match(self):
+        words = [f'слово{i}' for i in range(40)] + ['оплата'] + [f'конец{i}' for i in range(40)]
+
+        snippet = highlight(' '.join(words), 'оплат', max_words=8)
+
+        assert snippet.startswith('… ')
+        assert snippet.endswith(' …')
+        assert '<b>оплата</b>' in snippet
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
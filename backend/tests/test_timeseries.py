@@ -0,0 +1,107 @@
+"""
+Unit tests для рядов аналитики по интервалам звонков.
+
+Запуск:
+    pytest tests/test_timeseries.py -v
+"""
+
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Client, CallRecord
+from app.core.timeseries import bucket_start, bucket_starts, bucket_range, get_timeseries
+
+
+async def add_calls(session, calls: list[tuple]) -> None:
+    """Добавляет звонки (время, категория, кредитор) через ORM, как call_pipeline."""
+    clients = {}
+    for created_at, category, creditor in calls:
+        if creditor not in clients:
+            clients[creditor] = Client(
+                fio='Клиент', iin=f'{len(clients):012d}', creditor=creditor,
+                amount=1000, days_overdue=10, phone='+77011234567'
+            )
+            session.add(clients[creditor])
+            await session.flush()
+        session.add(CallRecord(
+            client_id=clients[creditor].id, created_at=created_at,
+            category=category, detected_language='ru' if category else None
+        ))
+    await session.commit()
+
+
+class TestBuckets:
+    """Тесты границ интервалов."""
+
+    def test_bucket_start(self):
+        moment = datetime(2024, 3, 14, 15, 42, 7)
+
+        assert bucket_start(moment, 'hour') == datetime(2024, 3, 14, 15)
+        assert bucket_start(moment, 'day') == datetime(2024, 3, 14)
+        assert bucket_start(moment, 'week') == datetime(2024, 3, 11)
+        assert bucket_start(moment, 'month') == datetime(2024, 3, 1)
+
+    def test_bucket_starts_cover_range(self):
+        """Диапазон расширяется до целых интервалов."""
+        starts = bucket_starts(datetime(2024, 1, 15), datetime(2024, 3, 2), 'month')
+
+        assert starts == [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)]
+        # Конец диапазона не включается
+        assert bucket_range(datetime(2024, 1, 15), datetime(2024, 3, 1), 'month') == (
+            datetime(2024, 1, 1), datetime(2024, 3, 1), 2
+        )
+
+    def test_year_of_hours_allowed(self):
+        assert len(bucket_starts(datetime(2024, 1, 1), datetime(2025, 1, 1), 'hour')) == 8784
+
+    @pytest.mark.parametrize('date_from, date_to, granularity', [
+        (datetime(2024, 1, 1), datetime(2024, 1, 1), 'day'),
+        (datetime(2020, 1, 1), datetime(2024, 1, 1), 'hour'),
+        (datetime(2024, 1, 1), datetime(2024, 2, 1), 'minute'),
+    ])
+    def test_invalid_ranges(self, date_from, date_to, granularity):
+        with pytest.raises(ValueError):
+            bucket_starts(date_from, date_to, granularity)
+
+
+class TestTimeseries:
+    """Тесты ряда из call_buckets."""
+
+    def test_granularities_and_groups(self, run_with_db):
+        """Часы, дни и месяцы считаются из одних интервалов, пустые точки с нулями."""
+        async def scenario(session):
+            await add_calls(session, [
+                (datetime(2024, 1, 31, 10, 5), 'promise', 'Kaspi Bank'),
+                (datetime(2024, 1, 31, 10, 50), None, 'Kaspi Bank'),
+                (datetime(2024, 2, 2, 9, 0), 'promise', 'Halyk Bank'),
+            ])
+
+            hours = await get_timeseries(session, 'hour', datetime(2024, 1, 31, 9), datetime(2024, 1, 31, 12))
+            assert [point['total'] for point in hours] == [0, 2, 0]
+
+            days = await get_timeseries(
+                session, 'day', datetime(2024, 1, 31), datetime(2024, 2, 3), group_by='category'
+            )
+            assert [point['groups'] for point in days] == [
+                {'promise': 1, 'unknown': 1}, {}, {'promise': 1}
+            ]
+
+            months = await get_timeseries(
+                session, 'month', datetime(2024, 1, 1), datetime(2024, 3, 1),
+                group_by='creditor', filters={'category': 'promise'}
+            )
+            assert [(point['start'], point['groups']) for point in months] == [
+                (datetime(2024, 1, 1), {'Kaspi Bank': 1}),
+                (datetime(2024, 2, 1), {'Halyk Bank': 1}),
+            ]
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,227 @@
+"""
+Unit tests для приема реестров: сохранение на диск, повторные загрузки и пробный разбор.
+
+Запуск:
+    pytest tests/test_upload.py -v
+"""
+
+import asyncio
+import hashlib
+import io
+import pytest
+import sys
+from pathlib import Path
+
+from fastapi import UploadFile
+from openpyxl import Workbook
+from sqlalchemy import select, func
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Client, IngestBatch, IngestJob
+from app.api.v1 import upload
+from app.utils import uploads
+from app.utils.uploads import spool_upload
+from app.utils.registry import preview_registry
+from app.config import settings
+
+REGISTRY_CSV = (
+    "ФИО;ИИН;Кредитор;Сумма;Дни просрочки;Телефон\n"
+    "Иванов Иван;000000000001;Банк;1000;10;+77011234567\n"
+).encode('utf-8')
+
+
+@pytest.fixture(autouse=True)
+def skip_iin_checksum(monkeypatch):
+    monkeypatch.setattr(settings, 'INGEST_VALIDATE_IIN_CHECKSUM', False)
+
+
+def write_registry_xlsx(path: Path) -> Path:
+    """Реестр с нестандартными заголовками, лишней колонкой и ошибкой во второй строке."""
+    workbook = Workbook()
+    workbook.active.append(['Клиент', 'IIN', 'Bank', 'Debt', 'Days', 'Tel', 'Комментарий'])
+    for n in range(1, 6):
+        phone = 'нет' if n == 2 else '+77011234567'
+        workbook.active.append([f'Клиент {n}', f'{n:012d}', 'Банк', 1000, 10, phone, ''])
+    workbook.save(path)
+    return path
+
+
+async def count_clients(session) -> int:
+    return (await session.execute(select(func.count()).select_from(Client))).scalar_one()
+
+
+@pytest.fixture
+def upload_dir(monkeypatch, tmp_path):
+    """Файлы сохраняются во временную директорию, фоновая загрузка не запускается."""
+    monkeypatch.setattr(settings, 'UPLOAD_PATH', str(tmp_path))
+    monkeypatch.setattr(upload, 'enqueue_ingest_job', lambda job_id: None)
+    return tmp_path
+
+
+class TestSpoolUpload:
+    """Тесты потокового сохранения файла."""
+
+    def test_hash_and_size(self, monkeypatch, tmp_path):
+        """SHA-256 по кускам совпадает с хешем всего содержимого, временного файла не остается."""
+        monkeypatch.setattr(uploads, 'UPLOAD_CHUNK_SIZE', 1000)
+        data = bytes(range(256)) * 50
+
+        file = UploadFile(file=io.BytesIO(data), filename='registry.xlsx')
+        file_path, file_hash, size = asyncio.run(spool_upload(file, tmp_path))
+
+        assert file_hash == hashlib.sha256(data).hexdigest()
+        assert size == len(data)
+        assert file_path.read_bytes() == data
+        assert file_path.name == f"{file_hash[:16]}_registry.xlsx"
+        assert list(tmp_path.glob('*.part')) == []
+
+
+class TestUploadDuplicates:
+    """Тесты повторной загрузки того же реестра."""
+
+    def test_same_file_and_mode(self, run_with_db, api_client, upload_dir):
+        """Тот же файл в том же режиме возвращает уже созданную задачу."""
+        async def scenario(session):
+            async with api_client(session, upload.router) as client:
+                first = (await client.post(
+                    "/api/v1/upload", files={'file': ('registry.csv', REGISTRY_CSV)}
+                )).json()
+                second = (await client.post(
+                    "/api/v1/upload", files={'file': ('renamed.csv', REGISTRY_CSV)}
+                )).json()
+
+            assert first['duplicate'] is False
+            assert second['duplicate'] is True
+            assert second['job_id'] == first['job_id']
+            assert second['file_path'] == first['file_path']
+
+            jobs = (await session.execute(select(IngestJob))).scalars().all()
+            assert len(jobs) == 1
+            assert jobs[0].file_hash == hashlib.sha256(REGISTRY_CSV).hexdigest()
+
+            # Копия под другим именем удалена
+            assert [path.name for path in upload_dir.iterdir()] == [Path(first['file_path']).name]
+
+        run_with_db(scenario)
+
+    def test_other_mode_not_duplicate(self, run_with_db, api_client, upload_dir):
+        """Тот же файл в другом режиме загружается заново."""
+        async def scenario(session):
+            async with api_client(session, upload.router) as client:
+                first = (await client.post(
+                    "/api/v1/upload", files={'file': ('registry.csv', REGISTRY_CSV)}
+                )).json()
+                second = (await client.post(
+                    "/api/v1/upload", params={'mode': 'upsert'},
+                    files={'file': ('registry.csv', REGISTRY_CSV)}
+                )).json()
+
+            assert second['duplicate'] is False
+            assert second['job_id'] != first['job_id']
+            assert (await session.get(IngestJob, second['job_id'])).mode == 'upsert'
+
+        run_with_db(scenario)
+
+    @pytest.mark.parametrize('job_status, batch_status', [
+        ('failed', None),
+        ('completed', 'rolled_back'),
+    ])
+    def test_failed_or_rolled_back_not_duplicate(
+        self, run_with_db, api_client, upload_dir, job_status, batch_status
+    ):
+        """Упавшая или откаченная загрузка не мешает загрузить файл снова."""
+        async def scenario(session):
+            async with api_client(session, upload.router) as client:
+                first = (await client.post(
+                    "/api/v1/upload", files={'file': ('registry.csv', REGISTRY_CSV)}
+                )).json()
+
+                job = await session.get(IngestJob, first['job_id'])
+                job.status = job_status
+                if batch_status is not None:
+                    batch = IngestBatch(filename='registry.csv', mode='insert', status=batch_status)
+                    session.add(batch)
+                    await session.flush()
+                    job.batch_id = batch.id
+                await session.commit()
+
+                second = (await client.post(
+                    "/api/v1/upload", files={'file': ('registry.csv', REGISTRY_CSV)}
+                )).json()
+
+            assert second['duplicate'] is False
+            assert second['job_id'] != first['job_id']
+
+        run_with_db(scenario)
+
+
+class TestPreview:
+    """Тесты пробного разбора реестра."""
+
+    def test_preview_registry(self, run_with_db, tmp_path):
+        """Маппинг заголовков, не больше rows строк, ошибки по строкам, без записи в БД."""
+        path = write_registry_xlsx(tmp_path / 'registry.xlsx')
+
+        async def scenario(session):
+            session.add(Client(
+                fio='Клиент 1', iin='000000000001', creditor='Банк', amount=1000,
+                days_overdue=10, phone='+77011234567'
+            ))
+            await session.commit()
+
+            preview = await preview_registry(str(path), session, rows=3, sample=10)
+
+            assert preview['mapping'] == {
+                'Клиент': 'fio', 'IIN': 'iin', 'Bank': 'creditor',
+                'Debt': 'amount', 'Days': 'days_overdue', 'Tel': 'phone'
+            }
+            assert preview['missing_columns'] == []
+            assert preview['unmapped_columns'] == ['Комментарий']
+            assert preview['rows_read'] == 3
+            assert (preview['valid_rows'], preview['invalid_rows']) == (2, 1)
+            assert preview['errors'] == [
+                {'row': 3, 'iin': '000000000002', 'reason': 'некорректный телефон'}
+            ]
+            assert [row['iin'] for row in preview['sample']] == ['000000000001', '000000000003']
+            assert preview['duplicates'] == {
+                'sampled': 2, 'existing_in_db': 1, 'repeated_in_file': 0, 'rate': 0.5
+            }
+            assert await count_clients(session) == 1
+
+        run_with_db(scenario)
+
+    def test_preview_endpoint(self, run_with_db, api_client, upload_dir):
+        """Эндпоинт не создает задач и клиентов и удаляет временный файл."""
+        data = write_registry_xlsx(upload_dir / 'source.xlsx').read_bytes()
+
+        async def scenario(session):
+            async with api_client(session, upload.router) as client:
+                response = await client.post(
+                    "/api/v1/upload/preview", params={'rows': 2},
+                    files={'file': ('registry.xlsx', data)}
+                )
+                missing = await client.post(
+                    "/api/v1/upload/preview",
+                    files={'file': ('registry.csv', 'ФИО;ИИН\nКлиент;000000000001\n'.encode())}
+                )
+
+            assert response.status_code == 200
+            preview = response.json()
+            assert preview['filename'] == 'registry.xlsx'
+            assert preview['rows_read'] == 2
+            assert [error['row'] for error in preview['errors']] == [3]
+
+            assert missing.status_code == 200
+            assert missing.json()['missing_columns'] == ['creditor', 'amount', 'days_overdue', 'phone']
+
+            assert await count_clients(session) == 0
+            assert (await session.execute(select(func.count()).select_from(IngestJob))).scalar_one() == 0
+            assert list((upload_dir / 'preview').iterdir()) == []
+
+        run_with_db(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,155 @@
+"""
+Unit tests для валидации строк реестра при загрузке.
+
+Запуск:
+    pytest tests/test_validation.py -v
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Добавляем путь к backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.validation import (
+    validate_batch,
+    iin_checksum_valid,
+    normalize_phone,
+    normalize_iin,
+)
+
+# ИИН с корректной контрольной суммой
+VALID_IIN = '512531261074'
+VALID_IIN_LEADING_ZERO = '081958120404'
+
+
+def make_row(row=2, **overrides):
+    """Строка реестра с корректными значениями."""
+    data = {
+        '_row': row,
+        'fio': 'Иванов Иван',
+        'iin': VALID_IIN,
+        'creditor': 'Kaspi Bank',
+        'amount': 150000,
+        'days_overdue': 30,
+        'phone': '+77011234567'
+    }
+    data.update(overrides)
+    return data
+
+
+class TestIinChecksum:
+    """Тесты проверки контрольного разряда ИИН."""
+    
+    def test_valid_iin(self):
+        """Тест корректного ИИН."""
+        result = iin_checksum_valid(pd.Series([VALID_IIN, VALID_IIN_LEADING_ZERO]))
+        
+        assert result.tolist() == [True, True]
+    
+    def test_invalid_iin(self):
+        """Тест неверной контрольной суммы и неверного формата."""
+        result = iin_checksum_valid(pd.Series(['123456789012', '12345', 'abcdefghijkl']))
+        
+        assert result.tolist() == [False, False, False]
+    
+    def test_numeric_iin_restores_leading_zero(self):
+        """Тест восстановления ведущего нуля у ИИН, прочитанного числом."""
+        result = normalize_iin(pd.Series([int(VALID_IIN_LEADING_ZERO), 512531261074.0], dtype=object))
+        
+        assert result.tolist() == [VALID_IIN_LEADING_ZERO, VALID_IIN]
+
+
+class TestNormalizePhone:
+    """Тесты приведения телефонов к E.164."""
+    
+    def test_kz_formats(self):
+        """Тест распространенных форматов казахстанских номеров."""
+        phones = pd.Series(['8 (701) 123-45-67', '7011234567', '+7 701 123 45 67', 77011234567])
+        
+        assert normalize_phone(phones).tolist() == ['+77011234567'] * 4
+    
+    def test_invalid_phone(self):
+        """Тест номеров, которые нельзя привести к E.164."""
+        result = normalize_phone(pd.Series(['123', '', None]))
+        
+        assert result.isna().all()
+
+
+class TestValidateBatch:
+    """Тесты валидации пачки строк."""
+    
+    def test_valid_rows_are_normalized(self):
+        """Тест нормализации корректных строк."""
+        batch = [make_row(fio='  Иванов Иван ', amount='150 000,50', days_overdue='30', phone='87011234567')]
+        valid, errors = validate_batch(batch)
+        
+        assert errors == []
+        assert valid == [{
+            'fio': 'Иванов Иван',
+            'iin': VALID_IIN,
+            'creditor': 'Kaspi Bank',
+            'amount': 150000.5,
+            'days_overdue': 30,
+            'phone': '+77011234567'
+        }]
+    
+    def test_rejected_rows_report_row_and_reason(self):
+        """Тест отчета по отбракованным строкам."""
+        batch = [
+            make_row(row=2),
+            make_row(row=3, iin='123456789012'),
+            make_row(row=4, fio=None, amount='abc'),
+        ]
+        valid, errors = validate_batch(batch)
+        
+        assert len(valid) == 1
+        assert [error['row'] for error in errors] == [3, 4]
+        assert 'контрольная сумма' in errors[0]['reason']
+        assert 'ФИО' in errors[1]['reason']
+        assert 'сумма' in errors[1]['reason']
+    
+    def test_negative_values_rejected(self):
+        """Тест отрицательных сумм и дней просрочки."""
+        valid, errors = validate_batch([make_row(amount=-1, days_overdue=-5)])
+        
+        assert valid == []
+        assert 'отрицательная сумма' in errors[0]['reason']
+        assert 'отрицательные дни просрочки' in errors[0]['reason']
+    
+    @pytest.mark.parametrize('amount, days_overdue, reason', [
+        ('inf', 30, 'сумма не является конечным числом'),
+        ('-Infinity', 30, 'сумма не является конечным числом'),
+        ('nan', 30, 'сумма не является числом'),
+        (float('nan'), 30, 'сумма не является числом'),
+        ('1e30', 30, 'сумма больше'),
+        (150000, 'inf', 'дни просрочки не являются конечным числом'),
+        (150000, 'nan', 'дни просрочки не являются числом'),
+        (150000, '1e30', 'дней просрочки больше'),
+        (150000, 12.7, 'дробные дни просрочки'),
+        (150000, '12,5', 'дробные дни просрочки'),
+    ])
+    def test_non_finite_and_out_of_range_rejected(self, amount, days_overdue, reason):
+        """Тест бесконечных, NaN, слишком больших значений и дробных дней."""
+        valid, errors = validate_batch([make_row(amount=amount, days_overdue=days_overdue)])
+        
+        assert valid == []
+        assert reason in errors[0]['reason']
+    
+    def test_whole_float_days_accepted(self):
+        """Тест дней просрочки, прочитанных из Excel как float."""
+        valid, errors = validate_batch([make_row(days_overdue=12.0)])
+        
+        assert errors == []
+        assert valid[0]['days_overdue'] == 12
+    
+    def test_empty_batch(self):
+        """Тест пустой пачки."""
+        assert validate_batch([]) == ([], [])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
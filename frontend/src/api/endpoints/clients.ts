@@ -3,21 +3,57 @@ import type {
     Client,
     ClientsResponse,
     UploadResponse,
+    UploadJobResponse,
+    UploadJobStatus,
     ProcessResponse
 } from '../../types/client';
 import type { QueryParams } from '../../types/api';
 
+// Опрос статуса фоновой загрузки реестра: интервал и сколько всего ждать
+const UPLOAD_POLL_INTERVAL_MS = 1000;
+const UPLOAD_POLL_TIMEOUT_MS = 10 * 60 * 1000;
+const UPLOAD_POLL_MAX_ATTEMPTS = UPLOAD_POLL_TIMEOUT_MS / UPLOAD_POLL_INTERVAL_MS;
+
 export const uploadExcel = async (file: File): Promise<UploadResponse> => {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response = await apiClient.post<UploadResponse>('/api/v1/upload', formData, {
+    const response = await apiClient.post<UploadJobResponse>('/api/v1/upload', formData, {
         headers: {
             'Content-Type': 'multipart/form-data',
         },
     });
 
-    return response.data;
+    // Тот же файл уже загружался - новых данных нет
+    const { job_id, file_path, duplicate, message } = response.data;
+    if (duplicate) {
+        return { message, file_path, added_count: 0, error_count: 0 };
+    }
+
+    // Файл загружается в БД в фоне, ждем завершения задачи не дольше UPLOAD_POLL_TIMEOUT_MS
+    for (let attempt = 0; attempt < UPLOAD_POLL_MAX_ATTEMPTS; attempt++) {
+        const { data: job } = await apiClient.get<UploadJobStatus>(`/api/v1/upload/${job_id}/status`);
+
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Ошибка загрузки файла');
+        }
+
+        if (job.status === 'completed') {
+            return {
+                message: 'Файл успешно обработан',
+                file_path,
+                added_count: job.rows_inserted,
+                error_count: job.rows_skipped + job.rows_failed,
+            };
+        }
+
+        await new Promise((resolve) => setTimeout(resolve, UPLOAD_POLL_INTERVAL_MS));
+    }
+
+    throw new Error(
+        `Загрузка файла не завершилась за ${UPLOAD_POLL_TIMEOUT_MS / 60000} мин, ` +
+        `она продолжается в фоне (задача ${job_id})`
+    );
 };
 
 export const getClients = async (params?: QueryParams): Promise<ClientsResponse> => {
@@ -62,6 +62,26 @@ export interface UploadResponse {
     error_count: number;
 }
 
+export interface UploadJobResponse {
+    job_id: string;
+    status: string;
+    file_path: string;
+    duplicate: boolean;
+    message: string;
+}
+
+export interface UploadJobStatus {
+    job_id: string;
+    filename: string;
+    status: 'queued' | 'running' | 'completed' | 'failed';
+    rows_parsed: number;
+    rows_inserted: number;
+    rows_skipped: number;
+    rows_failed: number;
+    rows_per_second: number;
+    error?: string;
+}
+
 export interface ProcessResponse {
     success: boolean;
     message: string;